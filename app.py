@@ -2,10 +2,10 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 import veri_analizi as va
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))  # ana dizin
 sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))  # modules dizini
 
@@ -13,10 +13,42 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))  # modules d
 # Modülleri içe aktar
 from modules.dashboard import add_dashboard
 from modules.sales_analysis import seasonal_analysis, price_analysis
-from modules.customer_analysis import rfm_analysis, sentiment_analysis
+from modules.customer_analysis import rfm_analysis, sentiment_analysis, anomaly_analysis
 from modules.advanced_analytics import profitability_analysis, trend_analysis
+from modules.product_recommendation import product_recommendation
 from modules.feedback_module import add_feedback_tab, init_db
-from modules.database_utils import save_dataframe, read_table, init_database
+from modules.database_utils import (save_dataframe, query_table, init_database, bulk_load_csv,
+                                    table_signature)
+from modules.job_runner import submit_job, find_job, job_key_for, load_job_result
+from modules.segmentation import SEGMENT_INIT_SAMPLE, segment_customer_table, sample_table, segment_statistics
+
+UPLOAD_PREVIEW_ROWS = 100   # Yüklenen dosyadan oturumda tutulan önizleme satırı sayısı
+
+
+def load_csv_with_progress(uploaded_file, table_name):
+    """Yüklenen CSV'yi ilerleme çubuğu göstererek parça parça veritabanına yazar"""
+    progress = st.progress(0.0, text="Dosya veritabanına yükleniyor...")
+
+    def on_progress(rows_loaded, fraction):
+        text = f"{rows_loaded:,} satır yüklendi"
+        if fraction is not None:
+            progress.progress(fraction, text=text)
+        else:
+            progress.progress(0.0, text=text)
+
+    rows = bulk_load_csv(uploaded_file, table_name, mode='replace', progress_callback=on_progress)
+    progress.empty()
+    return rows
+
+
+@st.fragment(run_every=1)
+def show_job_progress(job_type, job_key):
+    """Arka plandaki işin ilerlemesini saniyede bir günceller (sadece bu parça yeniden çizilir)"""
+    job = find_job(job_type, job_key)
+    if job is None or job['status'] not in ('queued', 'running'):
+        # İş bitti: sonuçları göstermek için tüm sayfayı yeniden çalıştır
+        st.rerun()
+    st.progress(min(job['progress'] or 0.0, 1.0), text=job['stage'] or "Kuyrukta")
 
 
 st.set_page_config(page_title="Yapay Zeka ile Veri Analizi", layout="wide")
@@ -84,37 +116,75 @@ with tab2:
         # Mevcut satış tahmini kodu
         sales_file = st.file_uploader("CSV Dosyası Yükleyin (veya örnek veri kullanın)", type="csv")
         if sales_file:
-            sales_data = pd.read_csv(sales_file)
-            st.session_state['sales_data'] = sales_data
-
-            # 🔽🔽🔽 Veritabanına kaydet (tablo adı: sales_data)
-            from modules.database_utils import save_dataframe
-            save_dataframe(sales_data, "sales_data", mode='replace')
-            st.success("Satış verisi veritabanına kaydedildi.")
+            # Aynı dosya her yeniden çalıştırmada tekrar yüklenmesin
+            upload_key = (sales_file.name, sales_file.size)
+            if st.session_state.get('sales_upload_key') != upload_key:
+                # 🔽🔽🔽 Veritabanına parça parça kaydet (tablo adı: sales_data)
+                rows = load_csv_with_progress(sales_file, "sales_data")
+                st.session_state['sales_upload_key'] = upload_key
+                # Oturumda tablonun tamamı değil, sadece kısa bir önizleme tutulur; analiz
+                # işleri günlük toplamları tablodan kendileri okur (bkz. va.load_daily_sales)
+                st.session_state['sales_source'] = {
+                    "sales_table": "sales_data",
+                    "source_signature": list(table_signature("sales_data", ["sales"])),
+                }
+                st.session_state['sales_preview'] = query_table("sales_data", order_by="date",
+                                                                limit=UPLOAD_PREVIEW_ROWS)
+                st.session_state['sales_rows'] = rows
+                st.success(f"Satış verisi veritabanına kaydedildi ({rows:,} satır).")
         else:
             if st.button("Örnek Veri Oluştur"):
                 st.info("Örnek veri oluşturuluyor...")
                 sales_data = va.create_sample_sales_data()
                 st.success("Örnek veri oluşturuldu!")
-                st.session_state['sales_data'] = sales_data
+                st.session_state['sales_source'] = {"sales_data": sales_data}
+                st.session_state['sales_preview'] = sales_data
+                st.session_state['sales_rows'] = len(sales_data)
         
-        if 'sales_data' in st.session_state:
-            sales_data = st.session_state['sales_data']
+        if 'sales_source' in st.session_state:
+            sales_source = st.session_state['sales_source']
+            sales_rows = st.session_state['sales_rows']
             st.write("Veri Önizleme:")
-            st.dataframe(sales_data.head())
+            st.dataframe(st.session_state['sales_preview'].head())
             
             forecast_days = st.slider("Tahmin Günü Sayısı", 7, 90, 30)
+            auto_order = st.checkbox("ARIMA derecesini otomatik seç (AIC ile paralel arama)", value=False)
+            arima_order = 'auto' if auto_order else va.DEFAULT_ARIMA_ORDER
+            fast_training = st.checkbox("Hızlı ML eğitimi (eşzamanlı, histogram tabanlı, zaman sıralı erken durdurma)",
+                                        value=False)
+            ml_mode = 'fast' if fast_training else 'standard'
+            
+            # Analiz arka planda bir işçi süreçte çalışır; aynı veri ve parametrelerle
+            # başlatılmış bir iş varsa (yeniden çalıştırma veya başka oturum) ona bağlanılır
+            job_payload = {**sales_source, "forecast_days": forecast_days, "arima_order": arima_order,
+                           "ml_mode": ml_mode}
+            job_key = job_key_for("sales_analysis", job_payload)
             
             if st.button("Analizi Başlat"):
+                submit_job("sales_analysis", job_payload,
+                           params={"forecast_days": forecast_days, "rows": sales_rows,
+                                   "arima_order": arima_order, "ml_mode": ml_mode})
+            
+            job = find_job("sales_analysis", job_key)
+            
+            if job is not None and job['status'] in ('queued', 'running'):
                 st.info("Analiz yapılıyor...")
+                show_job_progress("sales_analysis", job_key)
+                st.caption("Bu sayfadan ayrılabilirsiniz; analiz arka planda devam eder.")
+            
+            elif job is not None and job['status'] == 'failed':
+                error_summary = (job['error'] or "").strip().splitlines()
+                st.error(f"Analiz sırasında bir hata oluştu: {error_summary[0] if error_summary else 'bilinmeyen hata'}")
+            
+            elif job is not None and job['status'] == 'done':
                 try:
-                    # Zaman serisi analizi
-                    with st.spinner("Zaman serisi analizi yapılıyor..."):
-                        result = va.analyze_time_series(sales_data)
-                    
-                    # ARIMA tahmin
-                    with st.spinner(f"{forecast_days} günlük tahmin yapılıyor..."):
-                        forecast = va.forecast_sales(sales_data, forecast_days)
+                    # Sonuç her yeniden çalıştırmada tekrar yüklenmesin
+                    if st.session_state.get('sales_job_result_id') != job['job_id']:
+                        st.session_state['sales_job_result'] = load_job_result(job['job_id'])
+                        st.session_state['sales_job_result_id'] = job['job_id']
+                    job_result = st.session_state['sales_job_result']
+                    components = job_result['components']
+                    forecast = job_result['forecast']
                     
                     st.success("Analiz tamamlandı!")
                     
@@ -124,58 +194,129 @@ with tab2:
                     # Gözlemlenen satışlar
                     st.write("#### Gözlemlenen Satışlar")
                     fig, ax = plt.subplots(figsize=(10, 6))
-                    result.observed.plot(ax=ax)
+                    components['observed'].plot(ax=ax)
                     st.pyplot(fig)
                     
                     # Trend bileşeni
                     st.write("#### Trend Bileşeni")
                     fig, ax = plt.subplots(figsize=(10, 6))
-                    result.trend.plot(ax=ax)
+                    components['trend'].plot(ax=ax)
                     st.pyplot(fig)
                     
                     # Mevsimsel bileşen
                     st.write("#### Mevsimsel Bileşen")
                     fig, ax = plt.subplots(figsize=(10, 6))
-                    result.seasonal.plot(ax=ax)
+                    components['seasonal'].plot(ax=ax)
                     st.pyplot(fig)
                     
                     # Artık bileşen
                     st.write("#### Artık Bileşeni")
                     fig, ax = plt.subplots(figsize=(10, 6))
-                    result.resid.plot(ax=ax)
+                    components['resid'].plot(ax=ax)
                     st.pyplot(fig)
                     
-                    # ARIMA tahmin sonuçları
+                    # ARIMA tahmin sonuçları (işçi süreç arima_forecast tablosuna kaydetti)
                     st.subheader("ARIMA Tahmin Sonuçları")
-                    # ARIMA tahmin sonucunu veritabanına kaydet
-                    forecast_df = pd.DataFrame({
-                    "date": forecast.index,
-                    "predicted_sales": forecast.values
-                    })
-
-                    from modules.database_utils import save_dataframe
-                    save_dataframe(forecast_df, "arima_forecast", mode='replace')
                     st.success("ARIMA tahmin verisi veritabanına kaydedildi.")
                     fig, ax = plt.subplots(figsize=(12, 6))
-                    # Son 90 gün + tahmin
-                    ax.plot(sales_data.set_index('date')['sales'][-90:].index, 
-                            sales_data.set_index('date')['sales'][-90:].values, 
+                    # Son 90 gün (işin kullandığı günlük seri) + tahmin
+                    ax.plot(components['observed'][-90:].index, 
+                            components['observed'][-90:].values, 
                             label='Geçmiş Veriler')
                     ax.plot(forecast.index, forecast.values, color='red', label='Tahmin')
                     ax.set_title(f'{forecast_days} Günlük Tahmin')
                     ax.legend()
                     st.pyplot(fig)
                     
+                    arima_details = job_result.get('arima_details') or {}
+                    update_info = arima_details.get('update')
+                    if update_info:
+                        if update_info['action'] == 'refit':
+                            st.caption(f"ARIMA modeli yeniden eğitildi ({update_info['reason']}), "
+                                       f"{update_info['seconds']:.2f} sn")
+                        else:
+                            st.caption(f"Kayıtlı ARIMA modeli kullanıldı: {update_info['new_observations']} yeni gün "
+                                       f"eklendi, {update_info['seconds']:.2f} sn "
+                                       f"(son tam eğitim: {update_info['fitted_at']:%Y-%m-%d %H:%M})")
+                    if 'candidates' in arima_details:
+                        p, d, q = arima_details['order']
+                        st.write(f"Seçilen model: **ARIMA({p},{d},{q})** "
+                                 f"({arima_details['criterion'].upper()} = {arima_details['score']:.1f}, "
+                                 f"arama süresi {arima_details['seconds']:.1f} sn)")
+                        with st.expander("Denenen ARIMA Adayları", expanded=False):
+                            candidates = arima_details['candidates'].copy()
+                            candidates['order'] = candidates['order'].astype(str)
+                            st.dataframe(candidates[['order', 'aic', 'bic', 'status', 'seconds']])
+                    
                     # Machine Learning modeli sonuçları
                     st.subheader("Makine Öğrenmesi Model Sonuçları")
-                    with st.spinner("Makine öğrenmesi modelleri eğitiliyor..."):
-                        rf_model, xgb_model = va.train_ml_sales_model(sales_data)
-                    
-                    # Model sonuçlarını göster
-                    st.success("Modeller başarıyla eğitildi!")
+                    ml_models = job_result.get('ml_models')
+                    if ml_models:
+                        if any(info['trained'] for info in ml_models.values()):
+                            st.success("Modeller başarıyla eğitildi!")
+                        else:
+                            st.success("Aynı veriyle eğitilmiş kayıtlı modeller yüklendi, yeniden eğitim yapılmadı.")
+                        model_names = {'rf': 'RandomForest', 'xgb': 'XGBoost'}
+                        st.dataframe(pd.DataFrame([
+                            {'Model': model_names.get(key, key),
+                             'Durum': 'Eğitildi' if info['trained'] else 'Kayıttan yüklendi',
+                             'Test MAE': info['test_mae'],
+                             'Ağaç Sayısı': info.get('n_estimators'),
+                             'Eğitim Süresi (sn)': info['train_seconds'],
+                             'Kayıt Tarihi': info['created_at']}
+                            for key, info in ml_models.items()
+                        ]))
+                    else:
+                        st.warning("Makine öğrenmesi modelleri eğitilemedi.")
                     
                 except Exception as e:
                     st.error(f"Analiz sırasında bir hata oluştu: {e}")
+            
+            # Modelleri geçmiş veride, sadece o güne kadarki verilerle eğitip karşılaştır
+            st.subheader("Model Karşılaştırma (Geriye Dönük Test)")
+            col1, col2 = st.columns(2)
+            with col1:
+                backtest_horizon = st.slider("Tahmin Ufku (gün)", 7, 60, 30, key="backtest_horizon")
+            with col2:
+                backtest_folds = st.slider("Katman Sayısı", 3, 10, 5, key="backtest_folds")
+            
+            backtest_payload = {**sales_source, "horizon": backtest_horizon, "n_folds": backtest_folds}
+            backtest_key = job_key_for("sales_backtest", backtest_payload)
+            
+            if st.button("Geriye Dönük Testi Başlat"):
+                submit_job("sales_backtest", backtest_payload,
+                           params={"horizon": backtest_horizon, "n_folds": backtest_folds, "rows": sales_rows})
+            
+            backtest_job = find_job("sales_backtest", backtest_key)
+            
+            if backtest_job is not None and backtest_job['status'] in ('queued', 'running'):
+                show_job_progress("sales_backtest", backtest_key)
+            
+            elif backtest_job is not None and backtest_job['status'] == 'failed':
+                error_summary = (backtest_job['error'] or "").strip().splitlines()
+                st.error(f"Geriye dönük test başarısız oldu: {error_summary[0] if error_summary else 'bilinmeyen hata'}")
+            
+            elif backtest_job is not None and backtest_job['status'] == 'done':
+                backtest = load_job_result(backtest_job['job_id'])
+                st.write(f"{backtest_folds} katman x {backtest_horizon} günlük ufuk, "
+                         f"toplam süre {backtest['seconds']:.1f} sn")
+                st.dataframe(backtest['summary'].rename(columns={
+                    'model': 'Model', 'folds_ok': 'Başarılı Katman', 'mae': 'MAE', 'rmse': 'RMSE',
+                    'fit_seconds_total': 'Toplam Eğitim Süresi (sn)', 'fit_seconds_per_fold': 'Katman Başına Süre (sn)',
+                }))
+                
+                # Tahmin ufku uzadıkça hata nasıl büyüyor?
+                fig, ax = plt.subplots(figsize=(10, 5))
+                for model_name, group in backtest['by_horizon'].groupby('model'):
+                    ax.plot(group['horizon'], group['mae'], label=model_name)
+                ax.set_xlabel('Tahmin Ufku (gün)')
+                ax.set_ylabel('MAE')
+                ax.set_title('Tahmin Ufkuna Göre Ortalama Mutlak Hata')
+                ax.legend()
+                st.pyplot(fig)
+                
+                with st.expander("Katman Ayrıntıları", expanded=False):
+                    st.dataframe(backtest['folds'])
     
     with sub_tab2:
         # Dönemsel analiz
@@ -189,35 +330,114 @@ with tab2:
 with tab3:
     st.header("Müşteri Analizi")
     
-    sub_tab1, sub_tab2, sub_tab3 = st.tabs(["Segmentasyon", "RFM Analizi", "Duygu Analizi"])
+    sub_tab1, sub_tab2, sub_tab3, sub_tab4 = st.tabs(["Segmentasyon", "RFM Analizi", "Duygu Analizi",
+                                                      "Anomali Tespiti"])
     
     with sub_tab1:
         # Müşteri segmentasyonu
         customer_file = st.file_uploader("Müşteri CSV Dosyası Yükleyin (veya örnek veri kullanın)", type="csv")
         if customer_file:
-            customer_data = pd.read_csv(customer_file)
-            save_dataframe(customer_data, "customer_data", mode='replace')
+            upload_key = (customer_file.name, customer_file.size)
+            if st.session_state.get('customer_upload_key') != upload_key:
+                rows = load_csv_with_progress(customer_file, "customer_data")
+                st.session_state['customer_upload_key'] = upload_key
+                # Tablonun tamamı oturuma alınmaz; segmentasyon tabloyu parça parça okur
+                st.session_state['customer_source'] = {"customer_table": "customer_data"}
+                st.session_state['customer_preview'] = query_table("customer_data", limit=UPLOAD_PREVIEW_ROWS)
+                st.session_state['customer_rows'] = rows
+                st.session_state.pop('cluster_sweep', None)
+                st.success(f"Müşteri verisi veritabanına kaydedildi ({rows:,} satır).")
         else:
             if st.button("Örnek Müşteri Verisi Oluştur"):
                 st.info("Örnek müşteri verisi oluşturuluyor...")
                 customer_data = va.create_customer_data()
                 st.success("Örnek müşteri verisi oluşturuldu!")
-                st.session_state['customer_data'] = customer_data
+                st.session_state['customer_source'] = {"customer_data": customer_data}
+                st.session_state['customer_preview'] = customer_data
+                st.session_state['customer_rows'] = len(customer_data)
+                st.session_state.pop('cluster_sweep', None)
         
-        if 'customer_data' in st.session_state:
-            customer_data = st.session_state['customer_data']
+        if 'customer_source' in st.session_state:
+            customer_source = st.session_state['customer_source']
+            customer_table = customer_source.get('customer_table')
+            customer_rows = st.session_state['customer_rows']
             st.write("Veri Önizleme:")
-            st.dataframe(customer_data.head())
+            st.dataframe(st.session_state['customer_preview'].head())
+            
+            fast_segmentation = st.checkbox("Hızlı segmentasyon (MiniBatch K-means, büyük müşteri sayıları için)",
+                                            value=customer_rows > 100000)
+            segmentation_mode = 'minibatch' if fast_segmentation else 'standard'
+            if customer_table is not None:
+                st.caption(f"Yüklenen müşteriler veritabanından parça parça okunarak mini-batch K-means ile "
+                           f"segmentlere ayrılır; küme sayısı taraması tablodan alınan en fazla "
+                           f"{SEGMENT_INIT_SAMPLE:,} müşterilik örnekte yapılır.")
+            
+            # Tüm küme sayıları birlikte denenir; eğitilen modeller önbellekte kaldığı için
+            # ardından seçilen küme sayısıyla segmentasyon anında tamamlanır
+            if st.button("En Uygun Küme Sayısını Bul"):
+                try:
+                    with st.spinner("Küme sayıları karşılaştırılıyor..."):
+                        sweep_data = (customer_source['customer_data'] if customer_table is None
+                                      else sample_table(customer_table))
+                        sweep = va.sweep_cluster_counts(sweep_data, mode=segmentation_mode)
+                    st.session_state['cluster_sweep'] = sweep
+                    st.session_state['cluster_count'] = sweep['recommended_k']
+                except Exception as e:
+                    st.error(f"Küme sayısı taraması sırasında bir hata oluştu: {e}")
+            
+            if 'cluster_sweep' in st.session_state:
+                sweep = st.session_state['cluster_sweep']
+                st.success(f"Önerilen küme sayısı: {sweep['recommended_k']} "
+                           f"(en yüksek silhouette, {sweep['sample_size']:,} müşterilik örnek, {sweep['seconds']:.1f} sn)")
+                with st.expander("Küme Sayısı Karşılaştırması", expanded=False):
+                    candidates = sweep['candidates'].set_index('n_clusters')
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.write("Silhouette (yüksek daha iyi)")
+                        st.line_chart(candidates['silhouette'])
+                    with col2:
+                        st.write("Inertia (dirsek noktasına bakın)")
+                        st.line_chart(candidates['inertia'])
+                    st.dataframe(candidates.rename(columns={'silhouette': 'Silhouette', 'inertia': 'Inertia',
+                                                           'seconds': 'Eğitim Süresi (sn)'}))
             
-            cluster_count = st.slider("Küme Sayısı", 2, 8, 4)
+            # Varsayılan değer oturum durumunda tutulur; tarama önerilen küme sayısını buraya yazar
+            st.session_state.setdefault('cluster_count', 4)
+            cluster_count = st.slider("Küme Sayısı", 2, 8, key="cluster_count")
             
             if st.button("Segmentasyon Analizini Başlat"):
                 st.info("Segmentasyon analizi yapılıyor...")
                 try:
-                    with st.spinner("Müşteriler segmentlere ayrılıyor..."):
-                        segmented_data, kmeans_model, scaler = va.segment_customers(customer_data, cluster_count)
+                    started = time.perf_counter()
+                    if customer_table is None:
+                        with st.spinner("Müşteriler segmentlere ayrılıyor..."):
+                            segmented_data, kmeans_model, scaler = va.segment_customers(
+                                customer_source['customer_data'], cluster_count, mode=segmentation_mode)
+                        n_segmented = len(segmented_data)
+                        plot_data = segmented_data
+                        cluster_stats = segmented_data.groupby('cluster').agg({
+                            'customer_id': 'count',
+                            'avg_purchase_value': 'mean',
+                            'purchase_frequency': 'mean',
+                            'return_rate': 'mean',
+                            'customer_value': 'mean'
+                        }).reset_index()
+                    else:
+                        # Model kaydındaki model tablo değişmedikçe yeniden eğitilmez; kümeler
+                        # customer_segments tablosuna yazılır, özetler SQLite'ta hesaplanır
+                        progress = st.progress(0.0, text="Müşteriler segmentlere ayrılıyor...")
+                        summary = segment_customer_table(
+                            customer_table, cluster_count,
+                            progress_callback=lambda rows, fraction: progress.progress(
+                                fraction or 0.0, text=f"{rows:,} müşteri segmentlere ayrıldı"))
+                        progress.empty()
+                        n_segmented = summary['rows']
+                        cluster_stats, plot_data = segment_statistics(customer_table)
+                        cluster_stats = cluster_stats[['cluster', 'customers', 'avg_purchase_value',
+                                                       'purchase_frequency', 'return_rate', 'customer_value']]
+                    elapsed = time.perf_counter() - started
                     
-                    st.success("Segmentasyon tamamlandı!")
+                    st.success(f"Segmentasyon tamamlandı! ({n_segmented:,} müşteri, {elapsed:.2f} sn)")
                     
                     # Sonuçları göster
                     st.subheader("Segmentasyon Sonuçları")
@@ -225,9 +445,9 @@ with tab3:
                     # Küme görselleştirme
                     st.write("#### Küme Görselleştirmesi")
                     fig, ax = plt.subplots(figsize=(10, 6))
-                    scatter = ax.scatter(customer_data['avg_purchase_value'], 
-                                        customer_data['purchase_frequency'],
-                                        c=segmented_data['cluster'], 
+                    scatter = ax.scatter(plot_data['avg_purchase_value'], 
+                                        plot_data['purchase_frequency'],
+                                        c=plot_data['cluster'], 
                                         cmap='viridis', 
                                         alpha=0.6)
                     ax.set_xlabel('Ortalama Satın Alma Değeri')
@@ -237,17 +457,11 @@ with tab3:
                                       title="Kümeler")
                     ax.add_artist(legend1)
                     st.pyplot(fig)
+                    if len(plot_data) < n_segmented:
+                        st.caption(f"Grafikte {len(plot_data):,} müşterilik örnek gösteriliyor.")
                     
                     # Küme istatistikleri
                     st.write("#### Küme İstatistikleri")
-                    cluster_stats = segmented_data.groupby('cluster').agg({
-                        'customer_id': 'count',
-                        'avg_purchase_value': 'mean',
-                        'purchase_frequency': 'mean',
-                        'return_rate': 'mean',
-                        'customer_value': 'mean'
-                    }).reset_index()
-                    
                     cluster_stats.columns = ['Küme', 'Müşteri Sayısı', 'Ort. Satın Alma', 'Satın Alma Sıklığı', 'İade Oranı', 'Müşteri Değeri']
                     st.dataframe(cluster_stats)
                     
@@ -261,6 +475,10 @@ with tab3:
     with sub_tab3:
         # Duygu analizi
         sentiment_analysis()
+    
+    with sub_tab4:
+        # Anomali tespiti
+        anomaly_analysis()
 
 # Gelişmiş Analizler Sekmesi
 with tab6:
@@ -274,7 +492,7 @@ with tab6:
     
     with sub_tab2:
         # Öneri motoru
-        st.write("Ürün öneri motoru yakında eklenecek...")
+        product_recommendation()
 
 # Trendler Sekmesi
 with tab5:
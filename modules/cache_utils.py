@@ -0,0 +1,211 @@
+# modules/cache_utils.py
+import functools
+import hashlib
+import pickle
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TTL = 3600                      # saniye; None = süresiz
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024   # Önbelleğin toplam bellek sınırı (~512 MB)
+
+
+# ----------------------------------------------------------------------------
+# İÇERİK ÖZETİ (CONTENT HASH)
+# ----------------------------------------------------------------------------
+
+def _update_hash(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(b"df")
+        h.update(repr((list(value.columns), [str(t) for t in value.dtypes])).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        except TypeError:
+            # Hash'lenemeyen hücreler (liste vb.) varsa pickle ile özetle
+            h.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    elif isinstance(value, pd.Series):
+        h.update(b"series")
+        h.update(repr((value.name, str(value.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(b"nd")
+        h.update(repr((value.shape, str(value.dtype))).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(b"seq" + str(len(value)).encode())
+        for item in value:
+            _update_hash(h, item)
+    elif isinstance(value, dict):
+        h.update(b"dict" + str(len(value)).encode())
+        for key in sorted(value, key=repr):
+            _update_hash(h, key)
+            _update_hash(h, value[key])
+    elif value is None or isinstance(value, (str, bytes, int, float, bool, pd.Timestamp)):
+        h.update(repr(value).encode())
+    else:
+        h.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def content_hash(*args, **kwargs):
+    """Argümanların içeriğinden kararlı bir anahtar üretir (DataFrame'ler dahil)"""
+    h = hashlib.blake2b(digest_size=20)
+    _update_hash(h, args)
+    _update_hash(h, kwargs)
+    return h.hexdigest()
+
+
+# Boyutu hesaplanırken içine girilmeyen nesneler (paylaşılan, önbelleğe ait olmayan)
+_OPAQUE_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                 types.MethodType)
+
+
+def estimate_size(value, _seen=None):
+    """Önbellekteki bir değerin yaklaşık bellek kullanımı (byte)
+
+    Nesne serileştirilmez: eğitilmiş modeller gibi nesnelerde özniteliklerdeki
+    numpy dizilerinin boyutları toplanır. Aynı nesne iki kez sayılmaz.
+    """
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (str, bytes, bytearray)) or isinstance(value, _OPAQUE_TYPES):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(v, _seen) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v, _seen) for v in value.values())
+    if hasattr(value, "node_count") and hasattr(value, "children_left"):
+        # scikit-learn ağaç yapısı (Cython): düğüm dizisi ve yaprak değerleri kopyasız okunur
+        return sys.getsizeof(value) + value.node_count * value.children_left.base.itemsize + value.value.nbytes
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + estimate_size(vars(value), _seen)
+    return sys.getsizeof(value)
+
+
+def _copy_result(value):
+    # Çağıranlar dönen DataFrame'lere sütun ekleyebildiği için önbellekteki kopya korunur
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy_result(v) for v in value)
+    if isinstance(value, list):
+        return [_copy_result(v) for v in value]
+    return value
+
+
+# ----------------------------------------------------------------------------
+# LRU ÖNBELLEK
+# ----------------------------------------------------------------------------
+
+class LRUCache:
+    """Süre (TTL) ve toplam bellek sınırı olan, thread-safe LRU önbellek"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (değer, boyut, son_geçerlilik, etiketler)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """(bulundu_mu, değer) döndürür"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, size, expires_at, _ = entry
+            if expires_at is not None and time.monotonic() > expires_at:
+                self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, ttl=DEFAULT_TTL, tags=()):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            # Sınırdan büyük sonuçlar önbelleğe alınmaz
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at, frozenset(tags))
+            self._bytes += size
+            # En uzun süredir kullanılmayanlardan başlayarak yer aç
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def _remove(self, key):
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, tag=None):
+        """Etiketli girdileri (tag=None ise hepsini) siler"""
+        with self._lock:
+            if tag is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for key in [k for k, e in self._entries.items() if tag in e[3]]:
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Süreç genelinde paylaşılan önbellek: Streamlit yeniden çalıştırmaları ve
+# aynı sunucudaki tüm oturumlar aynı girdileri kullanır
+default_cache = LRUCache()
+
+
+def cached(ttl=DEFAULT_TTL, tags=(), cache=None, copy=True):
+    """Fonksiyon sonucunu argümanların içerik özetine göre önbelleğe alan dekoratör
+
+    ttl: saniye cinsinden geçerlilik süresi (None = süresiz)
+    tags: toplu geçersiz kılma için etiketler (ör. tablo adı)
+    copy: DataFrame sonuçlarını kopyalayarak döndür (önbellekteki nesne değişmesin)
+    """
+    def decorator(func):
+        qualified_name = f"{func.__module__}.{func.__qualname__}"
+        entry_tags = tuple(tags) + (qualified_name,)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            store = cache if cache is not None else default_cache
+            key = qualified_name + ":" + content_hash(*args, **kwargs)
+            found, value = store.get(key)
+            if not found:
+                value = func(*args, **kwargs)
+                store.set(key, value, ttl=ttl, tags=entry_tags)
+            return _copy_result(value) if copy else value
+
+        wrapper.uncached = func
+        wrapper.invalidate = lambda: (cache if cache is not None else default_cache).invalidate(qualified_name)
+        return wrapper
+
+    return decorator
@@ -2,9 +2,9 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 import sys
 import os
+import time
 
 # Ana dizini Python yolu ekle
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,16 +13,43 @@ try:
 except:
     st.error("veri_analizi.py dosyası bulunamadı! Ana dizinde bulunduğundan emin olun.")
 
+from modules.database_utils import table_exists
+from modules.anomaly_scoring import ANOMALY_FEATURES, ANOMALY_TABLE, score_customer_table, load_anomalies
+from modules.rfm_engine import (ORDERS_TABLE, score_customers, source_column_names,
+                                refresh_customer_rfm, load_customer_rfm)
+from modules.sentiment_engine import (REVIEWS_TABLE, SENTIMENT_HISTOGRAM_BINS, score_text, score_review_table,
+                                      sentiment_summary)
+
 def rfm_analysis(customer_data=None):
     st.subheader("RFM Analizi")
     
     if customer_data is None:
-        # Örnek veri
-        try:
-            customer_data = va.create_customer_data()
-        except:
-            st.error("Örnek veri oluşturulamadı. veri_analizi.py dosyasının doğru konumda olduğundan emin olun.")
-            return
+        # Sipariş kayıtları varsa gerçek RFM değerleri, yoksa müşteri özelliklerinden yaklaşık skorlar
+        sources = ["Sipariş kayıtları", "Müşteri özellikleri (yaklaşık)"]
+        source = st.radio("Veri Kaynağı", sources, horizontal=True, key="rfm_source")
+        
+        if source == sources[0]:
+            if not table_exists(ORDERS_TABLE):
+                st.info("Veritabanında sipariş kaydı (orders tablosu) bulunamadı.")
+                if st.button("Örnek Sipariş Verisi Oluştur"):
+                    with st.spinner("Örnek siparişler oluşturuluyor..."):
+                        va.write_synthetic_data('orders', n_customers=1000, n_orders=50000)
+                    st.rerun()
+                return
+            
+            # Sadece son güncellemeden sonra eklenen siparişler özetlenir
+            summary = refresh_customer_rfm()
+            if summary['new_orders']:
+                st.caption(f"{summary['new_orders']:,} yeni sipariş işlendi, {summary['customers_updated']:,} "
+                           f"müşteri güncellendi ({summary['seconds']:.2f} sn)")
+            customer_data = load_customer_rfm()
+        else:
+            # Örnek veri
+            try:
+                customer_data = va.create_customer_data()
+            except:
+                st.error("Örnek veri oluşturulamadı. veri_analizi.py dosyasının doğru konumda olduğundan emin olun.")
+                return
     
     st.write("""
     RFM, müşteri segmentasyonunda kullanılan önemli bir yöntemdir:
@@ -40,59 +67,22 @@ def rfm_analysis(customer_data=None):
     with col3:
         m_weight = st.slider("Monetary Ağırlığı", 0.1, 1.0, 0.2, 0.1)
     
-    # RFM skorlarını hesapla (örnek)
-    # Gerçek bir uygulamada, müşteri verilerinden RFM skorları hesaplanır
+    # RFM skorlarını hesapla: quintile sınırları ve R/F/M skorları veri kümesi başına bir kez
+    # hesaplanıp önbelleğe alınır; ağırlık değiştiğinde sadece ağırlıklı toplam ve segmentler
+    # yeniden hesaplanır (bkz. modules/rfm_engine.py)
+    customer_data = score_customers(customer_data, r_weight, f_weight, m_weight)
     
-    # Recency değeri için 'loyalty_years' kullanılabilir (gerçek recency bunun tersi olacaktır)
-    if 'loyalty_years' in customer_data.columns:
-        customer_data['recency_score'] = 5 - pd.qcut(customer_data['loyalty_years'], 5, labels=[1, 2, 3, 4, 5]).astype(int)
-    else:
-        # Örnek bir recency skoru oluştur
-        customer_data['recency_score'] = np.random.randint(1, 6, size=len(customer_data))
-    
-    # Frequency için 'purchase_frequency' kullanılabilir
-    if 'purchase_frequency' in customer_data.columns:
-        customer_data['frequency_score'] = pd.qcut(customer_data['purchase_frequency'], 5, labels=[1, 2, 3, 4, 5]).astype(int)
-    else:
-        # Örnek bir frequency skoru oluştur
-        customer_data['frequency_score'] = np.random.randint(1, 6, size=len(customer_data))
-    
-    # Monetary için 'avg_purchase_value' veya 'customer_value' kullanılabilir
-    if 'customer_value' in customer_data.columns:
-        customer_data['monetary_score'] = pd.qcut(customer_data['customer_value'], 5, labels=[1, 2, 3, 4, 5]).astype(int)
-    elif 'avg_purchase_value' in customer_data.columns:
-        customer_data['monetary_score'] = pd.qcut(customer_data['avg_purchase_value'], 5, labels=[1, 2, 3, 4, 5]).astype(int)
-    else:
-        # Örnek bir monetary skoru oluştur
-        customer_data['monetary_score'] = np.random.randint(1, 6, size=len(customer_data))
-    
-    # Ağırlıklı RFM skoru hesapla
-    customer_data['rfm_score'] = (
-        customer_data['recency_score'] * r_weight + 
-        customer_data['frequency_score'] * f_weight + 
-        customer_data['monetary_score'] * m_weight
-    ) / (r_weight + f_weight + m_weight)
-    
-    # RFM segmentlerini oluştur
-    def rfm_segment(row):
-        if row['rfm_score'] >= 4.5:
-            return 'Champions'
-        elif row['rfm_score'] >= 4:
-            return 'Loyal Customers'
-        elif row['rfm_score'] >= 3:
-            return 'Potential Loyalists'
-        elif row['rfm_score'] >= 2:
-            return 'At Risk'
-        else:
-            return 'Hibernating'
-    
-    customer_data['segment'] = customer_data.apply(rfm_segment, axis=1)
+    missing = [name for name, column in source_column_names(customer_data).items() if column is None]
+    if missing:
+        st.warning(f"Veride kaynağı bulunamayan skorlar orta değerle (3) hesaplandı: {', '.join(missing)}")
     
     # Müşteri grupları
     st.write("### Müşteri Segmentleri")
     
     # Segmentlerin dağılımını göster
     segment_counts = customer_data['segment'].value_counts()
+    segment_counts = segment_counts[segment_counts > 0]
+    segment_counts.index = segment_counts.index.astype(str)
     
     fig, ax = plt.subplots(figsize=(10, 6))
     bars = ax.bar(segment_counts.index, segment_counts.values, color=plt.cm.viridis(np.linspace(0, 1, len(segment_counts))))
@@ -128,7 +118,89 @@ def rfm_analysis(customer_data=None):
             if segment['segment'] in customer_data['segment'].values:
                 sample_customers = customer_data[customer_data['segment'] == segment['segment']].head(5)
                 st.write("Örnek Müşteriler:")
-                st.dataframe(sample_customers[['customer_id', 'avg_purchase_value', 'purchase_frequency', 'customer_value', 'rfm_score']])
+                display_columns = [c for c in ['customer_id', 'recency_days', 'order_count', 'total_amount',
+                                               'avg_purchase_value', 'purchase_frequency', 'customer_value',
+                                               'rfm_score'] if c in sample_customers.columns]
+                st.dataframe(sample_customers[display_columns])
+
+def _anomaly_in_memory(customer_data):
+    missing = [c for c in ANOMALY_FEATURES if c not in customer_data.columns]
+    if missing:
+        st.warning(f"Anomali tespiti için gerekli sütunlar eksik: {', '.join(missing)}")
+        return
+    
+    if st.button("Anomali Tespitini Başlat"):
+        with st.spinner("Müşteriler puanlanıyor..."):
+            started = time.perf_counter()
+            result = va.detect_customer_anomalies(customer_data.copy())
+            elapsed = time.perf_counter() - started
+        
+        if 'anomaly' not in result.columns:
+            st.error("Anomali tespiti yapılamadı.")
+            return
+        anomalies = result[result['anomaly'] == 1].sort_values('anomaly_score')
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Müşteri Sayısı", f"{len(result):,}")
+        col2.metric("Anomali Sayısı", f"{len(anomalies):,}")
+        col3.metric("Süre", f"{elapsed:.2f} sn")
+        
+        fig, ax = plt.subplots(figsize=(10, 6))
+        normal = result[result['anomaly'] == 0]
+        ax.scatter(normal['avg_purchase_value'], normal['return_rate'], alpha=0.4, label='Normal')
+        ax.scatter(anomalies['avg_purchase_value'], anomalies['return_rate'], color='red', alpha=0.8, label='Anomali')
+        ax.set_xlabel('Ortalama Satın Alma Değeri')
+        ax.set_ylabel('İade Oranı')
+        ax.set_title('Anomali Tespiti Sonuçları')
+        ax.legend()
+        st.pyplot(fig)
+        
+        st.write("En Olağandışı Müşteriler (düşük skor daha olağandışı):")
+        st.dataframe(anomalies.head(20)[['customer_id'] + ANOMALY_FEATURES + ['anomaly_score']])
+
+def anomaly_analysis(customer_data=None):
+    st.subheader("Müşteri Anomali Tespiti")
+    
+    st.write("""
+    Isolation Forest ile harcama, alışveriş sıklığı ve iade davranışı olağandışı olan müşterileri bulun.
+    """)
+    
+    # Yüklenen müşteri dosyası oturumda tutulmaz; o durumda sadece aşağıdaki tablo
+    # puanlaması gösterilir
+    customer_source = st.session_state.get('customer_source', {})
+    if customer_data is None:
+        customer_data = customer_source.get('customer_data')
+    if customer_data is None and 'customer_table' not in customer_source:
+        # Örnek veri
+        try:
+            customer_data = va.create_customer_data()
+        except:
+            st.error("Örnek veri oluşturulamadı. veri_analizi.py dosyasının doğru konumda olduğundan emin olun.")
+            return
+    
+    if customer_data is not None:
+        _anomaly_in_memory(customer_data)
+    
+    # Veritabanındaki müşteriler kayıtlı dedektörle parça parça puanlanır;
+    # daha önce aynı modelle puanlananlar tekrar okunmaz
+    if table_exists('customer_data'):
+        st.write("### Veritabanındaki Müşterilerin Puanlanması")
+        refit = st.checkbox("Dedektörü yeniden eğit (tüm müşteriler yeniden puanlanır)", value=False)
+        if st.button("Yeni Müşterileri Puanla"):
+            try:
+                with st.spinner("Veritabanındaki müşteriler puanlanıyor..."):
+                    summary = score_customer_table(refit=refit)
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Puanlanan Müşteri", f"{summary['rows']:,}")
+                col2.metric("Anomali", f"{summary['anomalies']:,}")
+                col3.metric("Hız", f"{summary['rows_per_second']:,.0f} müşteri/sn" if summary['rows_per_second'] else "-")
+                st.caption(f"Toplam {summary['seconds']:.2f} sn, bunun {summary['score_seconds']:.2f} sn'si model puanlaması")
+            except Exception as e:
+                st.error(f"Puanlama sırasında bir hata oluştu: {e}")
+        
+        if table_exists(ANOMALY_TABLE):
+            with st.expander("Kaydedilmiş Anomaliler", expanded=False):
+                st.dataframe(load_anomalies(limit=100))
 
 def sentiment_analysis():
     st.subheader("Duygu Analizi ve Müşteri Geri Bildirim Analizi")
@@ -153,9 +225,14 @@ def sentiment_analysis():
     analyze_btn = st.button("Yorumu Analiz Et")
     
     if analyze_btn:
-        # Gerçek uygulamada burada doğal dil işleme yapılır
-        # Örnek bir sonuç gösteriyoruz
-        sentiment_score = 0.8  # 0-1 arası bir değer, 1=çok olumlu
+        # Yorum, yerelde eğitilmiş doğrusal modelle puanlanır; aynı metin daha önce
+        # puanlandıysa kayıtlı skor kullanılır (bkz. modules/sentiment_engine.py)
+        try:
+            with st.spinner("Yorum puanlanıyor..."):
+                sentiment_score, _ = score_text(user_review)  # 0-1 arası bir değer, 1=çok olumlu
+        except Exception as e:
+            st.error(f"Yorum puanlanamadı: {e}")
+            return
         
         # Duygu skoru gösterimi
         st.write("### Duygu Analizi Sonucu")
@@ -179,14 +256,47 @@ def sentiment_analysis():
         else:
             st.write("Bu yorum olumsuz. Müşteri deneyimini iyileştirmek için nedenleri araştırılmalı.")
     
-    # Mevcut yorumların analizi
+    # Veritabanındaki yorumlar toplu puanlanır; skorlar metin özetine göre saklandığı için
+    # aynı metin tekrar puanlanmaz ve dağılımlar kayıtlı skorlardan SQL ile hesaplanır
     st.write("### Yorum Dağılımı")
+    summary = None
+    if not table_exists(REVIEWS_TABLE):
+        st.info("Veritabanında müşteri yorumu (reviews tablosu) bulunamadı; aşağıda örnek yorumlar gösteriliyor.")
+        if st.button("Örnek Yorum Verisi Oluştur (200.000 yorum)"):
+            with st.spinner("Yapay yorumlar oluşturuluyor..."):
+                va.write_synthetic_data('reviews', n_reviews=200000)
+            st.rerun()
+    else:
+        refit = st.checkbox("Modeli yeniden eğit (tüm yorumlar yeniden puanlanır)", value=False,
+                            key="sentiment_refit")
+        if st.button("Yorumları Puanla"):
+            try:
+                with st.spinner("Yorumlar puanlanıyor..."):
+                    scoring = score_review_table(refit=refit)
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Puanlanan Yorum", f"{scoring['reviews']:,}")
+                col2.metric("Farklı Metin", f"{scoring['texts']:,}")
+                col3.metric("Hız", f"{scoring['reviews_per_second']:,.0f} yorum/sn"
+                            if scoring['reviews_per_second'] else "-")
+                st.caption(f"Toplam {scoring['seconds']:.2f} sn, bunun {scoring['score_seconds']:.2f} sn'si "
+                           f"model puanlaması" + (" (model yeniden eğitildi)" if scoring['trained'] else ""))
+            except Exception as e:
+                st.error(f"Puanlama sırasında bir hata oluştu: {e}")
+        summary = sentiment_summary()
+        if summary is None:
+            st.info("Henüz puanlanmış yorum yok; dağılımları görmek için yorumları puanlayın.")
+        elif summary['scored'] < summary['total']:
+            st.caption(f"{summary['total']:,} yorumun {summary['scored']:,} tanesi puanlanmış; "
+                       f"yeni yorumlar için puanlamayı tekrarlayın.")
+    
+    if summary is not None:
+        sentiment_counts = summary['counts'].to_dict()
+    else:
+        sentiment_counts = {"Olumlu": 0, "Nötr": 0, "Olumsuz": 0}
+        for review in sample_reviews:
+            sentiment_counts[review["sentiment"]] += 1
     
     # Duygu dağılımını göster
-    sentiment_counts = {"Olumlu": 0, "Nötr": 0, "Olumsuz": 0}
-    for review in sample_reviews:
-        sentiment_counts[review["sentiment"]] += 1
-    
     fig, ax = plt.subplots(figsize=(10, 6))
     sentiment_colors = {'Olumlu': '#28a745', 'Nötr': '#ffc107', 'Olumsuz': '#dc3545'}
     ax.bar(sentiment_counts.keys(), sentiment_counts.values(), color=[sentiment_colors[s] for s in sentiment_counts.keys()])
@@ -196,14 +306,40 @@ def sentiment_analysis():
     ax.set_ylabel('Yorum Sayısı')
     
     for i, v in enumerate(sentiment_counts.values()):
-        ax.text(i, v + 0.1, str(v), ha='center')
+        ax.text(i, v, f"{v:,}", ha='center', va='bottom')
     
     st.pyplot(fig)
     
+    if summary is not None:
+        col1, col2 = st.columns(2)
+        with col1:
+            # Skor histogramı
+            fig, ax = plt.subplots(figsize=(8, 5))
+            histogram = summary['histogram']
+            ax.bar(histogram['score'], histogram['reviews'], width=1.0 / SENTIMENT_HISTOGRAM_BINS, align='edge',
+                   color='skyblue', edgecolor='white')
+            ax.set_title('Duygu Skoru Dağılımı')
+            ax.set_xlabel('Duygu Skoru (1 = çok olumlu)')
+            ax.set_ylabel('Yorum Sayısı')
+            st.pyplot(fig)
+        with col2:
+            # Puana göre ortalama skor
+            fig, ax = plt.subplots(figsize=(8, 5))
+            by_rating = summary['by_rating']
+            ax.bar(by_rating['rating'].astype(str), by_rating['avg_score'], color='#6c757d')
+            ax.set_ylim(0, 1)
+            ax.set_title('Değerlendirme Puanına Göre Ortalama Duygu Skoru')
+            ax.set_xlabel('Değerlendirme (1-5)')
+            ax.set_ylabel('Ortalama Skor')
+            st.pyplot(fig)
+        reviews_to_show = summary['examples'][['text', 'rating', 'sentiment']].to_dict('records')
+    else:
+        reviews_to_show = sample_reviews
+    
     # Örnek yorumları göster
     st.write("### Örnek Yorumlar")
     
-    for i, review in enumerate(sample_reviews):
+    for i, review in enumerate(reviews_to_show):
         col_color = "success" if review["sentiment"] == "Olumlu" else "warning" if review["sentiment"] == "Nötr" else "danger"
         with st.container():
             st.markdown(f"""
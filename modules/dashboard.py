@@ -2,7 +2,20 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
+from modules.database_utils import table_exists, query_table
+
+def load_monthly_sales(date_range):
+    """Seçilen tarih aralığındaki satışları veritabanından aylık toplam olarak getirir"""
+    if len(date_range) != 2 or not table_exists("sales_data"):
+        return None
+    try:
+        # Sadece seçilen aralık ve gerekli iki sütun okunur
+        df = query_table("sales_data", columns=["date", "sales"], date_range=date_range)
+    except Exception:
+        return None
+    if df.empty:
+        return None
+    return df.set_index('date')['sales'].resample('ME').sum()
 
 def add_dashboard():
     st.subheader("İnteraktif Gösterge Paneli")
@@ -29,9 +42,14 @@ def add_dashboard():
         # Örnek satış trendi grafiği
         st.write("#### Satış Trendi")
         
-        # Örnek veri
-        dates = pd.date_range(start='2023-01-01', periods=12, freq='M')
-        sales_values = [120000, 118000, 125000, 135000, 140000, 150000, 148000, 152000, 149000, 155000, 160000, 170000]
+        monthly_sales = load_monthly_sales(date_range)
+        if monthly_sales is not None:
+            dates = monthly_sales.index
+            sales_values = monthly_sales.values
+        else:
+            # Örnek veri
+            dates = pd.date_range(start='2023-01-01', periods=12, freq='M')
+            sales_values = [120000, 118000, 125000, 135000, 140000, 150000, 148000, 152000, 149000, 155000, 160000, 170000]
         
         fig, ax = plt.subplots(figsize=(10, 5))
         ax.plot(dates, sales_values, marker='o')
@@ -2,33 +2,1244 @@
 import sqlite3
 import pandas as pd
 import os
+import queue
+import threading
+import atexit
+from contextlib import contextmanager
+
+from modules.cache_utils import default_cache, content_hash
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow yoksa sütunsal önbellek devre dışı, okumalar SQLite'tan yapılır
+    pa = None
 
 DB_PATH = "mursistva.db"
 
+# Bağlantı havuzu ayarları
+READ_POOL_SIZE = 4          # Aynı anda açık tutulacak okuyucu bağlantı sayısı
+POOL_TIMEOUT = 30           # Havuzdan bağlantı beklerken en fazla kaç saniye beklenir
+BUSY_TIMEOUT_MS = 30000     # SQLite kilitli olduğunda yeniden deneme süresi (ms)
+
+# Her bağlantıda uygulanan ayarlar
+# WAL modu sayesinde yazma işlemi sürerken okuyucular bloklanmaz
+CONNECTION_PRAGMAS = {
+    "busy_timeout": BUSY_TIMEOUT_MS,
+    "synchronous": "NORMAL",        # WAL ile güvenli, FULL'a göre çok daha hızlı
+    "cache_size": -65536,           # Negatif değer KB cinsinden: ~64 MB sayfa önbelleği
+    "mmap_size": 268435456,         # 256 MB bellek eşlemeli okuma
+    "temp_store": "MEMORY",
+}
+
+
+def _apply_pragmas(conn, read_only=False):
+    for name, value in CONNECTION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+
+
+class ConnectionPool:
+    """SQLite için thread-safe bağlantı havuzu: çoklu okuyucu, tek (sıralı) yazıcı"""
+
+    def __init__(self, db_path, read_pool_size=READ_POOL_SIZE):
+        self.db_path = db_path
+        self.read_pool_size = read_pool_size
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._closed = False
+
+    def _connect(self, read_only=False):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False)
+        _apply_pragmas(conn, read_only=read_only)
+        return conn
+
+    def _ensure_wal(self):
+        # WAL modu veritabanı dosyasına kalıcı olarak yazılır, yazıcı bağlantısında bir kez ayarlanması yeterli
+        mode = self._writer.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if mode.lower() != "wal" and self.db_path != ":memory:":
+            print(f"Uyarı: WAL modu etkinleştirilemedi (journal_mode={mode})")
+
+    def _acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._reader_count < self.read_pool_size:
+                self._reader_count += 1
+                create_new = True
+            else:
+                create_new = False
+
+        if create_new:
+            try:
+                return self._connect(read_only=True)
+            except Exception:
+                with self._lock:
+                    self._reader_count -= 1
+                raise
+
+        try:
+            return self._readers.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise TimeoutError(f"{POOL_TIMEOUT} saniye içinde boş okuyucu bağlantı bulunamadı")
+
+    def _release_reader(self, conn):
+        if self._closed:
+            conn.close()
+            return
+        # Yarım kalan okuma işlemlerini temizle, sonra havuza geri koy
+        if conn.in_transaction:
+            conn.rollback()
+        self._readers.put(conn)
+
+    @contextmanager
+    def reader(self):
+        """Havuzdan salt okunur bir bağlantı ödünç alır"""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._release_reader(conn)
+
+    @contextmanager
+    def writer(self):
+        """Tek yazıcı bağlantıyı kilitleyerek verir; hata olursa işlem geri alınır"""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+                self._ensure_wal()
+            conn = self._writer
+            try:
+                yield conn
+                if conn.in_transaction:
+                    conn.commit()
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._reader_count = 0
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+# Havuzlar süreç ve veritabanı yolu bazında tutulur (fork edilen süreçler bağlantı paylaşmamalı)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    db_path = db_path or DB_PATH
+    key = (os.getpid(), db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[key] = pool
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for (pid, _), pool in list(_pools.items()):
+            if pid == os.getpid():
+                pool.close()
+        _pools.clear()
+
+
+atexit.register(close_pools)
+
+
+@contextmanager
+def read_connection():
+    """Okuma işlemleri için havuzdan bağlantı: with read_connection() as conn: ..."""
+    with get_pool().reader() as conn:
+        yield conn
+
+
+@contextmanager
+def write_connection():
+    """Yazma işlemleri için tek yazıcı bağlantı: with write_connection() as conn: ..."""
+    with get_pool().writer() as conn:
+        yield conn
+
+
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    # Havuz dışında bağımsız bir bağlantı gerektiğinde (aynı ayarlarla)
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+    _apply_pragmas(conn)
+    return conn
+
+# ----------------------------------------------------------------------------
+# ŞEMA KAYDI (SCHEMA REGISTRY)
+# ----------------------------------------------------------------------------
+
+# Analitik tabloların tanımları. Bu tablolar to_sql ile düşürülüp yeniden
+# oluşturulmaz; şema yerinde güncellenir, indeksler korunur.
+# Kullanıcının CSV yüklediği tablolarda (sales_data, customer_data) birincil anahtar
+# veya NOT NULL kısıtı yoktur: çok mağazalı satışlar aynı tarihi tekrarlar, müşteri
+# dosyalarında customer_id sütunu bulunmayabilir. Bu tablolarda düz indeksler kullanılır.
+TABLE_SCHEMAS = {
+    "sales_data": {
+        "columns": {
+            "date": "TIMESTAMP",
+            "sales": "REAL",
+            "weekday": "INTEGER",
+            "month": "INTEGER",
+            "year": "INTEGER",
+            "is_weekend": "INTEGER",
+            "is_holiday": "INTEGER",
+            "is_promotion": "INTEGER",
+            "day_of_year": "INTEGER",
+        },
+        "primary_key": [],
+        "indexes": {
+            "idx_sales_data_date": ["date"],
+            "idx_sales_data_year_month": ["year", "month"],
+        },
+        "columnar": True,
+    },
+    # Çok serili (ürün x mağaza) günlük satışlar: toplu tahmin ve yük testleri için
+    "sales_panel": {
+        "columns": {
+            "product_id": "TEXT NOT NULL",
+            "store_id": "TEXT NOT NULL",
+            "date": "TIMESTAMP NOT NULL",
+            "sales": "REAL",
+            "weekday": "INTEGER",
+            "month": "INTEGER",
+            "year": "INTEGER",
+            "is_weekend": "INTEGER",
+            "is_holiday": "INTEGER",
+            "is_promotion": "INTEGER",
+            "day_of_year": "INTEGER",
+        },
+        "primary_key": ["product_id", "store_id", "date"],
+        "indexes": {
+            "idx_sales_panel_date": ["date"],
+        },
+        "columnar": True,
+    },
+    "customer_data": {
+        "columns": {
+            "customer_id": "TEXT",
+            "avg_purchase_value": "REAL",
+            "purchase_frequency": "REAL",
+            "return_rate": "REAL",
+            "loyalty_years": "REAL",
+            "avg_basket_size": "REAL",
+            "pct_discount_used": "REAL",
+            "true_segment": "INTEGER",
+            "customer_value": "REAL",
+        },
+        "primary_key": [],
+        "indexes": {
+            "idx_customer_data_customer": ["customer_id"],
+        },
+        "columnar": True,
+    },
+    # Sipariş kayıtları: sadece eklenir, RFM tablosu bunlardan artımlı olarak güncellenir.
+    # Çok büyük olabileceği için sütunsal anlık görüntüsü tutulmaz.
+    "orders": {
+        "columns": {
+            "order_id": "TEXT NOT NULL",
+            "customer_id": "TEXT NOT NULL",
+            "order_date": "TIMESTAMP NOT NULL",
+            "amount": "REAL",
+        },
+        "primary_key": ["order_id"],
+        "indexes": {
+            "idx_orders_customer": ["customer_id"],
+            "idx_orders_date": ["order_date"],
+        },
+        "columnar": False,
+    },
+    # Müşteri yorumları; text_hash metnin özetidir ve duygu skoru önbelleğiyle
+    # (review_sentiment) eşleştirmede kullanılır (bkz. modules/sentiment_engine).
+    # İndeks rating'i de içerir: dağılım özetleri tabloya hiç gitmeden indeksten okunur
+    "reviews": {
+        "columns": {
+            "review_id": "INTEGER NOT NULL",
+            "customer_id": "TEXT",
+            "product_id": "INTEGER",
+            "review_date": "TIMESTAMP",
+            "rating": "INTEGER",
+            "text": "TEXT",
+            "text_hash": "INTEGER",
+        },
+        "primary_key": ["review_id"],
+        "indexes": {
+            "idx_reviews_text_hash": ["text_hash", "rating"],
+        },
+        "columnar": False,
+    },
+    # Metin özeti başına duygu skoru: aynı metin bir kez puanlanır
+    "review_sentiment": {
+        "columns": {
+            "text_hash": "INTEGER NOT NULL",
+            "sentiment_score": "REAL",
+            "sentiment": "TEXT",
+            "model_id": "TEXT",
+            "scored_at": "TIMESTAMP",
+        },
+        "primary_key": ["text_hash"],
+        "indexes": {
+            "idx_review_sentiment_model": ["model_id"],
+        },
+        "columnar": False,
+    },
+    # Müşteri başına sipariş özeti (bkz. modules/rfm_engine.refresh_customer_rfm)
+    "customer_rfm": {
+        "columns": {
+            "customer_id": "TEXT NOT NULL",
+            "first_order_date": "TIMESTAMP",
+            "last_order_date": "TIMESTAMP",
+            "order_count": "INTEGER",
+            "total_amount": "REAL",
+        },
+        "primary_key": ["customer_id"],
+        "indexes": {},
+        "columnar": True,
+    },
+    # Müşteri başına K-means kümesi ve küme merkezine uzaklık (bkz. modules/segmentation)
+    "customer_segments": {
+        "columns": {
+            "customer_id": "TEXT NOT NULL",
+            "cluster": "INTEGER",
+            "distance": "REAL",
+        },
+        "primary_key": ["customer_id"],
+        "indexes": {
+            "idx_customer_segments_cluster": ["cluster"],
+        },
+        "columnar": True,
+    },
+    # Müşteri başına anomali bayrağı ve skoru; hangi modelle puanlandığı da tutulur
+    # (bkz. modules/anomaly_scoring)
+    "customer_anomalies": {
+        "columns": {
+            "customer_id": "TEXT NOT NULL",
+            "anomaly": "INTEGER",
+            "anomaly_score": "REAL",
+            "model_id": "TEXT",
+            "scored_at": "TIMESTAMP",
+        },
+        "primary_key": ["customer_id"],
+        "indexes": {
+            "idx_customer_anomalies_flag": ["anomaly"],
+        },
+        "columnar": True,
+    },
+    "products": {
+        "columns": {
+            "product_id": "INTEGER NOT NULL",
+            "product_name": "TEXT",
+            "category": "TEXT",
+            "description": "TEXT",
+        },
+        "primary_key": ["product_id"],
+        "indexes": {
+            "idx_products_category": ["category"],
+        },
+        "columnar": True,
+    },
+    # Ürün başına önceden hesaplanmış en benzer ürünler; source_hash, listenin hangi
+    # açıklamayla hesaplandığını gösterir (bkz. modules/product_index)
+    "product_similarity": {
+        "columns": {
+            "product_id": "INTEGER NOT NULL",
+            "rank": "INTEGER NOT NULL",
+            "similar_product_id": "INTEGER",
+            "score": "REAL",
+            "source_hash": "INTEGER",
+        },
+        "primary_key": ["product_id", "rank"],
+        "indexes": {
+            "idx_product_similarity_similar": ["similar_product_id"],
+        },
+        "columnar": False,
+    },
+    "arima_forecast": {
+        # Her seri (ör. ürün x mağaza) kendi tahminlerini tutar; tek seri tahmini 'total'dır
+        "columns": {
+            "series_id": "TEXT NOT NULL DEFAULT 'total'",
+            "date": "TIMESTAMP NOT NULL",
+            "predicted_sales": "REAL",
+        },
+        "primary_key": ["series_id", "date"],
+        "indexes": {},
+        "columnar": True,
+    },
+}
+
+
+def _sql_type_for(series: pd.Series):
+    """Şemada tanımlı olmayan sütunlar için pandas tipinden SQLite tipi"""
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(series):
+        return "REAL"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def _existing_columns(conn, table_name: str):
+    """{sütun: (tip, pk_sırası)} - pk_sırası 0 ise birincil anahtar değildir"""
+    rows = conn.execute(f"PRAGMA table_info({_quote_identifier(table_name)})").fetchall()
+    return {row[1]: (row[2], row[5]) for row in rows}
+
+
+def _create_table_sql(table_name: str, columns: dict, primary_key):
+    defs = [f"{_quote_identifier(col)} {col_type}" for col, col_type in columns.items()]
+    if primary_key:
+        defs.append(f"PRIMARY KEY ({', '.join(_quote_identifier(c) for c in primary_key)})")
+    return f"CREATE TABLE {_quote_identifier(table_name)} (\n    " + ",\n    ".join(defs) + "\n)"
+
+
+def _create_indexes(conn, table_name: str, indexes: dict):
+    for index_name, index_columns in indexes.items():
+        cols = ", ".join(_quote_identifier(c) for c in index_columns)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote_identifier(index_name)} "
+                     f"ON {_quote_identifier(table_name)} ({cols})")
+
+
+def ensure_table(conn, table_name: str, df: pd.DataFrame = None):
+    """Kayıtlı bir tabloyu oluşturur veya şemasını yerinde günceller
+
+    - Tablo yoksa tanımlı tipler, birincil anahtar ve indekslerle oluşturulur
+    - Eksik sütunlar ALTER TABLE ile eklenir (df'teki ek sütunlar dahil)
+    - Birincil anahtar tanımdan farklıysa (ör. to_sql ile oluşturulmuş eski tablo)
+      tablo yeniden kurulur ve veriler kopyalanır
+    Şemada değişiklik yapıldıysa True döner.
+    """
+    spec = TABLE_SCHEMAS[table_name]
+    declared = dict(spec["columns"])
+    primary_key = list(spec["primary_key"])
+
+    extra = {}
+    if df is not None:
+        for col in df.columns:
+            if col not in declared:
+                extra[col] = _sql_type_for(df[col])
+
+    existing = _existing_columns(conn, table_name)
+    if not existing:
+        conn.execute(_create_table_sql(table_name, {**declared, **extra}, primary_key))
+        _create_indexes(conn, table_name, spec["indexes"])
+        return True
+
+    changed = False
+    existing_pk = [col for col, (_, pk) in sorted(existing.items(), key=lambda x: x[1][1]) if pk > 0]
+    if existing_pk != primary_key and _rebuild_table(conn, table_name, declared, primary_key, existing, extra):
+        changed = True
+    else:
+        for col, col_type in {**declared, **extra}.items():
+            if col not in existing:
+                # ALTER TABLE ile NOT NULL sütun (varsayılan değersiz) eklenemez
+                col_type = col_type.replace(" NOT NULL", "")
+                conn.execute(f"ALTER TABLE {_quote_identifier(table_name)} "
+                             f"ADD COLUMN {_quote_identifier(col)} {col_type}")
+                changed = True
+    _create_indexes(conn, table_name, spec["indexes"])
+    return changed
+
+
+def _migration_conflicts(conn, table_name, declared, primary_key, existing):
+    """Eski tablonun yeni şemaya kayıpsız taşınmasını engelleyen satır sayıları
+
+    Dönüş: {'sorun': satır sayısı} - boş sözlük, tüm satırlar taşınabilir demektir
+    """
+    table = _quote_identifier(table_name)
+    conflicts = {}
+    missing_key = [c for c in primary_key if c not in existing]
+    if missing_key:
+        rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if rows:
+            conflicts[f"anahtar sütunu yok ({', '.join(missing_key)})"] = rows
+        return conflicts
+
+    required = [c for c, col_type in declared.items() if "NOT NULL" in col_type.upper() and c in existing]
+    for col in dict.fromkeys(primary_key + required):
+        nulls = conn.execute(f"SELECT COUNT(*) FROM {table} "
+                             f"WHERE {_quote_identifier(col)} IS NULL").fetchone()[0]
+        if nulls:
+            conflicts[f"{col} boş"] = nulls
+    if primary_key:
+        key = ", ".join(_quote_identifier(c) for c in primary_key)
+        duplicates = conn.execute(f"SELECT COALESCE(SUM(n - 1), 0) FROM (SELECT COUNT(*) AS n FROM {table} "
+                                  f"GROUP BY {key} HAVING COUNT(*) > 1)").fetchone()[0]
+        if duplicates:
+            conflicts["tekrarlı anahtar"] = duplicates
+    return conflicts
+
+
+def _rebuild_table(conn, table_name, declared, primary_key, existing, extra):
+    """Tabloyu tanımdaki birincil anahtarla yeniden kurar ve tüm satırları kopyalar
+
+    Satırlardan biri bile yeni anahtara/kısıtlara uymuyorsa (boş veya tekrarlı anahtar)
+    taşıma yapılmaz, eski tablo olduğu gibi kalır ve False döner; hiçbir satır atılmaz.
+    """
+    conflicts = _migration_conflicts(conn, table_name, declared, primary_key, existing)
+    if conflicts:
+        details = ", ".join(f"{problem}: {rows} satır" for problem, rows in conflicts.items())
+        print(f"Uyarı: '{table_name}' tablosu yeni şemaya taşınamadı, eski tablo korunuyor ({details})")
+        return False
+
+    # Eski tablodaki tanımsız sütunlar da korunur; eski tabloda olmayan sütunlar
+    # boş kalacağı için NOT NULL kısıtı olmadan eklenir
+    columns = {col: (col_type if col in existing else col_type.replace(" NOT NULL", ""))
+               for col, col_type in declared.items()}
+    for col, (col_type, _) in existing.items():
+        columns.setdefault(col, col_type or "TEXT")
+    for col, col_type in extra.items():
+        columns.setdefault(col, col_type)
+
+    tmp_name = f"{table_name}__migrate"
+    conn.execute(f"DROP TABLE IF EXISTS {_quote_identifier(tmp_name)}")
+    conn.execute(_create_table_sql(tmp_name, columns, primary_key))
+
+    common = [c for c in columns if c in existing]
+    cols = ", ".join(_quote_identifier(c) for c in common)
+    conn.execute(f"INSERT INTO {_quote_identifier(tmp_name)} ({cols}) "
+                 f"SELECT {cols} FROM {_quote_identifier(table_name)} ORDER BY rowid")
+    conn.execute(f"DROP TABLE {_quote_identifier(table_name)}")
+    conn.execute(f"ALTER TABLE {_quote_identifier(tmp_name)} RENAME TO {_quote_identifier(table_name)}")
+    # Satırlar yeni rowid'lerle kopyalandı: rowid'e göre artımlı işleyen özetler baştan hesaplansın
+    _bump_table_version(conn, table_name)
+    return True
+
+
+def migrate_tables():
+    """Veritabanında mevcut olan kayıtlı tabloların şemasını günceller"""
+    with write_connection() as conn:
+        migrated = [table_name for table_name in TABLE_SCHEMAS
+                    if _table_exists(conn, table_name) and ensure_table(conn, table_name)]
+    for table_name in migrated:
+        invalidate_table_cache(table_name)
+
+
+def _insert_sql(conn, table_name: str, columns, mode: str):
+    quoted_cols = ", ".join(_quote_identifier(c) for c in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO {_quote_identifier(table_name)} ({quoted_cols}) VALUES ({placeholders})"
+    if mode == 'upsert':
+        if table_name not in TABLE_SCHEMAS:
+            raise ValueError(f"'{table_name}' kayıtlı bir tablo değil, upsert için birincil anahtar gerekli")
+        primary_key = TABLE_SCHEMAS[table_name]["primary_key"]
+        if not primary_key:
+            raise ValueError(f"'{table_name}' tablosunun birincil anahtarı yok, upsert yapılamaz")
+        missing = [c for c in primary_key if c not in columns]
+        if missing:
+            raise ValueError(f"Upsert için birincil anahtar sütunları eksik: {missing}")
+        updates = [c for c in columns if c not in primary_key]
+        conflict = ", ".join(_quote_identifier(c) for c in primary_key)
+        if updates:
+            assignments = ", ".join(f"{_quote_identifier(c)}=excluded.{_quote_identifier(c)}" for c in updates)
+            sql += f" ON CONFLICT ({conflict}) DO UPDATE SET {assignments}"
+        else:
+            sql += f" ON CONFLICT ({conflict}) DO NOTHING"
+    return sql
+
+
+def _bump_table_version(conn, table_name: str):
+    # Yazma ile aynı işlemde artırılır; okuyucular ya eski veriyi ve eski sürümü ya da
+    # ikisinin de yenisini görür
+    conn.execute("CREATE TABLE IF NOT EXISTS table_versions "
+                 "(table_name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    conn.execute("INSERT INTO table_versions (table_name, version) VALUES (?, 1) "
+                 "ON CONFLICT (table_name) DO UPDATE SET version = version + 1", (table_name,))
+
+
+def table_version(conn, table_name: str):
+    """Tablonun ekleme dışı yazma sayacı: 'replace', 'upsert' veya bölüm değiştirme ile
+    var olan satırlar değiştiğinde artar, sadece ekleme (append) yapıldığında değişmez
+
+    Eklemeleri artımlı işleyen özetler (ör. RFM), sürüm değiştiyse baştan hesaplanmalıdır.
+    """
+    if not _table_exists(conn, "table_versions"):
+        return 0
+    row = conn.execute("SELECT version FROM table_versions WHERE table_name=?", (table_name,)).fetchone()
+    return row[0] if row else 0
+
+
+def table_stamp(conn, table_name: str):
+    """Tablonun içeriği değiştiğinde değişen ucuz damga: (table_version, MAX(rowid))
+
+    Eklemeler son rowid'i, diğer yazmalar sürümü değiştirir; tablo taranmaz. Önbellek
+    anahtarlarına eklenerek başka süreçlerin yazmaları da görülür.
+    """
+    last_rowid = conn.execute(f"SELECT MAX(rowid) FROM {_quote_identifier(table_name)}").fetchone()[0]
+    return table_version(conn, table_name), last_rowid
+
+
+def _prepare_table(conn, table_name: str, df: pd.DataFrame, mode: str):
+    """Yazma öncesi tabloyu hazırlar ve INSERT sorgusunu döndürür
+
+    mode: 'replace' (satırları sil, şemayı koru), 'append', 'upsert' veya 'fail'
+    'append' dışındaki modlar tablonun sürümünü (table_version) artırır.
+    """
+    if mode not in ('replace', 'append', 'upsert', 'fail'):
+        raise ValueError(f"Geçersiz yazma modu: {mode}")
+    exists = _table_exists(conn, table_name)
+    if mode == 'fail' and exists:
+        raise ValueError(f"'{table_name}' tablosu zaten mevcut")
+    if mode != 'append':
+        _bump_table_version(conn, table_name)
+
+    if table_name in TABLE_SCHEMAS:
+        ensure_table(conn, table_name, df)
+        if mode == 'replace':
+            conn.execute(f"DELETE FROM {_quote_identifier(table_name)}")
+    else:
+        if mode == 'replace' and exists:
+            conn.execute(f"DROP TABLE {_quote_identifier(table_name)}")
+            exists = False
+        if not exists:
+            conn.execute(pd.io.sql.get_schema(df.head(0), table_name, con=conn))
+        else:
+            # Kayıtsız tabloda yeni sütunlar gelirse eklenir
+            existing = _existing_columns(conn, table_name)
+            for col in df.columns:
+                if col not in existing:
+                    conn.execute(f"ALTER TABLE {_quote_identifier(table_name)} "
+                                 f"ADD COLUMN {_quote_identifier(col)} {_sql_type_for(df[col])}")
+    return _insert_sql(conn, table_name, list(df.columns), mode)
+
 
 def init_database():
-    conn = get_connection()
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            email TEXT,
-            message TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-def save_dataframe(df: pd.DataFrame, table_name: str, mode='replace'):
-    conn = get_connection()
-    df.to_sql(table_name, conn, if_exists=mode, index=False)
-    conn.close()
-
-def read_table(table_name: str):
-    conn = get_connection()
-    df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-    conn.close()
-    return df
+    with write_connection() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS feedback (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                email TEXT,
+                message TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    # Eski sürümde to_sql ile oluşturulmuş tabloları anahtarlı/indeksli şemaya taşı
+    migrate_tables()
+
+def save_dataframe(df: pd.DataFrame, table_name: str, mode='replace', refresh_snapshot=False):
+    """DataFrame'i tabloya yazar
+
+    mode: 'replace' | 'append' | 'upsert' (birincil anahtara göre güncelle/ekle) | 'fail'
+    Kayıtlı tablolarda 'replace' tabloyu düşürmez, sadece satırları siler.
+    Analitik tablolarda yazma sonrası sütunsal anlık görüntü silinir ve ilk sütunsal
+    okumada (read_columns) yeniden oluşturulur; böylece art arda eklemeler tablo
+    boyutunda bir yeniden yazma maliyeti ödemez. refresh_snapshot=True anlık görüntüyü
+    hemen yeniden oluşturur.
+    """
+    with write_connection() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        insert_sql = _prepare_table(conn, table_name, df, mode)
+        for start in range(0, len(df), CSV_CHUNK_ROWS):
+            chunk = df.iloc[start:start + CSV_CHUNK_ROWS]
+            conn.executemany(insert_sql, _chunk_to_rows(chunk))
+    invalidate_table_cache(table_name)
+    if refresh_snapshot:
+        refresh_columnar_snapshot(table_name)
+    else:
+        invalidate_columnar_snapshot(table_name)
+
+def append_dataframe(df: pd.DataFrame, table_name: str, refresh_snapshot=False):
+    save_dataframe(df, table_name, mode='append', refresh_snapshot=refresh_snapshot)
+
+def upsert_dataframe(df: pd.DataFrame, table_name: str, refresh_snapshot=False):
+    save_dataframe(df, table_name, mode='upsert', refresh_snapshot=refresh_snapshot)
+
+def replace_partitions(df: pd.DataFrame, table_name: str, key_columns, refresh_snapshot=False):
+    """df'teki anahtarlara (ör. series_id) ait satırları tek işlemde silip yeniden yazar
+
+    Diğer anahtarların satırlarına dokunulmaz. Sütunsal anlık görüntü save_dataframe'deki
+    gibi silinir ve ilk okumada yeniden oluşturulur.
+    """
+    key_columns = [key_columns] if isinstance(key_columns, str) else list(key_columns)
+    missing = [c for c in key_columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Bölüm anahtarı sütunları eksik: {missing}")
+
+    keys = df[key_columns].drop_duplicates()
+    where = " AND ".join(f"{_quote_identifier(c)}=?" for c in key_columns)
+    with write_connection() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        insert_sql = _prepare_table(conn, table_name, df, 'append')
+        _bump_table_version(conn, table_name)
+        conn.executemany(f"DELETE FROM {_quote_identifier(table_name)} WHERE {where}",
+                         _chunk_to_rows(keys))
+        for start in range(0, len(df), CSV_CHUNK_ROWS):
+            chunk = df.iloc[start:start + CSV_CHUNK_ROWS]
+            conn.executemany(insert_sql, _chunk_to_rows(chunk))
+    invalidate_table_cache(table_name)
+    if refresh_snapshot:
+        refresh_columnar_snapshot(table_name)
+    else:
+        invalidate_columnar_snapshot(table_name)
+
+def delete_partitions(table_name: str, key_column: str, keys):
+    """key_column değeri keys içinde olan satırları tek işlemde siler
+
+    Yeniden yazılamayan bölümlerin (ör. tahmini başarısız seriler) eski satırları
+    tabloda kalmasın diye kullanılır. Silinen satır sayısını döndürür.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return 0
+    with write_connection() as conn:
+        if not _table_exists(conn, table_name):
+            return 0
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        before = conn.total_changes
+        conn.executemany(f"DELETE FROM {_quote_identifier(table_name)} WHERE {_quote_identifier(key_column)}=?",
+                         [(key,) for key in keys])
+        deleted = conn.total_changes - before
+        if deleted:
+            _bump_table_version(conn, table_name)
+    if deleted:
+        invalidate_table_cache(table_name)
+        invalidate_columnar_snapshot(table_name)
+    return deleted
+
+def read_table(table_name: str, columns=None, **query_kwargs):
+    """Tabloyu okur; sütun/filtre parametreleri verilirse query_table'a aktarılır"""
+    query_kwargs.setdefault('parse_dates', False)
+    return query_table(table_name, columns=columns, **query_kwargs)
+
+
+# ----------------------------------------------------------------------------
+# SORGULAMA: SÜTUN SEÇİMİ (PROJECTION) VE FİLTRE (PREDICATE) AKTARIMI
+# ----------------------------------------------------------------------------
+
+# Başka bir süreç tabloya yazarsa önbellekteki sonuç en fazla bu kadar eski kalır
+READ_CACHE_TTL = 300
+
+FILTER_OPERATORS = {
+    '=': '=', '==': '=', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>=',
+    'in': 'IN', 'not in': 'NOT IN', 'between': 'BETWEEN', 'like': 'LIKE',
+}
+
+
+def _quote_identifier(name: str):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def table_exists(table_name: str):
+    with read_connection() as conn:
+        return _table_exists(conn, table_name)
+
+
+def table_signature(table_name: str, columns):
+    """Tablonun içeriği değişti mi anlamak için ucuz bir özet
+
+    Tüm tabloyu özetlemek yerine satır sayısı, son rowid ve sütun toplamları döndürülür;
+    eğitilen modellerin parmak izlerinde kullanılır.
+    """
+    sums = ", ".join(f"SUM({_quote_identifier(c)})" for c in columns)
+    with read_connection() as conn:
+        return tuple(conn.execute(f"SELECT COUNT(*), MAX(rowid), {sums} "
+                                  f"FROM {_quote_identifier(table_name)}").fetchone())
+
+
+def get_table_columns(table_name: str):
+    """Tablonun sütun adlarını tanımlı sırasıyla döndürür"""
+    with read_connection() as conn:
+        rows = conn.execute(f"PRAGMA table_info({_quote_identifier(table_name)})").fetchall()
+    if not rows:
+        raise ValueError(f"'{table_name}' tablosu bulunamadı")
+    return [row[1] for row in rows]
+
+
+def _format_date_bound(value, exclusive_end=False):
+    # Tarihler metin olarak saklandığından karşılaştırma sınırları da aynı biçimde yazılır.
+    # Sadece gün verilmişse 'YYYY-MM-DD' kullanılır: hem 'YYYY-MM-DD' hem de
+    # 'YYYY-MM-DD HH:MM:SS' biçimindeki değerlerle doğru sıralanır.
+    ts = pd.Timestamp(value)
+    if ts == ts.normalize():
+        if exclusive_end:
+            ts = ts + pd.Timedelta(days=1)
+        return ts.strftime('%Y-%m-%d')
+    return ts.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _normalize_filters(filters):
+    # {'col': değer} -> eşitlik, {'col': [..]} -> IN; liste halinde (sütun, operatör, değer) üçlüleri
+    if filters is None:
+        return []
+    if isinstance(filters, dict):
+        normalized = []
+        for col, value in filters.items():
+            if isinstance(value, (list, tuple, set)):
+                normalized.append((col, 'in', list(value)))
+            else:
+                normalized.append((col, '=', value))
+        return normalized
+    return [tuple(f) for f in filters]
+
+
+def build_select_query(table_name: str, columns=None, filters=None, date_range=None,
+                       date_column='date', order_by=None, limit=None, offset=None,
+                       known_columns=None):
+    """Parametreleri parametreli bir SELECT sorgusuna derler: (sql, params)"""
+    def check(col):
+        if known_columns is not None and col not in known_columns:
+            raise ValueError(f"'{table_name}' tablosunda '{col}' sütunu yok")
+        return _quote_identifier(col)
+
+    select_list = ", ".join(check(c) for c in columns) if columns else "*"
+    sql = f"SELECT {select_list} FROM {_quote_identifier(table_name)}"
+
+    clauses, params = [], []
+    for col, op, value in _normalize_filters(filters):
+        sql_op = FILTER_OPERATORS.get(str(op).lower())
+        if sql_op is None:
+            raise ValueError(f"Desteklenmeyen filtre operatörü: {op}")
+        quoted = check(col)
+        if sql_op in ('IN', 'NOT IN'):
+            values = list(value)
+            if not values:
+                # Boş IN listesi: hiçbir satır eşleşmez (NOT IN ise hepsi eşleşir)
+                clauses.append("0" if sql_op == 'IN' else "1")
+                continue
+            clauses.append(f"{quoted} {sql_op} ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        elif sql_op == 'BETWEEN':
+            low, high = value
+            clauses.append(f"{quoted} BETWEEN ? AND ?")
+            params.extend([low, high])
+        elif value is None and sql_op in ('=', '!='):
+            clauses.append(f"{quoted} IS {'NOT ' if sql_op == '!=' else ''}NULL")
+        else:
+            clauses.append(f"{quoted} {sql_op} ?")
+            params.append(value)
+
+    if date_range is not None:
+        start, end = date_range
+        quoted = check(date_column)
+        if start is not None:
+            clauses.append(f"{quoted} >= ?")
+            params.append(_format_date_bound(start))
+        if end is not None:
+            clauses.append(f"{quoted} < ?")
+            params.append(_format_date_bound(end, exclusive_end=True))
+
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+
+    if order_by:
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        terms = []
+        for term in order_by:
+            descending = term.startswith('-')
+            col = term[1:] if descending else term
+            terms.append(f"{check(col)}{' DESC' if descending else ''}")
+        sql += " ORDER BY " + ", ".join(terms)
+
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+        if offset:
+            sql += " OFFSET ?"
+            params.append(int(offset))
+    elif offset:
+        sql += " LIMIT -1 OFFSET ?"
+        params.append(int(offset))
+
+    return sql, params
+
+
+def _iter_query_chunks(sql, params, chunksize, parse_dates):
+    # Okuyucu bağlantı, parçaların tamamı tüketilene kadar ödünç alınmış kalır
+    with read_connection() as conn:
+        for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunksize,
+                                       parse_dates=parse_dates):
+            yield chunk
+
+
+def query_table(table_name: str, columns=None, filters=None, date_range=None,
+                date_column='date', order_by=None, limit=None, offset=None,
+                chunksize=None, parse_dates=None, use_cache=True):
+    """Tablodan yalnızca gereken sütun ve satırları okur
+
+    columns: okunacak sütunlar (None = hepsi)
+    filters: {'sütun': değer} veya [('sütun', '>=', değer), ...]
+    date_range: (başlangıç, bitiş) - bitiş günü dahil
+    order_by: 'sütun' veya ['-sütun', ...] ('-' azalan sıralama)
+    chunksize: verilirse DataFrame yerine parça (chunk) yineleyicisi döner
+    parse_dates: None ise seçilen tarih sütunu datetime'a çevrilir
+    use_cache: sonuç süreç içi önbellekte tutulur (READ_CACHE_TTL saniye); anahtar
+    tablonun damgasını (table_stamp) içerdiğinden başka süreçlerin yazmaları da görülür
+    """
+    known_columns = set(get_table_columns(table_name))
+    sql, params = build_select_query(table_name, columns=columns, filters=filters,
+                                     date_range=date_range, date_column=date_column,
+                                     order_by=order_by, limit=limit, offset=offset,
+                                     known_columns=known_columns)
+
+    if parse_dates is None:
+        selected = columns if columns else known_columns
+        parse_dates = [date_column] if date_column in selected else None
+    elif parse_dates is False:
+        parse_dates = None
+
+    if chunksize:
+        return _iter_query_chunks(sql, params, chunksize, parse_dates)
+
+    if not use_cache:
+        with read_connection() as conn:
+            return pd.read_sql_query(sql, conn, params=params, parse_dates=parse_dates)
+
+    # Aynı sorgu yeniden çalıştırmalarda tekrar veritabanına gitmez. Damga ve sonuç aynı
+    # okuma işleminden gelir: eşzamanlı bir yazmadan önce okunan sonuç eski damgayla
+    # saklanır ve bir daha eşleşmez. Bu süreçteki yazmalar girdileri ayrıca hemen siler
+    # (bkz. invalidate_table_cache)
+    with read_connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            key = "query_table:" + content_hash(os.path.abspath(DB_PATH), sql, params, parse_dates,
+                                                table_stamp(conn, table_name))
+            found, df = default_cache.get(key)
+            if not found:
+                df = pd.read_sql_query(sql, conn, params=params, parse_dates=parse_dates)
+                default_cache.set(key, df, ttl=READ_CACHE_TTL, tags=(_table_cache_tag(table_name),))
+        finally:
+            conn.rollback()
+    return df.copy()
+
+
+def cached_read(name: str, table_names, read_fn, *key_parts):
+    """read_fn(conn) sonucunu tabloların damgasıyla (table_stamp) anahtarlanmış önbellekte tutar
+
+    query_table'daki gibi damga ve sonuç aynı okuma işleminden gelir; başka süreçlerde
+    yapılan yazmalardan sonra eski girdiler eşleşmez. key_parts sorguyu ayırt eder.
+    """
+    table_names = [table_names] if isinstance(table_names, str) else list(table_names)
+    with read_connection() as conn:
+        conn.execute("BEGIN")
+        try:
+            stamps = [table_stamp(conn, t) for t in table_names]
+            key = f"{name}:" + content_hash(os.path.abspath(DB_PATH), key_parts, stamps)
+            found, value = default_cache.get(key)
+            if not found:
+                value = read_fn(conn)
+                default_cache.set(key, value, ttl=READ_CACHE_TTL,
+                                  tags=tuple(_table_cache_tag(t) for t in table_names))
+        finally:
+            conn.rollback()
+    return value
+
+
+def _table_cache_tag(table_name: str):
+    return f"table:{os.path.abspath(DB_PATH)}:{table_name}"
+
+
+def invalidate_table_cache(table_name: str = None):
+    """Tabloya ait önbelleğe alınmış sorgu sonuçlarını siler (None = tümü)"""
+    if table_name is None:
+        default_cache.invalidate()
+    else:
+        default_cache.invalidate(_table_cache_tag(table_name))
+
+
+# ----------------------------------------------------------------------------
+# PARÇALI (CHUNKED) CSV YÜKLEME
+# ----------------------------------------------------------------------------
+
+CSV_CHUNK_ROWS = 50000      # Her parçada okunacak satır sayısı (bellek kullanımını belirler)
+DTYPE_SAMPLE_ROWS = 10000   # Veri tiplerini belirlemek için okunacak örnek satır sayısı
+
+
+def _infer_csv_dtypes(sample: pd.DataFrame):
+    """Örnek parçadan sabit veri tiplerini ve tarih sütunlarını çıkarır"""
+    dtypes = {}
+    date_columns = []
+    for col in sample.columns:
+        series = sample[col]
+        if pd.api.types.is_bool_dtype(series):
+            dtypes[col] = "boolean"
+        elif pd.api.types.is_integer_dtype(series):
+            # Sonraki parçalarda boş değer gelebileceği için nullable tamsayı
+            dtypes[col] = "Int64"
+        elif pd.api.types.is_float_dtype(series):
+            dtypes[col] = "float64"
+        else:
+            non_null = series.dropna()
+            if len(non_null) > 0:
+                try:
+                    pd.to_datetime(non_null, format="ISO8601")
+                    date_columns.append(col)
+                    continue
+                except (ValueError, TypeError):
+                    pass
+            dtypes[col] = "object"
+    return dtypes, date_columns
+
+
+def _chunk_to_rows(chunk: pd.DataFrame, date_columns=None):
+    # Tarihleri to_sql ile aynı biçimde metne çevir, eksik değerleri NULL yap
+    if date_columns is None:
+        date_columns = [c for c in chunk.columns if pd.api.types.is_datetime64_any_dtype(chunk[c])]
+    chunk = chunk.copy()
+    for col in date_columns:
+        # Örnekte tarih görünen sütun sonraki bir parçada ayrıştırılamamış olabilir
+        # (read_csv sütunu metin bırakır): bu parçada çevrilemeyen değerler NULL olur
+        if not pd.api.types.is_datetime64_any_dtype(chunk[col]):
+            chunk[col] = pd.to_datetime(chunk[col], errors='coerce', format="ISO8601")
+        chunk[col] = chunk[col].dt.strftime("%Y-%m-%d %H:%M:%S")
+    chunk = chunk.astype(object).where(chunk.notna(), None)
+    return chunk.itertuples(index=False, name=None)
+
+
+def _table_exists(conn, table_name: str):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table_name,)
+    ).fetchone()
+    return row is not None
+
+
+def _source_size(source):
+    if hasattr(source, "size"):
+        return source.size
+    try:
+        return os.fstat(source.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def bulk_load_csv(source, table_name: str, mode='replace', chunksize=CSV_CHUNK_ROWS,
+                  progress_callback=None, **read_csv_kwargs):
+    """Büyük CSV dosyalarını parça parça okuyup tek işlemde (transaction) tabloya yazar
+
+    progress_callback(rows_loaded, fraction) her parçadan sonra çağrılır;
+    fraction dosya boyutu bilinmiyorsa None olur. Yüklenen toplam satır sayısını döndürür.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        # İlerleme takibi için dosyayı kendimiz açıyoruz
+        with open(source, "rb") as handle:
+            return bulk_load_csv(handle, table_name, mode=mode, chunksize=chunksize,
+                                 progress_callback=progress_callback, **read_csv_kwargs)
+
+    # 1) Veri tiplerini örnek üzerinden bir kez belirle ve kilitle
+    sample = pd.read_csv(source, nrows=DTYPE_SAMPLE_ROWS, **read_csv_kwargs)
+    dtypes, date_columns = _infer_csv_dtypes(sample)
+    columns = list(sample.columns)
+    empty = sample.head(0)
+    del sample
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    total_size = _source_size(source)
+
+    reader = pd.read_csv(source, chunksize=chunksize, dtype=dtypes,
+                         parse_dates=date_columns or False, **read_csv_kwargs)
+
+    rows_loaded = 0
+    with write_connection() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        insert_sql = None
+        with reader:
+            for chunk in reader:
+                if insert_sql is None:
+                    # 2) Tabloyu ilk parçanın şemasıyla hazırla (kayıtlı tablolarda şema kaydı kullanılır)
+                    insert_sql = _prepare_table(conn, table_name, chunk[columns], mode)
+
+                # 3) Parçayı toplu olarak ekle
+                conn.executemany(insert_sql, _chunk_to_rows(chunk[columns], date_columns))
+                rows_loaded += len(chunk)
+
+                if progress_callback is not None:
+                    fraction = None
+                    if total_size and hasattr(source, "tell"):
+                        fraction = min(source.tell() / total_size, 1.0)
+                    progress_callback(rows_loaded, fraction)
+        if insert_sql is None:
+            # Sadece başlık satırı olan dosya: 'replace' tabloyu boşaltır, diğer modlar
+            # tabloyu (yoksa) oluşturur
+            _prepare_table(conn, table_name, empty, mode)
+
+    invalidate_table_cache(table_name)
+    invalidate_columnar_snapshot(table_name)
+    return rows_loaded
+
+
+def _clear_table(conn, table_name: str):
+    # Hiç parça gelmeyen 'replace' yazması da eski satırları bırakmamalı
+    if _table_exists(conn, table_name):
+        _bump_table_version(conn, table_name)
+        conn.execute(f"DELETE FROM {_quote_identifier(table_name)}")
+
+
+def bulk_load_frames(frames, table_name: str, mode='replace', total_rows=None, progress_callback=None):
+    """DataFrame parçalarını (liste veya üreteç) tek işlemde tabloya yazar
+
+    Parçalar sırayla tüketilir, böylece tüm veri hiçbir zaman bellekte birlikte durmaz.
+    progress_callback(rows_loaded, fraction) her parçadan sonra çağrılır; fraction
+    total_rows verilmemişse None olur. Yüklenen toplam satır sayısını döndürür.
+    """
+    rows_loaded = 0
+    with write_connection() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        insert_sql = None
+        for frame in frames:
+            if insert_sql is None:
+                insert_sql = _prepare_table(conn, table_name, frame, mode)
+            conn.executemany(insert_sql, _chunk_to_rows(frame))
+            rows_loaded += len(frame)
+            if progress_callback is not None:
+                fraction = min(rows_loaded / total_rows, 1.0) if total_rows else None
+                progress_callback(rows_loaded, fraction)
+        if insert_sql is None and mode == 'replace':
+            _clear_table(conn, table_name)
+
+    invalidate_table_cache(table_name)
+    invalidate_columnar_snapshot(table_name)
+    return rows_loaded
+
+
+# ----------------------------------------------------------------------------
+# SÜTUNSAL (ARROW IPC) ÖNBELLEK
+# ----------------------------------------------------------------------------
+
+COLUMNAR_CACHE_DIR = "columnar_cache"
+SNAPSHOT_CHUNK_ROWS = 100000
+
+
+def is_columnar_table(table_name: str):
+    return table_name in TABLE_SCHEMAS and TABLE_SCHEMAS[table_name].get("columnar", False)
+
+
+def snapshot_path(table_name: str):
+    # Anlık görüntü, veritabanı dosyasının yanındaki klasörde tutulur
+    base_dir = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), COLUMNAR_CACHE_DIR)
+    db_name = os.path.splitext(os.path.basename(DB_PATH))[0]
+    return os.path.join(base_dir, f"{db_name}.{table_name}.arrow")
+
+
+def _arrow_type_for(sql_type: str):
+    sql_type = (sql_type or "").upper()
+    if "INT" in sql_type:
+        return pa.int64()
+    if "REAL" in sql_type or "FLOA" in sql_type or "DOUB" in sql_type:
+        return pa.float64()
+    if "TIMESTAMP" in sql_type or "DATE" in sql_type:
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def invalidate_columnar_snapshot(table_name: str):
+    try:
+        os.remove(snapshot_path(table_name))
+    except FileNotFoundError:
+        pass
+
+
+def _snapshot_stamp(conn, table_name: str):
+    # Anlık görüntünün hangi tablo durumundan üretildiğini gösterir; yeniden oluşturma
+    # tabloyu zaten taradığından satır sayısı da eklenir
+    count = conn.execute(f"SELECT COUNT(*) FROM {_quote_identifier(table_name)}").fetchone()[0]
+    return (*table_stamp(conn, table_name), count)
+
+
+def refresh_columnar_snapshot(table_name: str):
+    """Analitik tablonun SQLite içeriğini parça parça Arrow IPC dosyasına yazar
+
+    Dosya önce geçici adla yazılır, sonra atomik olarak yerine taşınır; böylece
+    okuyucular hiçbir zaman yarım yazılmış bir dosya görmez. Tablo tek bir okuma
+    işlemi içinde okunur; yeniden oluşturma sürerken başka bir yazma tamamlandıysa
+    dosya eski veriyle bırakılmaz, silinir. Başarılıysa True döner.
+    """
+    if pa is None or not is_columnar_table(table_name):
+        return False
+
+    path = snapshot_path(table_name)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with read_connection() as conn:
+            existing = _existing_columns(conn, table_name)
+            if not existing:
+                invalidate_columnar_snapshot(table_name)
+                return False
+
+            schema = pa.schema([(col, _arrow_type_for(col_type)) for col, (col_type, _) in existing.items()])
+            date_columns = [f.name for f in schema if pa.types.is_timestamp(f.type)]
+            sql, params = build_select_query(table_name, known_columns=set(existing))
+
+            # Damga ve satırlar aynı WAL okuma anlık görüntüsünden gelir
+            conn.execute("BEGIN")
+            try:
+                stamp = _snapshot_stamp(conn, table_name)
+                with pa.OSFile(tmp_path, "wb") as sink:
+                    # Sıkıştırmasız IPC dosyası: bellek eşlemeli (mmap) okumada kopyasız erişim sağlar
+                    with pa.ipc.new_file(sink, schema) as writer:
+                        for chunk in pd.read_sql_query(sql, conn, params=params,
+                                                       chunksize=SNAPSHOT_CHUNK_ROWS,
+                                                       parse_dates=date_columns or None):
+                            for col in date_columns:
+                                chunk[col] = pd.to_datetime(chunk[col], errors="coerce")
+                            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema,
+                                                                          preserve_index=False))
+            finally:
+                conn.rollback()
+
+        os.replace(tmp_path, path)
+        with read_connection() as conn:
+            if _snapshot_stamp(conn, table_name) != stamp:
+                # Okuma sırasında tabloya yazıldı; bir sonraki okuma yeniden oluşturur
+                invalidate_columnar_snapshot(table_name)
+                return False
+        return True
+    except Exception as e:
+        print(f"Sütunsal önbellek yenilenemedi ({table_name}): {e}")
+        invalidate_columnar_snapshot(table_name)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def read_columns(table_name: str, columns=None):
+    """Analitik okumalar için sütunları Arrow anlık görüntüsünden okur
+
+    Dosya bellek eşlemeli açılır, sadece istenen sütunların tamponlarına dokunulur;
+    boş değer içermeyen sayısal sütunlar pandas'a kopyalanmadan aktarılır.
+    Anlık görüntü yoksa bir kez oluşturulur; pyarrow yoksa veya tablo işlemsel ise
+    (ör. feedback) SQLite'tan okunur.
+    """
+    if pa is not None and is_columnar_table(table_name):
+        path = snapshot_path(table_name)
+        if os.path.exists(path) or refresh_columnar_snapshot(table_name):
+            try:
+                with pa.memory_map(path, "r") as source:
+                    table = pa.ipc.open_file(source).read_all()
+                    if columns:
+                        table = table.select(list(columns))
+                    return table.to_pandas(split_blocks=True)
+            except KeyError:
+                raise ValueError(f"'{table_name}' tablosunda istenen sütunlar yok: {columns}")
+            except Exception as e:
+                print(f"Sütunsal önbellek okunamadı, SQLite kullanılıyor ({table_name}): {e}")
+
+    return query_table(table_name, columns=columns)
@@ -0,0 +1,359 @@
+# modules/job_runner.py
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from modules import database_utils as db
+from modules.cache_utils import content_hash
+
+JOB_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+JOB_STALE_SECONDS = 60      # Süreci ölmüş (veya hiç başlamamış) iş bu süreden sonra başarısız sayılır
+JOB_QUEUED_STALE_SECONDS = 6 * 3600     # Kuyruğa alan süreci bilinmeyen/yaşayan işin başlaması için üst sınır
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+_executor = None
+_executor_lock = threading.Lock()
+_futures = {}               # Bu süreçte kuyruğa alınan işlerin future'ları (job_id -> Future)
+_table_ready = set()
+
+
+# ----------------------------------------------------------------------------
+# İŞ TABLOSU
+# ----------------------------------------------------------------------------
+
+def init_job_table():
+    key = (os.getpid(), os.path.abspath(db.DB_PATH))
+    if key in _table_ready:
+        return
+    with db.write_connection() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                job_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress REAL DEFAULT 0,
+                params TEXT,
+                result BLOB,
+                error TEXT,
+                worker_pid INTEGER,
+                submitter_pid INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (job_key, created_at)")
+        # Eski sürümde oluşturulmuş tabloya kuyruğa alan sürecin numarası eklenir (boş: bilinmiyor)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)").fetchall()]
+        if "submitter_pid" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN submitter_pid INTEGER")
+    _table_ready.add(key)
+
+
+def _utc_now():
+    """Tablodaki zaman damgalarıyla aynı saat: SQLite CURRENT_TIMESTAMP gibi UTC"""
+    return pd.Timestamp.now(tz="UTC").strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _update_job(job_id, **fields):
+    fields["updated_at"] = _utc_now()
+    assignments = ", ".join(f"{name}=?" for name in fields)
+    with db.write_connection() as conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id=?", (*fields.values(), job_id))
+
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    columns = ["job_id", "job_type", "job_key", "status", "stage", "progress", "params",
+               "error", "worker_pid", "submitter_pid", "created_at", "updated_at", "finished_at", "has_result"]
+    job = dict(zip(columns, row))
+    job["params"] = json.loads(job["params"]) if job["params"] else {}
+    job["has_result"] = bool(job["has_result"])
+    return job
+
+
+_JOB_SELECT = """
+    SELECT job_id, job_type, job_key, status, stage, progress, params, error, worker_pid, submitter_pid,
+           created_at, updated_at, finished_at, result IS NOT NULL
+    FROM jobs
+"""
+
+
+def _process_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_job(job_id):
+    """İşin durumunu (sonuç hariç) sözlük olarak döndürür"""
+    init_job_table()
+    with db.read_connection() as conn:
+        job = _row_to_job(conn.execute(_JOB_SELECT + " WHERE job_id=?", (job_id,)).fetchone())
+    if job is None:
+        return None
+
+    # Sunucu yeniden başlatıldıysa veya işçi süreç öldüyse iş sonsuza kadar
+    # "kuyrukta" / "çalışıyor" kalmasın
+    error = None
+    if job["status"] == STATUS_QUEUED:
+        future = _futures.get(job_id)
+        if future is not None and future.done():
+            # Havuz çöktüyse iş hiç başlamadan sonlanmış olabilir
+            exception = None if future.cancelled() else future.exception()
+            error = "İş başlatılamadı: " + str(exception or "işçi süreç sonlandı")
+        elif future is None and _queued_job_lost(job):
+            error = "İş başlatılamadan sunucu veya işçi havuzu sonlandı"
+    elif job["status"] == STATUS_RUNNING and not _process_alive(job["worker_pid"]):
+        if _job_age(job) > JOB_STALE_SECONDS:
+            error = "İşçi süreç beklenmedik şekilde sonlandı"
+    if error is not None:
+        _update_job(job_id, status=STATUS_FAILED, error=error, finished_at=_utc_now())
+        job["status"], job["error"] = STATUS_FAILED, error
+    return job
+
+
+def _queued_job_lost(job):
+    # Başka bir sunucu sürecinin kuyruğundaki iş, o süreç yaşadığı sürece beklemede kabul
+    # edilir; bu süreçte future'ı olmayan iş ise artık hiçbir havuzda değildir. Süreç
+    # numarası yeniden kullanılmış olabileceğinden çok uzun bekleyen iş de başarısız sayılır.
+    if _job_age(job) <= JOB_STALE_SECONDS:
+        return False
+    submitter_pid = job["submitter_pid"]
+    if submitter_pid == os.getpid():
+        return True
+    if submitter_pid and not _process_alive(submitter_pid):
+        return True
+    return _job_age(job) > JOB_QUEUED_STALE_SECONDS
+
+
+def _job_age(job):
+    """İşin son güncellemesinden bu yana geçen süre (sn)"""
+    updated_at = pd.Timestamp(job["updated_at"] or job["created_at"]).tz_localize("UTC")
+    return (pd.Timestamp.now(tz="UTC") - updated_at).total_seconds()
+
+
+def find_job(job_type, params_key):
+    """Aynı tip ve parametrelerle oluşturulmuş en son işi bulur (yeniden bağlanmak için)"""
+    init_job_table()
+    with db.read_connection() as conn:
+        row = conn.execute(_JOB_SELECT + " WHERE job_type=? AND job_key=? ORDER BY created_at DESC, rowid DESC LIMIT 1",
+                           (job_type, params_key)).fetchone()
+    job = _row_to_job(row)
+    return get_job(job["job_id"]) if job else None
+
+
+def list_jobs(job_type=None, limit=20):
+    init_job_table()
+    sql = _JOB_SELECT
+    params = []
+    if job_type:
+        sql += " WHERE job_type=?"
+        params.append(job_type)
+    sql += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+    params.append(limit)
+    with db.read_connection() as conn:
+        return [_row_to_job(row) for row in conn.execute(sql, params).fetchall()]
+
+
+def load_job_result(job_id):
+    """Tamamlanmış işin kalıcı sonucunu yükler"""
+    init_job_table()
+    with db.read_connection() as conn:
+        row = conn.execute("SELECT result FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return pickle.loads(row[0])
+
+
+# ----------------------------------------------------------------------------
+# İŞ ÇALIŞTIRMA
+# ----------------------------------------------------------------------------
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 'spawn': Streamlit'in thread'lerini kopyalamadan temiz süreç başlatır
+            _executor = ProcessPoolExecutor(max_workers=JOB_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _run_job(job_id, job_type, db_path, payload):
+    """İşçi süreçte çalışır: ilerlemeyi ve sonucu iş tablosuna yazar"""
+    db.DB_PATH = db_path
+    handler = JOB_HANDLERS[job_type]
+
+    def report(stage, progress):
+        _update_job(job_id, stage=stage, progress=float(progress))
+
+    _update_job(job_id, status=STATUS_RUNNING, worker_pid=os.getpid(), stage="Başlatılıyor", progress=0.0)
+    try:
+        result = handler(report=report, **payload)
+        _update_job(job_id, status=STATUS_DONE, stage="Tamamlandı", progress=1.0,
+                    result=pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL),
+                    finished_at=_utc_now())
+    except Exception as e:
+        _update_job(job_id, status=STATUS_FAILED, error=f"{e}\n{traceback.format_exc()}",
+                    finished_at=_utc_now())
+
+
+def submit_job(job_type, payload, params=None, reuse=True):
+    """İşi arka planda çalıştırmak üzere kuyruğa alır ve job_id döndürür
+
+    payload: işleyiciye aktarılacak argümanlar (DataFrame içerebilir)
+    params: tabloda saklanacak, JSON'a çevrilebilir özet parametreler
+    reuse: aynı içerikli iş kuyrukta/çalışıyor/tamamlanmış ise yenisi açılmaz (başlayamadan
+    kalmış veya süreci ölmüş işler başarısız sayılır ve yeniden çalıştırılır)
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Bilinmeyen iş tipi: {job_type}")
+    init_job_table()
+    params_key = content_hash(job_type, payload)
+
+    if reuse:
+        existing = find_job(job_type, params_key)
+        if existing and existing["status"] in ACTIVE_STATUSES + (STATUS_DONE,):
+            return existing["job_id"]
+
+    job_id = uuid.uuid4().hex
+    with db.write_connection() as conn:
+        conn.execute(
+            "INSERT INTO jobs (job_id, job_type, job_key, status, stage, progress, params, submitter_pid) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, job_type, params_key, STATUS_QUEUED, "Kuyrukta", 0.0,
+             json.dumps(params or {}, default=str), os.getpid()),
+        )
+    _futures[job_id] = _get_executor().submit(_run_job, job_id, job_type, os.path.abspath(db.DB_PATH), payload)
+    # Tamamlanan işlerin future'ları tutulmaz; durum artık tablodan okunur
+    _futures[job_id].add_done_callback(lambda future: _forget_future(job_id, future))
+    return job_id
+
+
+def _forget_future(job_id, future):
+    # Başlayamadan biten işin (ör. havuz çöktü) future'ı get_job hatayı yazana kadar tutulur
+    if not future.cancelled() and future.exception() is None:
+        _futures.pop(job_id, None)
+
+
+def job_key_for(job_type, payload):
+    """submit_job'un kullandığı anahtar: başka oturumların aynı işe bağlanması için"""
+    return content_hash(job_type, payload)
+
+
+# ----------------------------------------------------------------------------
+# İŞ İŞLEYİCİLERİ
+# ----------------------------------------------------------------------------
+
+def _load_sales_source(sales_data, sales_table):
+    # Yüklenen dosyalar işe tablo adıyla verilir; işçi günlük toplamları kendisi okur
+    import veri_analizi as va
+    return sales_data if sales_data is not None else va.load_daily_sales(sales_table)
+
+
+def sales_analysis_job(forecast_days, report, sales_data=None, sales_table=None, source_signature=None,
+                       arima_order=None, ml_mode='standard'):
+    """'Analizi Başlat' işlemi: ayrıştırma, ARIMA tahmini ve ML model eğitimi
+
+    sales_data: günlük satış DataFrame'i veya sales_table: günlük toplamları okunacak tablo
+    (source_signature tablo içeriğinin özetidir, sadece iş anahtarını belirler)
+    arima_order: (p, d, q), 'auto' (paralel derece araması) veya None (varsayılan)
+    ml_mode: train_ml_sales_model eğitim modu ('standard' veya 'fast')
+    """
+    import veri_analizi as va
+    arima_order = arima_order or va.DEFAULT_ARIMA_ORDER
+    sales_data = _load_sales_source(sales_data, sales_table)
+
+    report("Zaman serisi analizi yapılıyor", 0.05)
+    decomposition = va.analyze_time_series(sales_data)
+    if decomposition is None:
+        raise RuntimeError("Zaman serisi ayrıştırılamadı")
+    components = pd.DataFrame({
+        "observed": decomposition.observed,
+        "trend": decomposition.trend,
+        "seasonal": decomposition.seasonal,
+        "resid": decomposition.resid,
+    })
+
+    report(f"{forecast_days} günlük tahmin yapılıyor", 0.35)
+    # Kayıtlı model varsa yeni günler artımlı olarak eklenir, yoksa (veya politika
+    # gerektiriyorsa) model baştan eğitilir; 'auto' ise derece aramasıyla birlikte
+    forecast, update_info = va.update_forecast_model(sales_data, forecast_days, order=arima_order)
+    arima_details = update_info.pop("search", None) or {"order": update_info["order"]}
+    arima_details["update"] = update_info
+    # Sadece toplam satış serisinin tahmini yenilenir; toplu tahminlerin serileri korunur
+    db.replace_partitions(pd.DataFrame({"series_id": va.DEFAULT_SERIES_ID, "date": forecast.index,
+                                        "predicted_sales": forecast.values}),
+                          "arima_forecast", "series_id")
+
+    report("Makine öğrenmesi modelleri eğitiliyor", 0.65)
+    # Modeller model kaydında saklanır; sonuçta sadece kayıt bilgileri tutulur
+    _, _, ml_models = va.train_ml_sales_model(sales_data, return_details=True, mode=ml_mode)
+
+    return {
+        "components": components,
+        "forecast": forecast,
+        "arima_details": arima_details,
+        "ml_models": ml_models,
+    }
+
+
+def sales_backtest_job(horizon, n_folds, report, sales_data=None, sales_table=None, source_signature=None):
+    """ARIMA, RandomForest ve XGBoost için kayan başlangıçlı geriye dönük test"""
+    import veri_analizi as va
+    sales_data = _load_sales_source(sales_data, sales_table)
+
+    report("Katmanlar hazırlanıyor", 0.02)
+
+    def on_progress(done, total):
+        report(f"{done}/{total} model-katman eğitimi tamamlandı", 0.05 + 0.95 * done / total)
+
+    return va.backtest_sales_models(sales_data, horizon=horizon, n_folds=n_folds,
+                                    progress_callback=on_progress)
+
+
+def product_similarity_job(report, incremental=True, top_n=None, catalog_version=None):
+    """Katalogdaki tüm ürünler için benzer ürün tablosunu (artımlı) yeniler
+
+    catalog_version: katalog indeksinin model kimliği; sadece iş anahtarını belirler
+    """
+    from modules import product_index
+
+    report("Benzerlik indeksi hazırlanıyor", 0.02)
+
+    def on_progress(done, total):
+        report(f"{done:,}/{total:,} ürünün benzerleri hesaplandı", 0.05 + 0.95 * done / total)
+
+    return product_index.precompute_similarities(incremental=incremental,
+                                                 top_n=top_n or product_index.SIMILARITY_TOP_N,
+                                                 progress_callback=on_progress)
+
+
+JOB_HANDLERS = {
+    "sales_analysis": sales_analysis_job,
+    "sales_backtest": sales_backtest_job,
+    "product_similarity": product_similarity_job,
+}
@@ -0,0 +1,99 @@
+# modules/lazy_imports.py
+import importlib
+import subprocess
+import sys
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """İlk özellik erişiminde gerçek modülü yükleyen vekil (proxy) modül
+
+    Örnek: xgb = lazy_import("xgboost") -> xgboost ancak xgb.XGBRegressor
+    ilk kez kullanıldığında içe aktarılır.
+    """
+
+    def __init__(self, name, on_load=None):
+        super().__init__(name)
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+        self.__dict__["_lazy_on_load"] = on_load
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with self.__dict__["_lazy_lock"]:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__dict__["_lazy_name"])
+                    on_load = self.__dict__["_lazy_on_load"]
+                    if on_load is not None:
+                        on_load(module)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "yüklendi" if self.__dict__["_lazy_module"] is not None else "henüz yüklenmedi"
+        return f"<LazyModule '{self.__dict__['_lazy_name']}' ({state})>"
+
+
+def lazy_import(name, on_load=None):
+    """Modül zaten yüklüyse doğrudan onu, değilse tembel bir vekil döndürür
+
+    on_load(module): modül ilk yüklendiğinde bir kez çağrılır (ör. uyarı ayarları)
+    """
+    if name in sys.modules:
+        module = sys.modules[name]
+        if on_load is not None:
+            on_load(module)
+        return module
+    return LazyModule(name, on_load=on_load)
+
+
+def is_loaded(module):
+    if isinstance(module, LazyModule):
+        return module.__dict__["_lazy_module"] is not None
+    return True
+
+
+def measure_import_time(statement, repeat=3):
+    """Bir import ifadesinin temiz bir Python sürecindeki süresini (saniye) ölçer
+
+    Her deneme ayrı bir süreçte çalışır, böylece önceden yüklenmiş modüller
+    sonucu etkilemez. En düşük süre döndürülür.
+    """
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"{statement}; "
+        "print(time.perf_counter() - t)"
+    )
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                                text=True, check=True)
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+if __name__ == "__main__":
+    # Başlangıç maliyeti ölçümü: python -m modules.lazy_imports
+    statements = {
+        "Temel (pandas, numpy, matplotlib)": "import pandas, numpy, matplotlib.pyplot",
+        "Eski ağır bağımlılıklar (sklearn, xgboost, statsmodels, seaborn)": (
+            "import pandas, numpy, matplotlib.pyplot, seaborn, xgboost, sklearn.ensemble, "
+            "sklearn.cluster, sklearn.model_selection, statsmodels.tsa.arima.model, "
+            "statsmodels.tsa.seasonal"
+        ),
+        "veri_analizi (tembel yükleme ile)": "import veri_analizi",
+        "veri_analizi + ilk ARIMA kullanımı": "import veri_analizi as va; va.arima_model.ARIMA",
+    }
+    print("İçe aktarma süreleri (en iyi 3 deneme):")
+    for label, statement in statements.items():
+        print(f"  {label:<65} {measure_import_time(statement):6.2f} sn")
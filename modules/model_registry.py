@@ -0,0 +1,236 @@
+# modules/model_registry.py
+import json
+import os
+import threading
+import time
+import uuid
+from importlib import metadata
+
+import joblib
+import pandas as pd
+
+from modules import database_utils as db
+from modules.cache_utils import content_hash
+
+MODEL_STORE_DIR = "model_store"
+MODEL_KEEP_VERSIONS = 3     # Aynı isimli modelden diskte tutulacak en fazla sürüm
+# Parmak izine eklenen kütüphane sürümleri: kütüphane güncellenirse model yeniden eğitilir
+FINGERPRINT_LIBRARIES = ("scikit-learn", "xgboost", "numpy")
+
+_table_ready = set()
+_train_locks = {}
+_train_locks_guard = threading.Lock()
+# Yüklenen modeller bayt sınırlı veri önbelleğinde değil, süreç başına ayrı bir sözlükte
+# tutulur: diskten eşlenen (mmap) dizileri boyut için okunmaz, büyük modeller de
+# önbellekten atılıp her çağrıda yeniden yüklenmez
+_loaded_models = {}
+_loaded_models_lock = threading.Lock()
+
+
+# ----------------------------------------------------------------------------
+# KAYIT TABLOSU
+# ----------------------------------------------------------------------------
+
+def init_model_registry():
+    key = (os.getpid(), os.path.abspath(db.DB_PATH))
+    if key in _table_ready:
+        return
+    with db.write_connection() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS model_registry (
+                model_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                path TEXT NOT NULL,
+                params TEXT,
+                metrics TEXT,
+                size_bytes INTEGER,
+                train_seconds REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_used_at TIMESTAMP
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_model_registry_lookup "
+                     "ON model_registry (name, fingerprint, created_at)")
+    _table_ready.add(key)
+
+
+def model_store_path(name, model_id):
+    # Model dosyaları veritabanı dosyasının yanındaki klasörde tutulur
+    base_dir = os.path.join(os.path.dirname(os.path.abspath(db.DB_PATH)), MODEL_STORE_DIR)
+    return os.path.join(base_dir, f"{name}-{model_id}.joblib")
+
+
+_MODEL_SELECT = """
+    SELECT model_id, name, fingerprint, path, params, metrics, size_bytes, train_seconds,
+           created_at, last_used_at
+    FROM model_registry
+"""
+
+
+def _row_to_model(row):
+    if row is None:
+        return None
+    columns = ["model_id", "name", "fingerprint", "path", "params", "metrics", "size_bytes",
+               "train_seconds", "created_at", "last_used_at"]
+    info = dict(zip(columns, row))
+    info["params"] = json.loads(info["params"]) if info["params"] else {}
+    info["metrics"] = json.loads(info["metrics"]) if info["metrics"] else {}
+    return info
+
+
+def _library_versions():
+    versions = {}
+    for library in FINGERPRINT_LIBRARIES:
+        try:
+            versions[library] = metadata.version(library)
+        except metadata.PackageNotFoundError:
+            versions[library] = None
+    return versions
+
+
+def model_fingerprint(data, params=None):
+    """Eğitim verisi, hiperparametreler ve kütüphane sürümlerinden model parmak izi üretir"""
+    return content_hash(data, params or {}, _library_versions())
+
+
+# ----------------------------------------------------------------------------
+# KAYDETME / BULMA / YÜKLEME
+# ----------------------------------------------------------------------------
+
+def find_model(name, fingerprint):
+    """Aynı isim ve parmak izine sahip, dosyası mevcut en son modelin bilgilerini döndürür"""
+    init_model_registry()
+    with db.read_connection() as conn:
+        rows = conn.execute(_MODEL_SELECT + " WHERE name=? AND fingerprint=? "
+                            "ORDER BY created_at DESC, rowid DESC", (name, fingerprint)).fetchall()
+    for row in rows:
+        info = _row_to_model(row)
+        if os.path.exists(info["path"]):
+            return info
+    return None
+
+
+def get_model_info(model_id):
+    init_model_registry()
+    with db.read_connection() as conn:
+        return _row_to_model(conn.execute(_MODEL_SELECT + " WHERE model_id=?", (model_id,)).fetchone())
+
+
+def list_models(name=None):
+    init_model_registry()
+    sql = _MODEL_SELECT
+    params = []
+    if name:
+        sql += " WHERE name=?"
+        params.append(name)
+    sql += " ORDER BY created_at DESC, rowid DESC"
+    with db.read_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return pd.DataFrame([_row_to_model(row) for row in rows])
+
+
+def register_model(name, model, fingerprint, params=None, metrics=None, train_seconds=None):
+    """Eğitilmiş modeli diske yazar, bilgilerini kayıt tablosuna ekler ve model_id döndürür
+
+    Dosya sıkıştırmasız yazılır; böylece içindeki numpy dizileri yüklenirken
+    bellek eşlemeli (mmap) açılabilir.
+    """
+    init_model_registry()
+    model_id = uuid.uuid4().hex
+    path = model_store_path(name, model_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        joblib.dump(model, tmp_path, compress=0)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    with db.write_connection() as conn:
+        conn.execute(
+            "INSERT INTO model_registry (model_id, name, fingerprint, path, params, metrics, "
+            "size_bytes, train_seconds, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (model_id, name, fingerprint, path, json.dumps(params or {}, default=str),
+             json.dumps(metrics or {}, default=str), os.path.getsize(path), train_seconds,
+             pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S.%f")),
+        )
+    prune_models(name)
+    return model_id
+
+
+def load_model(model_id, mmap=True):
+    """Kayıtlı modeli yükler; süreç içinde bir kez yüklenen model önbellekten döner
+
+    mmap=True ise modeldeki büyük numpy dizileri (ör. ağaç düğümleri) belleğe
+    kopyalanmadan dosyadan eşlenir.
+    """
+    cache_key = (os.path.abspath(db.DB_PATH), model_id, mmap)
+    with _loaded_models_lock:
+        model = _loaded_models.get(cache_key)
+    if model is not None:
+        return model
+
+    info = get_model_info(model_id)
+    if info is None or not os.path.exists(info["path"]):
+        raise ValueError(f"Kayıtlı model bulunamadı: {model_id}")
+    model = joblib.load(info["path"], mmap_mode="r" if mmap else None)
+    with _loaded_models_lock:
+        _loaded_models[cache_key] = model
+
+    with db.write_connection() as conn:
+        conn.execute("UPDATE model_registry SET last_used_at=? WHERE model_id=?",
+                     (pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"), model_id))
+    return model
+
+
+def delete_model(model_id):
+    info = get_model_info(model_id)
+    if info is None:
+        return
+    with db.write_connection() as conn:
+        conn.execute("DELETE FROM model_registry WHERE model_id=?", (model_id,))
+    with _loaded_models_lock:
+        for key in [k for k in _loaded_models if k[1] == model_id]:
+            del _loaded_models[key]
+    try:
+        os.remove(info["path"])
+    except FileNotFoundError:
+        pass
+
+
+def prune_models(name, keep=MODEL_KEEP_VERSIONS):
+    """Aynı isimli modellerin en yeni 'keep' sürümü dışındakileri siler"""
+    models = list_models(name)
+    for model_id in models["model_id"].iloc[keep:] if len(models) else []:
+        delete_model(model_id)
+
+
+def _train_lock(name, fingerprint):
+    with _train_locks_guard:
+        return _train_locks.setdefault((name, fingerprint), threading.Lock())
+
+
+def get_or_train(name, fingerprint, train_fn, params=None, mmap=True):
+    """Parmak izi eşleşen kayıtlı model varsa yükler, yoksa train_fn() ile eğitip kaydeder
+
+    train_fn, modeli veya (model, metrikler) ikilisini döndürmelidir.
+    Dönüş değeri: (model, bilgi); bilgi sözlüğünde 'trained' eğitimin yapılıp yapılmadığını,
+    'seconds' yükleme veya eğitim süresini gösterir.
+    """
+    started = time.perf_counter()
+    # Aynı süreçteki eşzamanlı istekler aynı modeli iki kez eğitmesin
+    with _train_lock(name, fingerprint):
+        info = find_model(name, fingerprint)
+        if info is not None:
+            model = load_model(info["model_id"], mmap=mmap)
+            return model, {**info, "trained": False, "seconds": time.perf_counter() - started}
+
+        result = train_fn()
+        model, metrics = result if isinstance(result, tuple) else (result, None)
+        train_seconds = time.perf_counter() - started
+        model_id = register_model(name, model, fingerprint, params=params, metrics=metrics,
+                                  train_seconds=train_seconds)
+        info = get_model_info(model_id)
+        return model, {**info, "trained": True, "seconds": time.perf_counter() - started}
@@ -0,0 +1,657 @@
+# modules/product_index.py
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from modules import database_utils as db
+from modules.cache_utils import content_hash, default_cache
+
+PRODUCT_TABLE = "products"
+PRODUCT_INDEX_NAME = "product_index"
+# Ekrandaki örnek ürün tabloları için kurulan indeksler ayrı adla kaydedilir; böylece
+# veritabanı kataloğunun indeksinin yerini almazlar
+PRODUCT_DATASET_INDEX_NAME = "product_index_dataset"
+PRODUCT_INDEX_PARAMS = {'vectorizer': 'tfidf', 'stop_words': 'turkish', 'dtype': 'float32'}
+CATALOG_COLUMNS = ['product_id', 'product_name', 'category', 'description']
+
+# Yaklaşık arama (ANN): TF-IDF vektörleri rastgele yönlere izdüşürülür; izdüşümlerin
+# işaretleri (LSH) ürünü kovalara ayırır, sorgu yalnızca kendi kovalarındaki ürünlerle
+# karşılaştırılır
+ANN_INDEX_NAME = "product_ann_index"
+ANN_DATASET_INDEX_NAME = "product_ann_index_dataset"
+# n_bits=None: kova başına ortalama ~4 ürün düşecek şekilde katalog büyüklüğünden seçilir
+ANN_PARAMS = {'n_tables': 32, 'n_bits': None, 'random_state': 42}
+ANN_PROBES = 8          # Her tabloda bakılan kova sayısı: arttıkça isabet (recall) ve gecikme artar
+
+# Tüm katalog için önceden hesaplanan benzer ürün listeleri
+SIMILARITY_TABLE = "product_similarity"
+SIMILARITY_TOP_N = 20
+SIMILARITY_CHUNK_ROWS = 5000            # Bir işçi görevinde hesaplanan ürün sayısı
+SIMILARITY_BLOCK_BYTES = 64 * 2**20     # Bir blokta bellekte tutulan skor matrisinin üst sınırı
+SIMILARITY_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# ----------------------------------------------------------------------------
+# İNDEKS OLUŞTURMA VE YÜKLEME
+# ----------------------------------------------------------------------------
+
+def build_product_index(catalog):
+    """Ürün açıklamalarından benzerlik indeksini kurar
+
+    TF-IDF satırları L2 normlu olduğundan iki ürünün skaler çarpımı kosinüs benzerliğidir.
+    Matris (ürün x terim) sorgu vektörünü almak, devriği (terim x ürün, ters indeks)
+    skorları hesaplamak için tutulur: sorgu yalnızca kendi terimlerini içeren ürünlere dokunur.
+    Dönüş: (indeks, metrikler)
+    """
+    import veri_analizi as va
+
+    vectorizer, matrix = va.fit_tfidf_index(catalog['description'])
+    matrix = matrix.tocsr()
+    product_ids = catalog['product_id'].to_numpy(dtype=np.int64)
+    index = {
+        'vectorizer': vectorizer,
+        'matrix': matrix,
+        'postings': matrix.T.tocsr(),
+        'product_ids': product_ids,
+        # Ürün numarasından satıra ikili arama ile ulaşmak için sıralama
+        'id_order': np.argsort(product_ids, kind='stable'),
+    }
+    metrics = {'products': matrix.shape[0], 'terms': matrix.shape[1], 'nnz': int(matrix.nnz)}
+    return index, metrics
+
+
+def catalog_fingerprint(catalog):
+    """İndeks yalnızca ürün numaraları veya açıklamaları değişince yeniden kurulur"""
+    from modules import model_registry as registry
+
+    return registry.model_fingerprint(content_hash(catalog[['product_id', 'description']]),
+                                      PRODUCT_INDEX_PARAMS)
+
+
+def get_product_index(catalog, name=PRODUCT_INDEX_NAME):
+    """Katalog için kayıtlı indeksi yükler; yoksa kurup model kaydına yazar
+
+    Dosya sıkıştırmasız yazıldığından matris dizileri yüklenirken diskten eşlenir (mmap).
+    Dönüş: (indeks, bilgi)
+    """
+    from modules import model_registry as registry
+
+    catalog = catalog[['product_id', 'description']].reset_index(drop=True)
+    return registry.get_or_train(name, catalog_fingerprint(catalog),
+                                 lambda: build_product_index(catalog), params=PRODUCT_INDEX_PARAMS)
+
+
+def load_catalog(table=PRODUCT_TABLE, columns=CATALOG_COLUMNS):
+    """Ürün kataloğunu indeks satır sırasıyla (ürün numarasına göre) okur"""
+    return db.query_table(table, columns=list(columns), order_by='product_id')
+
+
+def catalog_categories(table=PRODUCT_TABLE):
+    """Katalogdaki kategoriler (tablo değişmedikçe önbellekten)"""
+    categories = db.cached_read("product_index:categories", table, lambda conn: [row[0] for row in conn.execute(
+        f"SELECT DISTINCT category FROM {db._quote_identifier(table)} "
+        f"WHERE category IS NOT NULL ORDER BY category")])
+    return list(categories)
+
+
+def search_catalog(text=None, category=None, limit=200, table=PRODUCT_TABLE):
+    """Ürün adında text geçen (ve kategorisi eşleşen) ilk limit ürün"""
+    filters = []
+    if text:
+        filters.append(('product_name', 'like', f"%{text}%"))
+    if category:
+        filters.append(('category', '=', category))
+    return db.query_table(table, columns=CATALOG_COLUMNS, filters=filters, order_by='product_id',
+                          limit=limit)
+
+
+def product_details(product_ids, table=PRODUCT_TABLE):
+    """Ürünlerin katalog bilgileri, verilen sırayla"""
+    product_ids = [int(p) for p in product_ids]
+    if not product_ids:
+        return pd.DataFrame(columns=CATALOG_COLUMNS)
+    details = db.query_table(table, columns=CATALOG_COLUMNS, filters={'product_id': product_ids})
+    return details.set_index('product_id').reindex(product_ids).reset_index()
+
+
+def load_table_index(table=PRODUCT_TABLE):
+    """Veritabanındaki katalog için indeks; katalog tablosu boşsa veya yoksa None
+
+    Tabloya yazılmadıkça katalog yeniden okunup özetlenmez: hangi indeksin kullanılacağı
+    tablonun damgasıyla (table_stamp) süreç içi önbellekte tutulur.
+    Dönüş: (indeks, bilgi)
+    """
+    from modules import model_registry as registry
+
+    if not db.table_exists(table):
+        return None
+    # Damga katalogdan önce okunur: arada yazılan satırlar en fazla gereksiz bir yeniden
+    # okumaya yol açar, eski katalog yeni damgayla saklanmaz
+    with db.read_connection() as conn:
+        stamp = db.table_stamp(conn, table)
+    key = f"product_index:{content_hash(os.path.abspath(db.DB_PATH), table, stamp)}"
+    found, info = default_cache.get(key)
+    if found:
+        return registry.load_model(info['model_id']), {**info, 'trained': False, 'seconds': 0.0}
+
+    catalog = load_catalog(table, ['product_id', 'description'])
+    if catalog.empty:
+        return None
+    index, info = get_product_index(catalog)
+    default_cache.set(key, info, ttl=db.READ_CACHE_TTL, tags=(db._table_cache_tag(table),))
+    return index, info
+
+
+# ----------------------------------------------------------------------------
+# SORGULAMA
+# ----------------------------------------------------------------------------
+
+def top_k(scores, k, exclude=None):
+    """En yüksek k skorun satırlarını azalan sırada döndürür (eşitlikte önce küçük satır)
+
+    Tüm dizi sıralanmaz: argpartition ile k aday seçilir, yalnızca onlar sıralanır.
+    exclude: sonuçlara girmeyecek satırlar (ör. sorgulanan ürünün kendisi)
+    """
+    scores = np.asarray(scores)
+    n_valid = len(scores)
+    if exclude is not None:
+        exclude = np.unique(exclude)
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+        n_valid -= len(exclude)
+    k = min(k, n_valid)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    # Sınırdaki eşit skorlardan hangisinin seçileceği argpartition'da belirsizdir;
+    # sonuç kararlı olsun diye sınır skorundaki tüm satırlar adaylara eklenir
+    threshold = scores[candidates].min()
+    candidates = np.union1d(candidates, np.flatnonzero(scores == threshold))
+    return candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+
+
+def product_rows(index, product_ids):
+    """Ürün numaralarının indeksteki satırları; bulunamayanlar için -1"""
+    ids, order = index['product_ids'], index['id_order']
+    product_ids = np.atleast_1d(np.asarray(product_ids, dtype=np.int64))
+    if len(ids) == 0:
+        return np.full(len(product_ids), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(ids, product_ids, sorter=order), len(ids) - 1)
+    rows = order[positions]
+    return np.where(ids[rows] == product_ids, rows, -1)
+
+
+def similarity_scores(index, row):
+    """Bir ürünün tüm katalogla kosinüs benzerlikleri (seyrek satır x ters indeks)"""
+    return (index['matrix'][row] @ index['postings']).toarray().ravel()
+
+
+def similar_products(index, product_id, top_n=3):
+    """Ürüne en benzer top_n ürünün satırları ve benzerlik skorları (ürünün kendisi hariç)"""
+    row = product_rows(index, product_id)[0]
+    if row < 0:
+        raise KeyError(f"Ürün indekste bulunamadı: {product_id}")
+    scores = similarity_scores(index, row)
+    rows = top_k(scores, top_n, exclude=row)
+    return rows, scores[rows]
+
+
+# ----------------------------------------------------------------------------
+# YAKLAŞIK ARAMA (LSH)
+# ----------------------------------------------------------------------------
+
+def build_ann_index(index, n_tables=ANN_PARAMS['n_tables'], n_bits=ANN_PARAMS['n_bits'],
+                    random_state=ANN_PARAMS['random_state']):
+    """Tam indeksin TF-IDF matrisinden yaklaşık arama indeksi kurar
+
+    Her tablo n_bits rastgele yön kullanır; bir ürünün kovası, vektörünün bu yönlere
+    izdüşümlerinin işaretleridir. Açısı küçük (kosinüs benzerliği yüksek) ürünler büyük
+    olasılıkla en az bir tabloda aynı kovaya düşer. SVD ile küçültülmüş vektörler
+    kullanılmaz: benzerliği belirleyen seyrek terimler (seri, marka) düşük boyutta kaybolur.
+    Kovalar sıralı kod dizisi olarak tutulur; bir kovanın ürünleri ikili aramayla bulunur.
+    Dönüş: (ann indeksi, metrikler)
+    """
+    matrix = index['matrix']
+    if n_bits is None:
+        n_bits = int(np.clip(round(np.log2(max(matrix.shape[0], 1))) - 2, 6, 24))
+    rng = np.random.default_rng(random_state)
+    projections = rng.standard_normal((matrix.shape[1], n_tables * n_bits)).astype(np.float32)
+    bit_values = np.left_shift(1, np.arange(n_bits, dtype=np.int32))
+    signs = (matrix @ projections) > 0
+
+    codes = np.empty((n_tables, matrix.shape[0]), dtype=np.int32)
+    rows = np.empty((n_tables, matrix.shape[0]), dtype=np.int32)
+    for table in range(n_tables):
+        table_codes = signs[:, table * n_bits:(table + 1) * n_bits] @ bit_values
+        order = np.argsort(table_codes, kind='stable')
+        codes[table], rows[table] = table_codes[order], order
+
+    ann = {'projections': projections, 'bit_values': bit_values, 'codes': codes, 'rows': rows}
+    bucket_counts = [int((np.diff(table_codes) != 0).sum()) + 1 for table_codes in codes]
+    metrics = {'products': matrix.shape[0], 'n_bits': n_bits, 'avg_buckets_per_table': float(np.mean(bucket_counts))}
+    return ann, metrics
+
+
+def get_ann_index(index, index_info, name=ANN_INDEX_NAME, **params):
+    """Tam indekse bağlı yaklaşık arama indeksini yükler; yoksa kurup model kaydına yazar
+
+    Parmak izi tam indeksin parmak izinden türetilir: katalog değişince ikisi birlikte yenilenir.
+    Dönüş: (ann indeksi, bilgi)
+    """
+    from modules import model_registry as registry
+
+    params = {**ANN_PARAMS, **params}
+    fingerprint = registry.model_fingerprint(index_info['fingerprint'], params)
+    return registry.get_or_train(name, fingerprint, lambda: build_ann_index(index, **params),
+                                 params=params)
+
+
+def ann_candidates(ann, query, n_probes=ANN_PROBES):
+    """Sorgu vektörüyle en az bir tabloda aynı (veya yakın) kovaya düşen ürünlerin satırları
+
+    Çoklu yoklama: kendi kovasının yanında, izdüşümü sıfıra en yakın (işareti en belirsiz)
+    bitleri tek tek çevrilmiş n_probes - 1 komşu kovaya da bakılır.
+    """
+    n_tables, n_bits = ann['codes'].shape[0], len(ann['bit_values'])
+    margins = np.asarray(query @ ann['projections']).reshape(n_tables, n_bits)
+    codes = (margins > 0) @ ann['bit_values']
+    flips = np.argsort(np.abs(margins), axis=1)[:, :max(n_probes, 1) - 1]
+
+    found = []
+    for table, code in enumerate(codes):
+        probes = np.concatenate([[code], code ^ ann['bit_values'][flips[table]]])
+        table_codes = ann['codes'][table]
+        starts = np.searchsorted(table_codes, probes, side='left')
+        ends = np.searchsorted(table_codes, probes, side='right')
+        found.extend(ann['rows'][table][start:end] for start, end in zip(starts, ends) if end > start)
+    if not found:
+        return np.empty(0, dtype=np.int32)
+    return np.unique(np.concatenate(found))
+
+
+def ann_similar_products(index, ann, product_id, top_n=3, n_probes=ANN_PROBES):
+    """similar_products'ın yaklaşık sürümü: aynı dönüş biçimi, skorlar tam kosinüs benzerliğidir
+
+    Yalnızca adaylar tam TF-IDF benzerliğiyle puanlanır. Yeterli aday bulunamazsa
+    (ör. çok küçük kataloglarda) tam aramaya düşülür.
+    """
+    row = product_rows(index, product_id)[0]
+    if row < 0:
+        raise KeyError(f"Ürün indekste bulunamadı: {product_id}")
+    query = index['matrix'][row]
+    candidates = ann_candidates(ann, query, n_probes)
+    candidates = candidates[candidates != row]
+    if len(candidates) < top_n:
+        return similar_products(index, product_id, top_n)
+
+    scores = (index['matrix'][candidates] @ query.T).toarray().ravel()
+    best = top_k(scores, top_n)
+    return candidates[best], scores[best]
+
+
+def evaluate_ann(index, ann, k=10, n_queries=200, probe_values=(1, 2, 4, 8, 16), seed=0):
+    """Yaklaşık aramanın tam aramaya göre recall@k değeri ve gecikmesi
+
+    Her n_probes değeri için aynı rastgele ürünler sorgulanır. recall@k: yaklaşık aramanın
+    döndürdüğü k üründen benzerliği tam aramanın k. sonucu kadar yüksek olanların oranı
+    (eşit skorlu ürünlerden hangisinin döndüğü isabeti değiştirmez).
+    Dönüş: n_probes başına bir satır içeren DataFrame (ilk satır tam arama)
+    """
+    rng = np.random.default_rng(seed)
+    product_ids = rng.choice(index['product_ids'], size=min(n_queries, len(index['product_ids'])),
+                             replace=False)
+    thresholds = {}
+    latencies = []
+    for product_id in product_ids:
+        started = time.perf_counter()
+        _, scores = similar_products(index, product_id, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        thresholds[product_id] = (scores[-1] if len(scores) else np.inf, len(scores))
+    results = [{'mode': 'exact', 'n_probes': None, f'recall@{k}': 1.0, **_latency_stats(latencies)}]
+
+    for n_probes in probe_values:
+        latencies, hits, total = [], 0, 0
+        for product_id in product_ids:
+            started = time.perf_counter()
+            _, scores = ann_similar_products(index, ann, product_id, k, n_probes=n_probes)
+            latencies.append((time.perf_counter() - started) * 1000)
+            threshold, expected = thresholds[product_id]
+            hits += int((scores >= threshold - 1e-6).sum())
+            total += expected
+        results.append({'mode': 'ann', 'n_probes': n_probes, f'recall@{k}': hits / max(total, 1),
+                        **_latency_stats(latencies)})
+    return pd.DataFrame(results)
+
+
+# ----------------------------------------------------------------------------
+# TOPLU BENZERLİK TABLOSU
+# ----------------------------------------------------------------------------
+
+def description_hashes(catalog):
+    """Açıklama başına 64 bitlik özet: değişen açıklamaları bulmak için tabloda saklanır"""
+    return pd.util.hash_pandas_object(catalog['description'], index=False).to_numpy().view(np.int64)
+
+
+def _block_rows(n_products, n_terms):
+    # Bir blokta (blok x katalog) boyutunda yoğun skor matrisi, aynı boyutta seçim
+    # dizileri (hücre başına ~12 byte) ve bloğun yoğun TF-IDF vektörleri oluşur
+    return max(1, SIMILARITY_BLOCK_BYTES // (12 * max(n_products, 1) + 4 * n_terms))
+
+
+def block_top_n(index, rows, top_n=SIMILARITY_TOP_N):
+    """Verilen satırların her biri için en benzer top_n ürün (ürünün kendisi hariç)
+
+    Skorlar bloklar halinde hesaplanır; tam benzerlik matrisi hiçbir zaman oluşmaz.
+    Dönüş: (komşu satırları, skorlar) - her ikisi (len(rows), k) boyutunda
+    """
+    matrix = index['matrix']
+    n_products = matrix.shape[0]
+    k = min(top_n, n_products - 1)
+    rows = np.asarray(rows, dtype=np.int64)
+    neighbors = np.empty((len(rows), max(k, 0)), dtype=np.int64)
+    neighbor_scores = np.empty((len(rows), max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return neighbors, neighbor_scores
+
+    block = _block_rows(n_products, matrix.shape[1])
+    for start in range(0, len(rows), block):
+        block_rows = rows[start:start + block]
+        # Blok çıktısı neredeyse yoğun olduğundan seyrek x yoğun çarpım daha hızlıdır
+        scores = np.ascontiguousarray((matrix @ matrix[block_rows].toarray().T).T)
+        scores[np.arange(len(block_rows)), block_rows] = -np.inf
+        candidates = np.argpartition(scores, n_products - k, axis=1)[:, n_products - k:]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+        # Sınırdaki (k. skora) eşit skorlardan hangilerinin seçileceği argpartition'da
+        # belirsizdir; bu satırlarda küçük satır numaraları seçilir (top_k ile aynı sonuç)
+        threshold = candidate_scores.min(axis=1, keepdims=True)
+        ambiguous = np.flatnonzero((scores == threshold).sum(axis=1) > (candidate_scores == threshold).sum(axis=1))
+        if len(ambiguous):
+            part, part_threshold = scores[ambiguous], threshold[ambiguous]
+            above = part > part_threshold
+            ties = part == part_threshold
+            tie_rank = np.cumsum(ties, axis=1, dtype=np.int32)
+            selected = above | (ties & (tie_rank <= k - above.sum(axis=1, keepdims=True)))
+            candidates[ambiguous] = np.nonzero(selected)[1].reshape(len(ambiguous), k)
+            candidate_scores[ambiguous] = np.take_along_axis(part, candidates[ambiguous], axis=1)
+
+        # Azalan skor sırası; eşit skorlarda küçük satır önce
+        order = np.argsort(candidates, axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        neighbors[start:start + len(block_rows)] = np.take_along_axis(candidates, order, axis=1)
+        neighbor_scores[start:start + len(block_rows)] = np.take_along_axis(candidate_scores, order, axis=1)
+    return neighbors, neighbor_scores
+
+
+def _similarity_frame(index, rows, row_hashes, top_n):
+    neighbors, scores = block_top_n(index, rows, top_n)
+    product_ids = index['product_ids']
+    k = neighbors.shape[1]
+    return pd.DataFrame({
+        'product_id': np.repeat(product_ids[rows], k),
+        'rank': np.tile(np.arange(1, k + 1), len(rows)),
+        'similar_product_id': product_ids[neighbors.ravel()],
+        'score': scores.ravel().astype(float),
+        'source_hash': np.repeat(row_hashes, k),
+    })
+
+
+_worker_indexes = {}
+
+
+def _similarity_chunk(index_path, rows, row_hashes, top_n):
+    """İşçi süreçte çalışır: indeks dosyasını mmap ile (kopyalamadan) açar
+
+    Model kaydı tablosuna dokunulmaz; ana süreç sonuçları yazarken veritabanı kilitli olabilir.
+    """
+    import joblib
+
+    if index_path not in _worker_indexes:
+        _worker_indexes[index_path] = joblib.load(index_path, mmap_mode="r")
+    return _similarity_frame(_worker_indexes[index_path], rows, row_hashes, top_n)
+
+
+def _iter_similarity_frames(index, index_path, rows, hashes, top_n, workers, progress_callback=None):
+    """Satırları parçalara bölüp (gerekirse) işçi süreçlerde hesaplar; parçaları bitiş sırasıyla verir"""
+    chunks = [rows[start:start + SIMILARITY_CHUNK_ROWS] for start in range(0, len(rows), SIMILARITY_CHUNK_ROWS)]
+    done = 0
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            frame = _similarity_frame(index, chunk, hashes[chunk], top_n)
+            done += len(chunk)
+            if progress_callback is not None:
+                progress_callback(done, len(rows))
+            yield frame
+        return
+
+    # 'spawn': Streamlit'in thread'lerini kopyalamadan temiz süreç başlatır
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {executor.submit(_similarity_chunk, index_path, chunk, hashes[chunk], top_n): len(chunk)
+                   for chunk in chunks}
+        for future in as_completed(futures):
+            done += futures[future]
+            if progress_callback is not None:
+                progress_callback(done, len(rows))
+            yield future.result()
+
+
+def _stored_similarity_state(target):
+    """Tablodaki her ürünün liste özeti, liste uzunluğu ve en düşük (son sıradaki) skoru"""
+    with db.read_connection() as conn:
+        return pd.read_sql_query(
+            f"SELECT product_id, MIN(source_hash) AS source_hash, COUNT(*) AS n_similar, "
+            f"MIN(score) AS min_score FROM {db._quote_identifier(target)} GROUP BY product_id", conn)
+
+
+def _rows_referencing(target, product_ids):
+    """Listesinde verilen ürünlerden biri bulunan ürünler"""
+    found = []
+    product_ids = [int(p) for p in product_ids]
+    with db.read_connection() as conn:
+        for start in range(0, len(product_ids), 900):
+            part = product_ids[start:start + 900]
+            placeholders = ", ".join("?" * len(part))
+            found.extend(row[0] for row in conn.execute(
+                f"SELECT DISTINCT product_id FROM {db._quote_identifier(target)} "
+                f"WHERE similar_product_id IN ({placeholders})", part))
+    return np.array(found, dtype=np.int64)
+
+
+def _rows_reached_by(index, changed_rows, thresholds):
+    """Değişen ürünlerden birine benzerliği kendi listesinin son skorundan yüksek olan satırlar"""
+    matrix = index['matrix']
+    changed_vectors = matrix[changed_rows].T.tocsc()
+    reached = []
+    block = max(1, SIMILARITY_BLOCK_BYTES // (4 * max(len(changed_rows), 1)))
+    for start in range(0, matrix.shape[0], block):
+        scores = (matrix[start:start + block] @ changed_vectors).toarray()
+        best = scores.max(axis=1) if scores.shape[1] else np.full(len(scores), -np.inf)
+        reached.append(start + np.flatnonzero(best > thresholds[start:start + block]))
+    return np.concatenate(reached) if reached else np.empty(0, dtype=np.int64)
+
+
+def precompute_similarities(catalog=None, table=PRODUCT_TABLE, target=SIMILARITY_TABLE,
+                            top_n=SIMILARITY_TOP_N, incremental=True, workers=SIMILARITY_WORKERS,
+                            progress_callback=None):
+    """Katalogdaki her ürünün en benzer top_n ürününü target tablosuna yazar
+
+    catalog verilmezse katalog table tablosundan okunur (ör. create_tech_product_data()
+    çıktısı da verilebilir). Satırlar SIMILARITY_CHUNK_ROWS'luk parçalar halinde işçi
+    süreçlerde hesaplanır; her işçi kayıtlı indeksi diskten eşleyerek açar.
+
+    incremental=True ise yalnızca etkilenen ürünlerin listeleri yeniden hesaplanır:
+    açıklaması değişen veya yeni ürünler, listesinde değişen/silinen bir ürün bulunanlar
+    ve değişen bir ürüne benzerliği listesinin son skorunu geçenler. Açıklama değişince
+    IDF ağırlıkları da biraz değişir; diğer listelerin skorları bu yüzden güncellenmez
+    (tam yenileme için incremental=False).
+    progress_callback(hesaplanan_ürün, toplam) her parçadan sonra çağrılır.
+    Dönüş: özet sözlüğü
+    """
+    started = time.perf_counter()
+    if catalog is None:
+        catalog = load_catalog(table, ['product_id', 'description'])
+        index_name = PRODUCT_INDEX_NAME
+    else:
+        index_name = PRODUCT_DATASET_INDEX_NAME
+    catalog = catalog[['product_id', 'description']].reset_index(drop=True)
+    if catalog.empty:
+        raise ValueError("Benzerlik tablosu için katalogda ürün bulunamadı")
+    index, index_info = get_product_index(catalog, name=index_name)
+    hashes = description_hashes(catalog)
+    product_ids = index['product_ids']
+    k = min(top_n, len(product_ids) - 1)
+
+    mode = 'full'
+    rows = np.arange(len(product_ids))
+    removed = np.empty(0, dtype=np.int64)
+    if incremental and db.table_exists(target):
+        state = _stored_similarity_state(target)
+        # Liste uzunluğu değiştiyse (ör. top_n farklı) tümü yeniden hesaplanır
+        if not state.empty and (state['n_similar'] == k).all():
+            mode = 'incremental'
+            stored = state.set_index('product_id')
+            stored_rows = product_rows(index, stored.index.to_numpy())
+            removed = stored.index.to_numpy()[stored_rows < 0]
+
+            known = np.zeros(len(product_ids), dtype=bool)
+            known[stored_rows[stored_rows >= 0]] = True
+            same_hash = np.zeros(len(product_ids), dtype=bool)
+            same_hash[stored_rows[stored_rows >= 0]] = (
+                stored['source_hash'].to_numpy()[stored_rows >= 0] == hashes[stored_rows[stored_rows >= 0]])
+            changed = np.flatnonzero(~(known & same_hash))
+
+            affected = [changed]
+            if len(changed) or len(removed):
+                referencing = product_rows(index, _rows_referencing(
+                    target, np.concatenate([product_ids[changed], removed])))
+                affected.append(referencing[referencing >= 0])
+            if len(changed):
+                thresholds = np.full(len(product_ids), -np.inf)
+                thresholds[stored_rows[stored_rows >= 0]] = stored['min_score'].to_numpy()[stored_rows >= 0]
+                affected.append(_rows_reached_by(index, changed, thresholds))
+            rows = np.unique(np.concatenate(affected)).astype(np.int64)
+
+    workers = max(1, min(workers, -(-len(rows) // SIMILARITY_CHUNK_ROWS)))
+    frames = _iter_similarity_frames(index, index_info['path'], rows, hashes, top_n, workers,
+                                     progress_callback)
+    written = 0
+    if mode == 'full':
+        written = db.bulk_load_frames(frames, target, mode='replace', total_rows=len(rows) * k)
+    else:
+        if len(removed):
+            # Sürüm artırılır; okuyan süreçlerin önbellek girdileri eşleşmez olur
+            db.delete_partitions(target, 'product_id', [int(p) for p in removed])
+        for frame in frames:
+            db.replace_partitions(frame, target, 'product_id', refresh_snapshot=False)
+            written += len(frame)
+
+    seconds = time.perf_counter() - started
+    return {
+        'mode': mode,
+        'products': len(product_ids),
+        'recomputed': len(rows),
+        'removed': len(removed),
+        'rows': written,
+        'workers': workers,
+        'model_id': index_info['model_id'],
+        'seconds': seconds,
+        'products_per_second': len(rows) / seconds if seconds > 0 and len(rows) else None,
+    }
+
+
+def load_similar_products(product_id, top_n=SIMILARITY_TOP_N, offset=0, target=SIMILARITY_TABLE):
+    """Önceden hesaplanmış benzer ürün listesini sırasıyla okur (sayfalama için offset)"""
+    return db.query_table(target, columns=['rank', 'similar_product_id', 'score'],
+                          filters={'product_id': int(product_id)}, order_by='rank',
+                          limit=top_n, offset=offset)
+
+
+# ----------------------------------------------------------------------------
+# GECİKME ÖLÇÜMÜ
+# ----------------------------------------------------------------------------
+
+def _latency_stats(latencies):
+    latencies = np.asarray(latencies)
+    return {
+        'queries': len(latencies),
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+    }
+
+
+def benchmark_queries(index, n_queries=200, top_n=10, seed=0):
+    """Rastgele ürünler için sorgu gecikmesi (milisaniye): ortalama, p50, p95, p99"""
+    rng = np.random.default_rng(seed)
+    product_ids = rng.choice(index['product_ids'], size=min(n_queries, len(index['product_ids'])),
+                             replace=False)
+    latencies = []
+    for product_id in product_ids:
+        started = time.perf_counter()
+        similar_products(index, product_id, top_n)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return _latency_stats(latencies)
+
+
+if __name__ == "__main__":
+    # İndeks kurulum süresi, sorgu gecikmeleri, yaklaşık aramanın isabeti ve toplu
+    # benzerlik tablosu: python -m modules.product_index
+    import tempfile
+
+    import veri_analizi as va
+    from modules.lazy_imports import lazy_import
+
+    sk_pairwise = lazy_import('sklearn.metrics.pairwise')
+
+    for n_products in (10_000, 100_000, 500_000):
+        catalog = pd.concat(va.generate_product_catalog(n_products), ignore_index=True)
+
+        started = time.perf_counter()
+        index, metrics = build_product_index(catalog)
+        build_seconds = time.perf_counter() - started
+        stats = benchmark_queries(index)
+        print(f"{n_products:>9,} ürün | kurulum: {build_seconds:6.2f} sn | "
+              f"{metrics['terms']:,} terim, {metrics['nnz']:,} dolu hücre | "
+              f"sorgu p50: {stats['p50_ms']:.2f} ms, p95: {stats['p95_ms']:.2f} ms")
+
+        if n_products <= 10_000:
+            # Eski yöntem: her sorguda tam kosinüs matrisi ve tüm satırın sıralanması
+            latencies = []
+            for product_id in catalog['product_id'].sample(5, random_state=0):
+                started = time.perf_counter()
+                _, matrix = va.fit_tfidf_index(catalog['description'])
+                cosine_sim = sk_pairwise.linear_kernel(matrix, matrix)
+                row = int(np.flatnonzero(catalog['product_id'].to_numpy() == product_id)[0])
+                sorted(enumerate(cosine_sim[row]), key=lambda x: x[1], reverse=True)[1:11]
+                latencies.append((time.perf_counter() - started) * 1000)
+            print(f"{n_products:>9,} ürün | eski yöntem (tam matris): sorgu başına "
+                  f"{np.median(latencies):,.0f} ms")
+
+        started = time.perf_counter()
+        ann, _ = build_ann_index(index)
+        print(f"{n_products:>9,} ürün | yaklaşık arama indeksi kurulumu: {time.perf_counter() - started:.2f} sn")
+        print(evaluate_ann(index, ann).round(3).to_string(index=False))
+
+    # Toplu benzerlik tablosu geçici bir veritabanında: tam hesaplama ve artımlı yenileme
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.DB_PATH = os.path.join(tmp_dir, "benchmark.db")
+        n_products = 20_000
+        va.write_synthetic_data('products', n_products=n_products)
+        for workers in sorted({1, SIMILARITY_WORKERS}):
+            summary = precompute_similarities(incremental=False, workers=workers)
+            print(f"{n_products:>9,} ürün | benzerlik tablosu ({workers} işçi): {summary['seconds']:.1f} sn, "
+                  f"{summary['products_per_second']:,.0f} ürün/sn")
+
+        changed = load_catalog().sample(20, random_state=0)
+        changed['description'] = changed['description'] + ' yenilenmiş model'
+        db.upsert_dataframe(changed, PRODUCT_TABLE)
+        summary = precompute_similarities()
+        print(f"{n_products:>9,} ürün | 20 açıklama değişti, artımlı yenileme: {summary['recomputed']:,} "
+              f"ürün yeniden hesaplandı, {summary['seconds']:.1f} sn")
+        db.close_pools()
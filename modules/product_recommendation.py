@@ -1,51 +1,177 @@
 import streamlit as st
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
-
-def product_recommendation()
-    st.subheader(📱 Teknolojik Ürün Öneri Motoru)
-
-    # Ürün veri seti
-    df = pd.DataFrame({
-        'product_id' [101, 102, 103, 104, 105, 106, 107],
-        'product_name' [
-            'Gaming Laptop', 'Ultrabook', 'Akıllı Telefon',
-            'Tablet', 'Masaüstü Bilgisayar', 'Kulaklık', 'Akıllı Saat'
-        ],
-        'description' [
-            'Intel i7 işlemci, 16GB RAM, NVIDIA RTX 3060 ekran kartı, 1TB SSD ile yüksek performanslı oyun deneyimi.',
-            'Intel i5 işlemci, 8GB RAM, hafif tasarım, 512GB SSD, uzun pil ömrü ile taşınabilirlik odaklı.',
-            'Snapdragon işlemci, 128GB hafıza, 6.5 inç ekran, Android 13, 5000mAh batarya ile güçlü akıllı telefon.',
-            '10.1 inç ekran, 4GB RAM, 64GB depolama, hafif ve taşınabilir, Android tabanlı tablet.',
-            'Ryzen 5 işlemci, 32GB RAM, 2TB SSD, 4K destekli ekran kartı ile ofis ve oyun için masaüstü bilgisayar.',
-            'Kablosuz bluetooth kulaklık, aktif gürültü engelleme, 40 saat pil ömrü.',
-            '1.43 inç AMOLED ekran, kalp ritmi takibi, adım sayar, 7 gün pil ömrü ile akıllı saat.'
-        ]
-    })
-
-    # Ürün seçimi
-    selected_product = st.selectbox(Bir ürün seçin, df['product_name'].tolist())
-    selected_id = df[df['product_name'] == selected_product]['product_id'].values[0]
+import sys
+import os
+import time
+
+# Ana dizini Python yolu ekle
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    import veri_analizi as va
+except:
+    st.error("veri_analizi.py dosyası bulunamadı! Ana dizinde bulunduğundan emin olun.")
+
+from modules.database_utils import table_exists, save_dataframe
+from modules.job_runner import submit_job, get_job, list_jobs
+from modules.product_index import (PRODUCT_TABLE, SIMILARITY_TABLE, SIMILARITY_TOP_N, ANN_PROBES,
+                                   load_table_index, get_ann_index, similar_products, ann_similar_products,
+                                   load_similar_products, catalog_categories, search_catalog, product_details)
+
+RECOMMENDATION_MAX_RESULTS = 100    # Sayfalanarak gösterilebilecek en fazla öneri
+PRODUCT_SEARCH_LIMIT = 200          # Ürün seçim listesinde gösterilecek en fazla ürün
+
+SEARCH_MODES = ["Tam arama", "Yaklaşık arama (LSH)", "Önceden hesaplanmış liste"]
+
+
+@st.fragment(run_every=1)
+def show_similarity_job(job_id):
+    """Benzerlik tablosu işinin ilerlemesini saniyede bir günceller"""
+    job = get_job(job_id)
+    if job is None or job['status'] not in ('queued', 'running'):
+        st.rerun()
+    st.progress(min(job['progress'] or 0.0, 1.0), text=job['stage'] or "Kuyrukta")
+
+
+def _latest_similarity_job():
+    # Başka bir oturumda başlatılmış iş de dikkate alınır
+    jobs = list_jobs("product_similarity", limit=1)
+    return get_job(jobs[0]['job_id']) if jobs else None
+
+
+def _similarity_job_section(index_info):
+    st.write("### Benzer Ürün Tablosu")
+    st.write("""
+    Tüm katalog için en benzer ürünler arka planda önceden hesaplanıp veritabanına yazılır;
+    sonraki güncellemelerde yalnızca açıklaması değişen ürünlerden etkilenen listeler yenilenir.
+    """)
+    job = _latest_similarity_job()
+    running = job is not None and job['status'] in ('queued', 'running')
+    # Aynı tabloya yazan iki iş aynı anda çalışmasın: iş sürerken düğme kapalıdır ve iş
+    # katalog sürümüyle anahtarlanır, değişmemiş katalog için tamamlanmış iş yeniden kullanılır
+    if st.button("Benzer Ürün Tablosunu Güncelle", disabled=running):
+        submit_job("product_similarity", {"incremental": True, "catalog_version": index_info['model_id']},
+                   params={"top_n": SIMILARITY_TOP_N})
+        st.rerun()
+
+    if job is None:
+        return
+    if job['status'] in ('queued', 'running'):
+        st.info("Benzer ürünler hesaplanıyor...")
+        show_similarity_job(job['job_id'])
+    elif job['status'] == 'failed':
+        error_summary = (job['error'] or "").strip().splitlines()
+        st.error(f"Benzerlik tablosu oluşturulamadı: {error_summary[0] if error_summary else 'bilinmeyen hata'}")
+    else:
+        st.caption(f"Son güncelleme: {job['finished_at']} (UTC)")
+
+
+def product_recommendation():
+    st.subheader("📱 Teknolojik Ürün Öneri Motoru")
+
+    st.write("""
+    Ürün açıklamalarının TF-IDF benzerliğine göre seçilen ürüne en çok benzeyen ürünleri bulun.
+    """)
+
+    if not table_exists(PRODUCT_TABLE):
+        st.info("Veritabanında ürün kataloğu (products tablosu) bulunamadı.")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Örnek Kataloğu Yükle"):
+                save_dataframe(va.create_tech_product_data(), PRODUCT_TABLE)
+                st.rerun()
+        with col2:
+            if st.button("Büyük Yapay Katalog Oluştur (50.000 ürün)"):
+                with st.spinner("Yapay katalog oluşturuluyor..."):
+                    va.write_synthetic_data('products', n_products=50000)
+                st.rerun()
+        return
+
+    # İndeks katalog başına bir kez kurulup model kaydında saklanır; ürün seçimi veya
+    # sayfa değişimi hiçbir şeyi yeniden eğitmez (bkz. modules/product_index.py)
+    with st.spinner("Benzerlik indeksi hazırlanıyor..."):
+        result = load_table_index()
+    if result is None:
+        st.info("Ürün kataloğu boş.")
+        return
+    index, index_info = result
+    if index_info['trained']:
+        st.caption(f"Benzerlik indeksi oluşturuldu ({index_info['seconds']:.2f} sn)")
+
+    # Büyük katalogda ürün, ad araması ve kategoriyle daraltılmış listeden seçilir
+    col1, col2 = st.columns(2)
+    with col1:
+        category = st.selectbox("Kategori", ["Tümü"] + catalog_categories(), key="product_category")
+    with col2:
+        search_text = st.text_input("Ürün adında ara", key="product_search")
+    candidates = search_catalog(search_text.strip() or None, None if category == "Tümü" else category,
+                                limit=PRODUCT_SEARCH_LIMIT)
+    if candidates.empty:
+        st.warning("Aramaya uyan ürün bulunamadı.")
+        return
+    if len(candidates) == PRODUCT_SEARCH_LIMIT:
+        st.caption(f"İlk {PRODUCT_SEARCH_LIMIT} ürün listeleniyor; daha fazlası için aramayı daraltın.")
+
+    labels = dict(zip(candidates['product_id'], candidates['product_name']))
+    selected_id = st.selectbox("Bir ürün seçin", list(labels), format_func=lambda p: f"{labels[p]} (#{p})",
+                               key="product_selected")
 
     # Seçilen ürün bilgisi
-    st.markdown(### 🔍 Seçilen Ürün)
-    st.write(df[df['product_id'] == selected_id][['product_name', 'description']])
+    st.markdown("### 🔍 Seçilen Ürün")
+    st.dataframe(candidates[candidates['product_id'] == selected_id][['product_name', 'category', 'description']],
+                 hide_index=True)
 
-    # TF-IDF ve benzerlik hesaplama
-    tfidf = TfidfVectorizer(stop_words='turkish')
-    tfidf_matrix = tfidf.fit_transform(df['description'])
-    cosine_sim = linear_kernel(tfidf_matrix, tfidf_matrix)
+    # Arama yöntemi ve sayfalama
+    modes = SEARCH_MODES if table_exists(SIMILARITY_TABLE) else SEARCH_MODES[:2]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        mode = st.radio("Arama Yöntemi", modes, key="product_search_mode")
+    with col2:
+        page_size = st.selectbox("Sayfa Başına Öneri", [10, 20, 50], key="product_page_size")
+    max_results = SIMILARITY_TOP_N if mode == SEARCH_MODES[2] else RECOMMENDATION_MAX_RESULTS
+    max_results = max(1, min(max_results, len(index['product_ids']) - 1))
+    n_pages = max(1, -(-max_results // page_size))
+    with col3:
+        page = st.number_input("Sayfa", min_value=1, max_value=n_pages, value=1, step=1, key="product_page")
+    offset = (page - 1) * page_size
 
-    # Önerileri getir
-    idx = df.index[df['product_id'] == selected_id][0]
-    sim_scores = list(enumerate(cosine_sim[idx]))
-    sim_scores = sorted(sim_scores, key=lambda x x[1], reverse=True)
-    sim_scores = sim_scores[14]  # İlk kendisi, sonra en benzer 3
+    n_probes = ANN_PROBES
+    if mode == SEARCH_MODES[1]:
+        n_probes = st.slider("Yoklanan Kova Sayısı (daha fazlası: daha isabetli, daha yavaş)", 1, 16, ANN_PROBES,
+                             key="product_probes")
 
-    product_indices = [i[0] for i in sim_scores]
-    recommended = df.iloc[product_indices][['product_name', 'description']]
+    try:
+        started = time.perf_counter()
+        if mode == SEARCH_MODES[2]:
+            stored = load_similar_products(selected_id, top_n=page_size, offset=offset)
+            product_ids, scores = stored['similar_product_id'].tolist(), stored['score'].tolist()
+        else:
+            # İlk sayfalar için yalnızca gereken kadar aday sıralanır
+            top_n = min(offset + page_size, max_results)
+            if mode == SEARCH_MODES[1]:
+                ann, _ = get_ann_index(index, index_info)
+                rows, scores = ann_similar_products(index, ann, selected_id, top_n, n_probes=n_probes)
+            else:
+                rows, scores = similar_products(index, selected_id, top_n)
+            product_ids, scores = index['product_ids'][rows[offset:]].tolist(), scores[offset:].tolist()
+        elapsed = time.perf_counter() - started
+    except Exception as e:
+        st.error(f"Öneriler alınamadı: {e}")
+        return
 
     # Önerileri göster
-    st.markdown(### 🤝 Benzer Ürün Önerileri)
-    st.dataframe(recommended, use_container_width=True)
+    st.markdown("### 🤝 Benzer Ürün Önerileri")
+    if not product_ids:
+        if mode == SEARCH_MODES[2]:
+            st.info("Bu ürün için kayıtlı öneri yok; benzer ürün tablosunu güncelleyin.")
+        else:
+            st.info("Bu sayfada öneri yok.")
+    else:
+        recommended = product_details(product_ids)
+        recommended.insert(0, 'sıra', range(offset + 1, offset + len(product_ids) + 1))
+        recommended['benzerlik'] = scores
+        st.dataframe(recommended[['sıra', 'product_name', 'category', 'description', 'benzerlik']],
+                     hide_index=True)
+    st.caption(f"Sayfa {page}/{n_pages} · sorgu süresi {elapsed * 1000:.1f} ms · "
+               f"katalogda {len(index['product_ids']):,} ürün")
+
+    _similarity_job_section(index_info)
@@ -0,0 +1,293 @@
+# modules/rfm_engine.py
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules import database_utils as db
+from modules.cache_utils import cached
+
+N_BINS = 5
+
+# Ağırlıklı RFM skorunun alt sınırları (küçükten büyüğe) ve segment adları.
+# Skor 4.5 ve üzeri 'Champions', 2'nin altı 'Hibernating' olur.
+SEGMENT_THRESHOLDS = np.array([2.0, 3.0, 4.0, 4.5])
+SEGMENT_NAMES = ['Hibernating', 'At Risk', 'Potential Loyalists', 'Loyal Customers', 'Champions']
+
+# Her skor için sırasıyla denenen kaynak sütunlar. İlk sıradakiler sipariş kayıtlarından
+# hesaplanan gerçek değerlerdir (load_customer_rfm); diğerleri müşteri özelliklerinden
+# yaklaşık değerlerdir.
+SCORE_SOURCES = {
+    'recency_score': ['recency_days', 'loyalty_years'],
+    'frequency_score': ['order_count', 'purchase_frequency'],
+    'monetary_score': ['total_amount', 'customer_value', 'avg_purchase_value'],
+}
+# Küçük değeri daha iyi olan skorlar (son alışverişten bu yana geçen gün az = iyi).
+# Sadakat süresi de recency'nin tersi olarak kullanılır.
+INVERTED_SCORES = ('recency_score',)
+NEUTRAL_SCORE = (N_BINS + 1) // 2   # Kaynağı olmayan skorun değeri
+
+
+def quantile_edges(values, n_bins=N_BINS):
+    """pd.qcut ile aynı (doğrusal ara değerli) quantile sınırlarını döndürür"""
+    return np.quantile(np.asarray(values, dtype=float), np.linspace(0, 1, n_bins + 1))
+
+
+def bin_scores(values, edges):
+    """Değerleri sınırlara göre 1..n_bins skoruna çevirir (pd.qcut etiketleriyle aynı)
+
+    Aralıklar sağdan kapalıdır: sınıra eşit değer alttaki dilime düşer. Sadece iç
+    sınırlarda ikili arama (searchsorted) yapılır; tekrarlı sınırlar hata vermez.
+    """
+    return (np.searchsorted(edges[1:-1], np.asarray(values, dtype=float), side='left') + 1).astype(np.int8)
+
+
+@cached()
+def fit_rfm_scores(source_columns):
+    """Kaynak sütunlardan R, F, M skorlarını ve kullanılan quintile sınırlarını hesaplar
+
+    source_columns: SCORE_SOURCES anahtarlarına göre {'recency_score': Series | None, ...}
+    Sonuç veri kümesinin içeriğine göre önbelleğe alınır; ağırlık değişikliklerinde
+    yeniden hesaplanmaz. Dönüş değeri: (skorlar DataFrame'i, {skor: sınırlar})
+    """
+    n_rows = max((len(s) for s in source_columns.values() if s is not None), default=0)
+    scores = {}
+    edges = {}
+    for score_name, values in source_columns.items():
+        if values is None:
+            # Kaynağı olmayan skor sıralamayı etkilemesin
+            scores[score_name] = np.full(n_rows, NEUTRAL_SCORE, dtype=np.int8)
+            continue
+        edges[score_name] = quantile_edges(values)
+        scores[score_name] = bin_scores(values, edges[score_name])
+        if score_name in INVERTED_SCORES:
+            scores[score_name] = (N_BINS + 1 - scores[score_name]).astype(np.int8)
+    return pd.DataFrame(scores), edges
+
+
+def source_column_names(customer_data):
+    """Her skor için müşteri verisinde bulunan ilk kaynak sütunun adı (yoksa None)"""
+    return {score_name: next((c for c in candidates if c in customer_data.columns), None)
+            for score_name, candidates in SCORE_SOURCES.items()}
+
+
+def select_source_columns(customer_data):
+    """Her skor için müşteri verisinde bulunan ilk kaynak sütunu seçer"""
+    return {score_name: customer_data[column].reset_index(drop=True) if column else None
+            for score_name, column in source_column_names(customer_data).items()}
+
+
+def weighted_rfm(scores, r_weight, f_weight, m_weight):
+    """Ağırlıklı RFM skoru ve segmenti: tek bir matris çarpımı ve ikili arama"""
+    weights = np.array([r_weight, f_weight, m_weight], dtype=float)
+    matrix = scores[['recency_score', 'frequency_score', 'monetary_score']].to_numpy(dtype=float)
+    rfm_score = (matrix @ weights) / weights.sum()
+    codes = np.searchsorted(SEGMENT_THRESHOLDS, rfm_score, side='right')
+    segment = pd.Categorical.from_codes(codes, categories=SEGMENT_NAMES)
+    return rfm_score, segment
+
+
+def score_customers(customer_data, r_weight=0.5, f_weight=0.3, m_weight=0.2):
+    """Müşteri verisine R/F/M skorları, ağırlıklı RFM skoru ve segment sütunlarını ekler"""
+    scores, _ = fit_rfm_scores(select_source_columns(customer_data))
+    rfm_score, segment = weighted_rfm(scores, r_weight, f_weight, m_weight)
+    result = customer_data.copy()
+    for col in scores.columns:
+        result[col] = scores[col].to_numpy()
+    result['rfm_score'] = rfm_score
+    result['segment'] = segment
+    return result
+
+
+# ----------------------------------------------------------------------------
+# SİPARİŞ KAYITLARINDAN RFM
+# ----------------------------------------------------------------------------
+
+ORDERS_TABLE = "orders"
+RFM_TABLE = "customer_rfm"
+RFM_CHUNK_ROWS = 1_000_000      # Tek işlemde (transaction) özetlenecek en fazla sipariş satırı
+
+_state_ready = set()
+
+
+def init_rfm_state():
+    """Hangi siparişlerin RFM tablosuna işlendiğini tutan tabloyu oluşturur"""
+    key = (os.getpid(), os.path.abspath(db.DB_PATH))
+    if key in _state_ready:
+        return
+    with db.write_connection() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rfm_state (
+                source_table TEXT PRIMARY KEY,
+                last_rowid INTEGER NOT NULL,
+                last_order_id TEXT,
+                processed_rows INTEGER NOT NULL,
+                source_version INTEGER,
+                updated_at TIMESTAMP
+            )
+        ''')
+        # Eski sürümde oluşturulmuş durum tablosuna sürüm sütunu eklenir (boş: sürüm bilinmiyor)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(rfm_state)").fetchall()]
+        if "source_version" not in columns:
+            conn.execute("ALTER TABLE rfm_state ADD COLUMN source_version INTEGER")
+    _state_ready.add(key)
+
+
+_STATE_SQL = ("SELECT last_rowid, last_order_id, processed_rows, source_version FROM rfm_state "
+              "WHERE source_table=?")
+
+
+def _history_changed(conn, state):
+    # Sadece ekleme yapılan tabloda işlenmiş satırlar olduğu gibi durmalıdır. 'replace',
+    # 'upsert', bölüm değiştirme ve delete_partitions ile yapılan yazmalar tablonun
+    # sürümünü (table_version) artırır; sürümü artırmayan doğrudan bir DELETE/REPLACE ise
+    # son işlenen satırın sipariş numarasından yakalanır. Her iki kontrol de tabloyu taramaz.
+    if state is None:
+        return False
+    last_rowid, last_order_id, processed_rows, source_version = state
+    if source_version is None or source_version != db.table_version(conn, ORDERS_TABLE):
+        return True
+    if last_rowid == 0:
+        return False
+    row = conn.execute(f"SELECT order_id FROM {ORDERS_TABLE} WHERE rowid=?", (last_rowid,)).fetchone()
+    return row is None or row[0] != last_order_id
+
+
+def _is_up_to_date(conn):
+    # Yeni sipariş yoksa ve geçmiş değişmediyse yazıcı kilidi hiç alınmaz; sayfa her
+    # yeniden çalıştığında (ör. ağırlık kaydırıcısı) sadece birkaç indeks okuması yapılır
+    if not db._table_exists(conn, "rfm_state") or not db._table_exists(conn, RFM_TABLE):
+        return False
+    state = conn.execute(_STATE_SQL, (ORDERS_TABLE,)).fetchone()
+    if state is None:
+        return False
+    max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {ORDERS_TABLE}").fetchone()[0] or 0
+    return max_rowid == state[0] and not _history_changed(conn, state)
+
+
+_MERGE_SQL = f"""
+    INSERT INTO {RFM_TABLE} (customer_id, first_order_date, last_order_date, order_count, total_amount)
+    SELECT customer_id, MIN(order_date), MAX(order_date), COUNT(*), COALESCE(SUM(amount), 0)
+    FROM {ORDERS_TABLE}
+    WHERE rowid > ? AND rowid <= ?
+    GROUP BY customer_id
+    ON CONFLICT (customer_id) DO UPDATE SET
+        first_order_date = MIN(first_order_date, excluded.first_order_date),
+        last_order_date = MAX(last_order_date, excluded.last_order_date),
+        order_count = order_count + excluded.order_count,
+        total_amount = total_amount + excluded.total_amount
+"""
+
+
+def refresh_customer_rfm(rebuild=False, chunk_rows=RFM_CHUNK_ROWS, progress_callback=None):
+    """customer_rfm tablosunu orders tablosuna eklenen yeni siparişlerle günceller
+
+    Sadece son işlenen satırdan (rowid) sonraki siparişler okunur; her parça SQLite
+    içinde GROUP BY ile özetlenip mevcut müşteri satırlarıyla birleştirilir, böylece
+    geçmiş siparişler yeniden toplanmaz. Her parça işlenen son satırla birlikte aynı
+    işlemde kaydedilir; yarıda kalan güncelleme kaldığı yerden devam eder.
+    Sipariş geçmişi değiştiyse veya rebuild=True ise tablo baştan hesaplanır. Yeni sipariş
+    yoksa ve geçmiş değişmediyse sadece okuma yapılır ve hemen döner.
+
+    Dönüş değeri: {'new_orders', 'customers_updated', 'rebuilt', 'seconds'}
+    """
+    started = time.perf_counter()
+    init_rfm_state()
+    summary = {'new_orders': 0, 'customers_updated': 0, 'rebuilt': False, 'seconds': 0.0}
+    if not db.table_exists(ORDERS_TABLE):
+        return summary
+    if not rebuild:
+        with db.read_connection() as conn:
+            up_to_date = _is_up_to_date(conn)
+        if up_to_date:
+            summary['seconds'] = time.perf_counter() - started
+            return summary
+
+    with db.write_connection() as conn:
+        db.ensure_table(conn, RFM_TABLE)
+        state = conn.execute(_STATE_SQL, (ORDERS_TABLE,)).fetchone()
+        if rebuild or _history_changed(conn, state):
+            conn.execute(f"DELETE FROM {RFM_TABLE}")
+            conn.execute("DELETE FROM rfm_state WHERE source_table=?", (ORDERS_TABLE,))
+            state = None
+            summary['rebuilt'] = True
+        max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {ORDERS_TABLE}").fetchone()[0] or 0
+        # Parçalar işlenirken tablo yeniden yazılırsa kaydedilen eski sürüm bir sonraki
+        # güncellemede tam yeniden hesaplamayı tetikler
+        source_version = db.table_version(conn, ORDERS_TABLE)
+
+    last_rowid, processed_rows = (state[0], state[2]) if state else (0, 0)
+    first_rowid = last_rowid
+    while last_rowid < max_rowid:
+        upper = min(last_rowid + chunk_rows, max_rowid)
+        with db.write_connection() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            new_rows = conn.execute(f"SELECT COUNT(*) FROM {ORDERS_TABLE} WHERE rowid > ? AND rowid <= ?",
+                                    (last_rowid, upper)).fetchone()[0]
+            summary['customers_updated'] += conn.execute(_MERGE_SQL, (last_rowid, upper)).rowcount
+            last_order_id = conn.execute(f"SELECT order_id FROM {ORDERS_TABLE} WHERE rowid <= ? "
+                                         "ORDER BY rowid DESC LIMIT 1", (upper,)).fetchone()[0]
+            processed_rows += new_rows
+            conn.execute("INSERT OR REPLACE INTO rfm_state (source_table, last_rowid, last_order_id, "
+                         "processed_rows, source_version, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                         (ORDERS_TABLE, upper, last_order_id, processed_rows,
+                          source_version, pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")))
+        summary['new_orders'] += new_rows
+        last_rowid = upper
+        if progress_callback is not None:
+            progress_callback(summary['new_orders'], (upper - first_rowid) / (max_rowid - first_rowid))
+
+    if summary['new_orders'] or summary['rebuilt']:
+        db.invalidate_table_cache(RFM_TABLE)
+        db.refresh_columnar_snapshot(RFM_TABLE)
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+def load_customer_rfm(reference_date=None):
+    """Müşteri başına recency (gün), frequency (sipariş sayısı) ve monetary (toplam tutar)
+
+    reference_date verilmezse en son sipariş tarihinin ertesi günü kullanılır.
+    """
+    rfm = db.read_columns(RFM_TABLE)
+    for col in ('first_order_date', 'last_order_date'):
+        rfm[col] = pd.to_datetime(rfm[col])
+    if reference_date is None:
+        reference_date = rfm['last_order_date'].max().normalize() + pd.Timedelta(days=1)
+    rfm['recency_days'] = (pd.Timestamp(reference_date) - rfm['last_order_date']).dt.days
+    return rfm
+
+
+if __name__ == "__main__":
+    # Satır bazlı apply ile vektörel motorun karşılaştırması: python -m modules.rfm_engine
+    import veri_analizi as va
+
+    for n_customers in (100_000, 1_000_000):
+        data = va.create_customer_data.uncached(n_customers)
+
+        start = time.perf_counter()
+        loop = data.copy()
+        loop['recency_score'] = 6 - pd.qcut(loop['loyalty_years'], 5, labels=[1, 2, 3, 4, 5]).astype(int)
+        loop['frequency_score'] = pd.qcut(loop['purchase_frequency'], 5, labels=[1, 2, 3, 4, 5]).astype(int)
+        loop['monetary_score'] = pd.qcut(loop['customer_value'], 5, labels=[1, 2, 3, 4, 5]).astype(int)
+        loop['rfm_score'] = (loop['recency_score'] * 0.5 + loop['frequency_score'] * 0.3
+                             + loop['monetary_score'] * 0.2)
+        # Eski uygulama: her satır için Python fonksiyonu çağrılır
+        loop['segment'] = loop.apply(
+            lambda row: SEGMENT_NAMES[int(np.searchsorted(SEGMENT_THRESHOLDS, row['rfm_score'], side='right'))],
+            axis=1)
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scored = score_customers(data)
+        first_seconds = time.perf_counter() - start
+        scores, _ = fit_rfm_scores(select_source_columns(data))
+        start = time.perf_counter()
+        weighted_rfm(scores, 0.7, 0.2, 0.1)
+        reweight_seconds = time.perf_counter() - start
+
+        assert (scored['segment'].astype(str).to_numpy() == loop['segment'].to_numpy()).all()
+        print(f"{n_customers:>9,} müşteri | qcut + apply: {loop_seconds:6.2f} sn | "
+              f"vektörel (ilk): {first_seconds:6.3f} sn | ağırlık değişimi: {reweight_seconds * 1000:6.1f} ms")
@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 import sys
 import os
 
@@ -13,7 +12,17 @@ try:
 except:
     st.error("veri_analizi.py dosyası bulunamadı! Ana dizinde bulunduğundan emin olun.")
 
+from modules.database_utils import table_exists
+
 def seasonal_analysis(sales_df=None):
+    if sales_df is None and table_exists("sales_data"):
+        # Dönemsel analiz günlük toplamlar üzerinde yapılır; tablo belleğe alınmaz
+        try:
+            sales_df = va.load_daily_sales("sales_data")[["date", "sales", "weekday"]]
+        except Exception as e:
+            st.warning(f"Satış verisi veritabanından okunamadı: {e}")
+            sales_df = None
+
     if sales_df is None:
         # Örnek veri oluştur
         try:
@@ -30,8 +39,12 @@ def seasonal_analysis(sales_df=None):
         st.write("Haftanın günlerine göre satış dağılımı")
         
         # Haftanın günlerine göre analiz
-        if 'weekday' in sales_df.columns:
-            weekday_counts = sales_df.groupby('weekday')['sales'].mean()
+        if 'weekday' in sales_df.columns or 'date' in sales_df.columns:
+            if 'weekday' in sales_df.columns:
+                weekdays_of_sales = sales_df['weekday']
+            else:
+                weekdays_of_sales = pd.to_datetime(sales_df['date']).dt.dayofweek
+            weekday_counts = sales_df.groupby(weekdays_of_sales)['sales'].mean()
             
             fig, ax = plt.subplots(figsize=(10, 6))
             weekdays = ["Pazartesi", "Salı", "Çarşamba", "Perşembe", "Cuma", "Cumartesi", "Pazar"]
@@ -40,13 +53,13 @@ def seasonal_analysis(sales_df=None):
             ax.set_ylabel("Ortalama Satış Miktarı")
             st.pyplot(fig)
         else:
-            st.warning("Veri setinde 'weekday' sütunu bulunamadı.")
+            st.warning("Veri setinde 'weekday' veya 'date' sütunu bulunamadı.")
     
     with tab_monthly:
         st.write("Aylara göre satış dağılımı")
         
         # Aylara göre analiz
-        if 'month' in sales_df.columns and 'date' in sales_df.columns:
+        if 'date' in sales_df.columns:
             # Tarih sütununu datetime formatına çevir
             sales_df['date'] = pd.to_datetime(sales_df['date'])
             
@@ -66,13 +79,13 @@ def seasonal_analysis(sales_df=None):
             plt.xticks(rotation=45)
             st.pyplot(fig)
         else:
-            st.warning("Veri setinde 'month' veya 'date' sütunu bulunamadı.")
+            st.warning("Veri setinde 'date' sütunu bulunamadı.")
     
     with tab_yearly:
         st.write("Yıllara göre satış trendi")
         
         # Yıllara göre analiz
-        if 'year' in sales_df.columns and 'date' in sales_df.columns:
+        if 'date' in sales_df.columns:
             # Tarih sütununu datetime formatına çevir
             sales_df['date'] = pd.to_datetime(sales_df['date'])
             
@@ -87,7 +100,7 @@ def seasonal_analysis(sales_df=None):
             ax.grid(True, alpha=0.3)
             st.pyplot(fig)
         else:
-            st.warning("Veri setinde 'year' veya 'date' sütunu bulunamadı.")
+            st.warning("Veri setinde 'date' sütunu bulunamadı.")
     
     with tab_daily:
         st.write("Günlük satış dağılımı")
@@ -0,0 +1,262 @@
+# modules/segmentation.py
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules import database_utils as db
+from modules.lazy_imports import lazy_import
+
+sk_preprocessing = lazy_import('sklearn.preprocessing')
+sk_cluster = lazy_import('sklearn.cluster')
+
+SEGMENT_FEATURES = ['avg_purchase_value', 'purchase_frequency', 'return_rate',
+                    'loyalty_years', 'customer_value']
+SEGMENT_CHUNK_ROWS = 100000     # Veritabanından her seferde okunacak müşteri sayısı
+SEGMENT_BATCH_SIZE = 4096       # K-means'in her güncelleme adımında kullandığı müşteri sayısı
+SEGMENT_EPOCHS = 3              # Verinin K-means eğitimi için kaç kez baştan okunacağı
+SEGMENT_INIT_RUNS = 3           # Başlangıç merkezleri için yapılan deneme sayısı
+SEGMENT_INIT_SAMPLE = 50000     # Başlangıç merkezlerinin seçildiği rastgele örneğin büyüklüğü
+SEGMENT_PLOT_SAMPLE = 5000      # Küme grafiğinde gösterilen müşteri sayısı
+SEGMENT_MODEL_NAME = "customer_segments"
+SEGMENT_TABLE = "customer_segments"
+
+
+def minibatch_kmeans(n_clusters, init='k-means++', n_init=SEGMENT_INIT_RUNS, random_state=42, **kwargs):
+    return sk_cluster.MiniBatchKMeans(n_clusters=n_clusters, init=init, n_init=n_init,
+                                      batch_size=SEGMENT_BATCH_SIZE, random_state=random_state, **kwargs)
+
+
+# ----------------------------------------------------------------------------
+# PARÇALI (OUT-OF-CORE) EĞİTİM
+# ----------------------------------------------------------------------------
+
+def fit_streaming_segments(chunk_source, n_clusters=4, features=SEGMENT_FEATURES,
+                           n_epochs=SEGMENT_EPOCHS, random_state=42):
+    """Parçalar halinde okunan veriden ölçekleyici ve K-means modelini eğitir
+
+    chunk_source: her çağrıldığında DataFrame parçalarının yeni bir yineleyicisini döndüren
+    fonksiyon. Veri 1 + n_epochs kez okunur: önce ölçekleyici (StandardScaler.partial_fit),
+    sonra her turda MiniBatchKMeans.partial_fit. Bellekte aynı anda tek parça bulunur.
+    Parçalar bir özelliğe göre sıralı gelirse (ör. segment sırasıyla) sonuç belirgin
+    biçimde kötüleşir; satır sırası özelliklerden bağımsız olmalıdır.
+    Dönüş: (kmeans, scaler, bilgi)
+    """
+    rng = np.random.default_rng(random_state)
+    scaler = sk_preprocessing.StandardScaler()
+    n_rows = 0
+    # Başlangıç merkezleri için tüm veriden eşit olasılıklı örnek: her satıra rastgele
+    # bir anahtar verilir, en küçük anahtarlı SEGMENT_INIT_SAMPLE satır tutulur
+    sample, sample_keys = None, None
+    for chunk in chunk_source():
+        values = chunk[features]
+        scaler.partial_fit(values)
+        n_rows += len(chunk)
+        keys = rng.random(len(values))
+        if sample is not None:
+            values = pd.concat([sample, values], ignore_index=True)
+            keys = np.concatenate([sample_keys, keys])
+        if len(keys) > SEGMENT_INIT_SAMPLE:
+            keep = np.argpartition(keys, SEGMENT_INIT_SAMPLE)[:SEGMENT_INIT_SAMPLE]
+            values, keys = values.iloc[keep], keys[keep]
+        sample, sample_keys = values.reset_index(drop=True), keys
+    if n_rows < n_clusters:
+        raise ValueError(f"Segmentasyon için en az {n_clusters} müşteri gerekli (bulunan: {n_rows})")
+
+    # Birkaç denemeyle seçilen merkezler; tek bir k-means++ başlangıcı küçük kümeleri
+    # kolayca kaçırır
+    seed_model = minibatch_kmeans(n_clusters, random_state=random_state).fit(scaler.transform(sample))
+    # Parçalar sıralı gelebilir (ör. bölgeye göre); son adımlarda nokta almayan merkezler
+    # boş sayılıp o anki parçadan rastgele noktalara taşınmasın
+    kmeans = minibatch_kmeans(n_clusters, init=seed_model.cluster_centers_, n_init=1,
+                              random_state=random_state, reassignment_ratio=0)
+    n_steps = 0
+    for _ in range(n_epochs):
+        for chunk in chunk_source():
+            X = scaler.transform(chunk[features])
+            # Tablodaki sıra (ör. müşteri numarası) güncelleme adımlarına taraflı dağılmasın
+            X = X[rng.permutation(len(X))]
+            for start in range(0, len(X), SEGMENT_BATCH_SIZE):
+                kmeans.partial_fit(X[start:start + SEGMENT_BATCH_SIZE])
+                n_steps += 1
+
+    return kmeans, scaler, {'rows': n_rows, 'epochs': n_epochs, 'steps': n_steps}
+
+
+def frame_chunks(df, chunk_rows=SEGMENT_CHUNK_ROWS):
+    """Bellekteki bir DataFrame için fit_streaming_segments'e verilecek parça kaynağı"""
+    return lambda: (df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+
+
+def table_chunks(table_name, features=SEGMENT_FEATURES, chunk_rows=SEGMENT_CHUNK_ROWS):
+    """Veritabanı tablosu için parça kaynağı (sadece müşteri no ve özellik sütunları okunur)"""
+    return lambda: db.query_table(table_name, columns=['customer_id'] + list(features),
+                                  chunksize=chunk_rows, use_cache=False)
+
+
+def assign_segments(df, kmeans, scaler, features=SEGMENT_FEATURES):
+    """Modeli yeniden eğitmeden müşterileri en yakın küme merkezine atar
+
+    Hem tam K-means (veri_analizi.segment_customers) hem de parçalı modellerle çalışır.
+    Dönüş: (küme etiketleri, küme merkezine uzaklıklar)
+    """
+    distances = kmeans.transform(scaler.transform(df[features]))
+    labels = distances.argmin(axis=1)
+    return labels, distances[np.arange(len(labels)), labels]
+
+
+# ----------------------------------------------------------------------------
+# VERİTABANINDAKİ MÜŞTERİLERİN SEGMENTASYONU
+# ----------------------------------------------------------------------------
+
+def load_segment_model(model_id=None):
+    """Kayıtlı en son (veya verilen) segment modelini yükler; kayıtlı model yoksa None
+
+    Dönüş: {'kmeans', 'scaler', 'features'} sözlüğü
+    """
+    from modules import model_registry as registry
+
+    if model_id is None:
+        models = registry.list_models(SEGMENT_MODEL_NAME)
+        if models.empty:
+            return None
+        model_id = models['model_id'].iloc[0]
+    return registry.load_model(model_id)
+
+
+def segment_customer_table(table_name='customer_data', n_clusters=4, features=SEGMENT_FEATURES,
+                           chunk_rows=SEGMENT_CHUNK_ROWS, n_epochs=SEGMENT_EPOCHS, target=SEGMENT_TABLE,
+                           use_registry=True, progress_callback=None):
+    """Veritabanındaki müşterileri tabloyu belleğe almadan segmentlere ayırır
+
+    Model (ölçekleyici + K-means) model kaydında saklanır; tablo ve parametreler
+    değişmediyse yeniden eğitilmez. Her müşterinin kümesi ve merkeze uzaklığı target
+    tablosuna yazılır. progress_callback(yazılan_satır, oran) atama sırasında çağrılır.
+    Dönüş: özet sözlüğü
+    """
+    from modules import model_registry as registry
+
+    features = list(features)
+    chunk_source = table_chunks(table_name, features, chunk_rows)
+    params = {'n_clusters': n_clusters, 'features': features, 'n_epochs': n_epochs,
+              'batch_size': SEGMENT_BATCH_SIZE}
+    signature = db.table_signature(table_name, features)
+
+    def train():
+        kmeans, scaler, info = fit_streaming_segments(chunk_source, n_clusters, features, n_epochs)
+        return {'kmeans': kmeans, 'scaler': scaler, 'features': features}, info
+
+    started = time.perf_counter()
+    if use_registry:
+        fingerprint = registry.model_fingerprint([table_name, list(signature)], params)
+        model, model_info = registry.get_or_train(SEGMENT_MODEL_NAME, fingerprint, train, params=params)
+        model_id, trained = model_info['model_id'], model_info['trained']
+    else:
+        model, _ = train()
+        model_id, trained = None, True
+    fit_seconds = time.perf_counter() - started
+
+    cluster_sizes = np.zeros(n_clusters, dtype=np.int64)
+    inertia = 0.0
+
+    def labelled_chunks():
+        nonlocal inertia
+        for chunk in chunk_source():
+            # customer_data anahtarsızdır: müşteri numarası boş olan satırlar yazılamaz
+            chunk = chunk[chunk['customer_id'].notna()]
+            if chunk.empty:
+                continue
+            labels, distances = assign_segments(chunk, model['kmeans'], model['scaler'], features)
+            cluster_sizes[:] += np.bincount(labels, minlength=n_clusters)
+            inertia += float(np.square(distances).sum())
+            yield pd.DataFrame({'customer_id': chunk['customer_id'].to_numpy(),
+                                'cluster': labels, 'distance': distances})
+
+    started = time.perf_counter()
+    # Tablo aynı işlemde boşaltılıp yeniden yazılır; tekrarlı müşteri numaralarında son satır kalır
+    with db.write_connection() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        if db._table_exists(conn, target):
+            conn.execute(f"DELETE FROM {db._quote_identifier(target)}")
+        rows = db.bulk_load_frames(labelled_chunks(), target, mode='upsert', total_rows=signature[0],
+                                   progress_callback=progress_callback)
+    assign_seconds = time.perf_counter() - started
+
+    return {
+        'rows': rows,
+        'model_id': model_id,
+        'trained': trained,
+        'fit_seconds': fit_seconds,
+        'assign_seconds': assign_seconds,
+        'rows_per_second': rows / assign_seconds if assign_seconds > 0 else None,
+        'cluster_sizes': cluster_sizes.tolist(),
+        'inertia': inertia,
+    }
+
+
+def _sample_order(alias=None):
+    # rowid'in çarpımsal özeti: tablo değişmedikçe aynı "rastgele" sıra (örnekler ve
+    # bunlara bağlı önbellek girdileri her çalıştırmada aynı kalır)
+    rowid = f"{alias}.rowid" if alias else "rowid"
+    return f"({rowid} * 2654435761) % 4294967296"
+
+
+def sample_table(table_name='customer_data', n_rows=SEGMENT_INIT_SAMPLE, features=SEGMENT_FEATURES):
+    """Tablodan tekrarlanabilir bir müşteri örneği okur (tablo belleğe alınmaz)
+
+    Küme sayısı taraması gibi tüm veriyi bellekte isteyen işlemler yüklenen tablolarda
+    bu örnek üzerinde çalışır.
+    """
+    columns = ", ".join(db._quote_identifier(c) for c in ['customer_id'] + list(features))
+    with db.read_connection() as conn:
+        return pd.read_sql_query(f"SELECT {columns} FROM {db._quote_identifier(table_name)} "
+                                 f"ORDER BY {_sample_order()} LIMIT ?", conn, params=(n_rows,))
+
+
+def segment_statistics(table_name='customer_data', target=SEGMENT_TABLE, features=SEGMENT_FEATURES,
+                       sample_rows=SEGMENT_PLOT_SAMPLE):
+    """segment_customer_table sonrası küme başına müşteri sayısı ve ortalama özellikler
+
+    Özetler SQLite içinde hesaplanır; grafik için sadece sample_rows müşteri okunur.
+    Dönüş: (küme istatistikleri, kümesiyle birlikte örnek müşteriler)
+    """
+    features = list(features)
+    source, segments = db._quote_identifier(table_name), db._quote_identifier(target)
+    averages = ", ".join(f"AVG(c.{db._quote_identifier(f)}) AS {db._quote_identifier(f)}" for f in features)
+    columns = ", ".join(f"c.{db._quote_identifier(f)}" for f in features)
+    join = f"FROM {segments} s JOIN {source} c ON c.customer_id = s.customer_id"
+    with db.read_connection() as conn:
+        stats = pd.read_sql_query(f"SELECT s.cluster, COUNT(*) AS customers, {averages} {join} "
+                                  f"GROUP BY s.cluster ORDER BY s.cluster", conn)
+        sample = pd.read_sql_query(f"SELECT s.cluster, {columns} {join} "
+                                   f"ORDER BY {_sample_order('c')} LIMIT ?", conn, params=(sample_rows,))
+    return stats, sample
+
+
+if __name__ == "__main__":
+    # Tam K-means ile mini-batch ve parçalı eğitimin karşılaştırması: python -m modules.segmentation
+    import veri_analizi as va
+
+    sk_metrics = lazy_import('sklearn.metrics')
+
+    for n_customers in (100_000, 1_000_000):
+        # create_customer_data müşterileri segment sırasıyla üretir; tablolardaki gibi karıştırılır
+        data = va.create_customer_data.uncached(n_customers).sample(frac=1, random_state=0)
+        results = {}
+
+        for mode in va.SEGMENTATION_MODES:
+            start = time.perf_counter()
+            _, kmeans, scaler = va.fit_customer_segments.uncached(data[SEGMENT_FEATURES], 4, mode=mode)
+            results[mode] = (time.perf_counter() - start, kmeans, scaler)
+
+        start = time.perf_counter()
+        kmeans, scaler, _ = fit_streaming_segments(frame_chunks(data), 4)
+        results['streaming'] = (time.perf_counter() - start, kmeans, scaler)
+
+        reference, _ = assign_segments(data, results['standard'][1], results['standard'][2])
+        for mode, (seconds, kmeans, scaler) in results.items():
+            labels, distances = assign_segments(data, kmeans, scaler)
+            print(f"{n_customers:>9,} müşteri | {mode:<10} | {seconds:6.2f} sn | "
+                  f"inertia: {np.square(distances).sum():12,.0f} | "
+                  f"ARI (tam K-means'e göre): {sk_metrics.adjusted_rand_score(reference, labels):.3f}")
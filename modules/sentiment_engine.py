@@ -0,0 +1,371 @@
+# modules/sentiment_engine.py
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules import database_utils as db
+from modules.lazy_imports import lazy_import
+
+sk_pipeline = lazy_import('sklearn.pipeline')
+sk_text = lazy_import('sklearn.feature_extraction.text')
+sk_linear = lazy_import('sklearn.linear_model')
+
+# Özellikler: sözcük 1-2 gramlarının özetlenmiş (hashing) sayıları; sözlük tutulmaz,
+# model ağa ihtiyaç duymadan yerelde eğitilir ve yeni sözcükler yeniden eğitim gerektirmez
+SENTIMENT_VECTORIZER_PARAMS = {'n_features': 2 ** 20, 'ngram_range': (1, 2), 'alternate_sign': False,
+                               'norm': 'l2'}
+SENTIMENT_MODEL_PARAMS = {'loss': 'log_loss', 'alpha': 1e-5, 'class_weight': 'balanced',
+                          'max_iter': 20, 'tol': 1e-4, 'random_state': 42}
+SENTIMENT_THRESHOLDS = (0.4, 0.7)   # Skor > 0.7 olumlu, > 0.4 nötr, diğerleri olumsuz
+SENTIMENT_LABELS = ['Olumsuz', 'Nötr', 'Olumlu']
+SENTIMENT_TRAIN_SAMPLE = 200000     # Tablodan eğitilirken kullanılan rastgele yorum sayısı
+SENTIMENT_CHUNK_ROWS = 100000       # Tablo puanlanırken her seferde okunacak metin sayısı
+SENTIMENT_HISTOGRAM_BINS = 20
+SENTIMENT_MODEL_NAME = "review_sentiment"
+REVIEWS_TABLE = "reviews"
+SENTIMENT_TABLE = "review_sentiment"
+
+
+# ----------------------------------------------------------------------------
+# MODEL EĞİTİMİ VE YÜKLEME
+# ----------------------------------------------------------------------------
+
+def build_sentiment_model():
+    """Hashing n-gram özellikleri + lojistik kayıp ile eğitilen doğrusal sınıflandırıcı"""
+    return sk_pipeline.Pipeline([
+        ('features', sk_text.HashingVectorizer(**SENTIMENT_VECTORIZER_PARAMS)),
+        ('classifier', sk_linear.SGDClassifier(**SENTIMENT_MODEL_PARAMS)),
+    ])
+
+
+def rating_labels(ratings):
+    """Puanlardan eğitim etiketleri: 4-5 olumlu (1), 1-2 olumsuz (0), 3 kullanılmaz (-1)"""
+    ratings = np.asarray(ratings)
+    return np.where(ratings >= 4, 1, np.where(ratings <= 2, 0, -1))
+
+
+def _get_or_train(fingerprint_data, load_training_data):
+    from modules import model_registry as registry
+
+    def train():
+        texts, ratings = load_training_data()
+        labels = rating_labels(ratings)
+        labeled = labels >= 0
+        model = build_sentiment_model().fit(np.asarray(texts, dtype=object)[labeled], labels[labeled])
+        return model, {'rows': int(labeled.sum())}
+
+    params = {**SENTIMENT_VECTORIZER_PARAMS, **SENTIMENT_MODEL_PARAMS}
+    fingerprint = registry.model_fingerprint(fingerprint_data, params)
+    return registry.get_or_train(SENTIMENT_MODEL_NAME, fingerprint, train, params=params)
+
+
+def fit_sentiment_model(df):
+    """Verilen yorumlarda (text, rating) modeli eğitir; aynı veri için kayıtlı model kullanılır
+
+    Dönüş: (model, bilgi) - bilgi sözlüğünde model_id, trained ve seconds bulunur
+    """
+    texts, ratings = df['text'].to_numpy(dtype=object), df['rating'].to_numpy()
+    return _get_or_train([texts, ratings], lambda: (texts, ratings))
+
+
+def fit_sentiment_model_from_table(table_name=REVIEWS_TABLE, sample_size=SENTIMENT_TRAIN_SAMPLE):
+    """Modeli tablodaki puanlı yorumlardan rastgele bir örnekle eğitir (tablo değişmediyse kayıtlı model)"""
+    table = db._quote_identifier(table_name)
+
+    def load_sample():
+        with db.read_connection() as conn:
+            sample = pd.read_sql_query(
+                f"SELECT text, rating FROM {table} WHERE rowid IN "
+                f"(SELECT rowid FROM {table} WHERE rating IS NOT NULL AND rating <> 3 "
+                f"AND text IS NOT NULL ORDER BY RANDOM() LIMIT ?)", conn, params=[sample_size])
+        return sample['text'].to_numpy(dtype=object), sample['rating'].to_numpy()
+
+    signature = db.table_signature(table_name, ['review_id', 'rating'])
+    return _get_or_train([table_name, list(signature), sample_size], load_sample)
+
+
+def load_sentiment_model(model_id=None):
+    """Kayıtlı en son (veya verilen) modeli yükler; kayıtlı model yoksa None
+
+    Dönüş: (model, bilgi)
+    """
+    from modules import model_registry as registry
+
+    if model_id is None:
+        models = registry.list_models(SENTIMENT_MODEL_NAME)
+        if models.empty:
+            return None
+        model_id = models['model_id'].iloc[0]
+    return registry.load_model(model_id), registry.get_model_info(model_id)
+
+
+def get_sentiment_model(refit=False):
+    """Kayıtlı son model; yoksa (veya refit=True ise) yorum tablosundan, tablo da yoksa
+    örnek yapay yorumlardan eğitilen model
+
+    Dönüş: (model, bilgi)
+    """
+    if not refit:
+        loaded = load_sentiment_model()
+        if loaded is not None:
+            return loaded
+    if db.table_exists(REVIEWS_TABLE):
+        return fit_sentiment_model_from_table()
+    import veri_analizi as va
+    return fit_sentiment_model(next(va.generate_reviews(SENTIMENT_TRAIN_SAMPLE, chunk_rows=SENTIMENT_TRAIN_SAMPLE)))
+
+
+# ----------------------------------------------------------------------------
+# PUANLAMA
+# ----------------------------------------------------------------------------
+
+def text_hashes(texts):
+    """Metinlerin 64 bitlik özetleri (SQLite INTEGER sütununa sığması için işaretli)"""
+    texts = pd.Series(texts, dtype=object).fillna('')
+    return pd.util.hash_pandas_object(texts, index=False).to_numpy().view(np.int64)
+
+
+def score_texts(texts, model):
+    """Metinleri tek seferde puanlar: 0-1 arası olumlu olma olasılığı (1 = çok olumlu)"""
+    texts = pd.Series(texts, dtype=object).fillna('').to_numpy()
+    if len(texts) == 0:
+        return np.zeros(0)
+    return model.predict_proba(texts)[:, 1]
+
+
+def sentiment_labels(scores):
+    """Skorları eşiklere göre 'Olumsuz' / 'Nötr' / 'Olumlu' etiketlerine çevirir"""
+    bins = np.searchsorted(SENTIMENT_THRESHOLDS, np.asarray(scores, dtype=float), side='left')
+    return np.asarray(SENTIMENT_LABELS, dtype=object)[bins]
+
+
+def _scored_frame(hashes, scores, model_id):
+    return pd.DataFrame({
+        'text_hash': hashes,
+        'sentiment_score': scores,
+        'sentiment': sentiment_labels(scores),
+        'model_id': model_id,
+        'scored_at': pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+
+def score_text(text, model=None):
+    """Tek yorumu puanlar; aynı metin aynı modelle daha önce puanlandıysa kayıtlı skor döner
+
+    Dönüş: (skor, etiket)
+    """
+    model, info = model or get_sentiment_model()
+    text_hash = int(text_hashes([text])[0])
+    if db.table_exists(SENTIMENT_TABLE):
+        with db.read_connection() as conn:
+            row = conn.execute(f"SELECT sentiment_score, sentiment FROM {db._quote_identifier(SENTIMENT_TABLE)} "
+                               f"WHERE text_hash = ? AND model_id = ?", (text_hash, info['model_id'])).fetchone()
+        if row is not None:
+            return float(row[0]), row[1]
+    scored = _scored_frame([text_hash], score_texts([text], model), info['model_id'])
+    db.upsert_dataframe(scored, SENTIMENT_TABLE, refresh_snapshot=False)
+    return float(scored['sentiment_score'].iloc[0]), scored['sentiment'].iloc[0]
+
+
+def _fill_text_hashes(table_name, chunk_rows):
+    """text_hash sütunu boş olan yorumların (ör. CSV'den yüklenenler) özetlerini hesaplayıp yazar
+
+    Dönüş: doldurulan özetler (dizi)
+    """
+    table = db._quote_identifier(table_name)
+    filled = []
+    while True:
+        # text_hash indeksi sayesinde boş satırlar tablo taranmadan bulunur
+        with db.read_connection() as conn:
+            chunk = pd.read_sql_query(f"SELECT rowid AS row_id, text FROM {table} WHERE text_hash IS NULL LIMIT ?",
+                                      conn, params=[chunk_rows])
+        if chunk.empty:
+            break
+        hashes = text_hashes(chunk['text']).tolist()
+        with db.write_connection() as conn:
+            conn.executemany(f"UPDATE {table} SET text_hash = ? WHERE rowid = ?",
+                             zip(hashes, chunk['row_id'].tolist()))
+        filled.append(hashes)
+    if filled:
+        db.invalidate_table_cache(table_name)
+    return np.concatenate(filled) if filled else np.zeros(0, dtype=np.int64)
+
+
+def score_review_table(table_name=REVIEWS_TABLE, target=SENTIMENT_TABLE, model=None, refit=False,
+                       chunk_rows=SENTIMENT_CHUNK_ROWS, progress_callback=None):
+    """Yorum tablosunu toplu puanlayıp skorları metin özetine göre target tablosuna yazar
+
+    Aynı metin bir kez puanlanır: sadece bu modelle henüz skoru olmayan özetler okunur;
+    yeni yorumların metni daha önce puanlandıysa kayıtlı skor kullanılır.
+    model: (model, bilgi); verilmezse kayıtlı son model kullanılır, refit=True ise model
+    tablodan yeniden eğitilir (yeni modelle tüm metinler yeniden puanlanır).
+    Dönüş: skoru hazırlanan yorum sayısı, modelle puanlanan metin sayısı ve işlem
+    hızını içeren özet sözlüğü
+    """
+    started = time.perf_counter()
+    hashed = _fill_text_hashes(table_name, chunk_rows)
+    model, info = model or get_sentiment_model(refit=refit)
+    model_id = info['model_id']
+
+    sql = (f"SELECT r.text_hash, MIN(r.text) AS text, COUNT(*) AS reviews "
+           f"FROM {db._quote_identifier(table_name)} r")
+    params = []
+    if db.table_exists(target):
+        sql += (f" LEFT JOIN {db._quote_identifier(target)} s ON s.text_hash = r.text_hash AND s.model_id = ?"
+                f" WHERE s.text_hash IS NULL")
+        params.append(model_id)
+    sql += " GROUP BY r.text_hash"
+
+    score_seconds = 0.0
+    reviews = 0
+    scored_hashes = []
+
+    def scored_chunks():
+        nonlocal score_seconds, reviews
+        for chunk in db._iter_query_chunks(sql, params, chunk_rows, None):
+            if chunk.empty:
+                continue
+            chunk_start = time.perf_counter()
+            scored = _scored_frame(chunk['text_hash'].to_numpy(), score_texts(chunk['text'], model), model_id)
+            score_seconds += time.perf_counter() - chunk_start
+            reviews += int(chunk['reviews'].sum())
+            scored_hashes.append(chunk['text_hash'].to_numpy())
+            yield scored
+
+    texts = db.bulk_load_frames(scored_chunks(), target, mode='upsert', progress_callback=progress_callback)
+    # Özeti yeni doldurulan yorumlar da bu çalıştırmada skorlanmış sayılır (metni önbellekte olsa bile)
+    if len(hashed):
+        reviews += int((~np.isin(hashed, np.concatenate(scored_hashes) if scored_hashes else [])).sum())
+    seconds = time.perf_counter() - started
+    return {
+        'reviews': reviews,
+        'texts': texts,
+        'hashed': len(hashed),
+        'model_id': model_id,
+        'trained': bool(info.get('trained')),
+        'seconds': seconds,
+        'score_seconds': score_seconds,
+        'reviews_per_second': reviews / seconds if reviews and seconds > 0 else None,
+    }
+
+
+# ----------------------------------------------------------------------------
+# ÖZETLER
+# ----------------------------------------------------------------------------
+
+def sentiment_summary(table_name=REVIEWS_TABLE, target=SENTIMENT_TABLE, model_id=None, n_examples=2,
+                      recent_rows=1000):
+    """Kayıtlı skorlardan yorum dağılımlarını SQL ile hesaplar; puanlanmış yorum yoksa None
+
+    Yorumlar önce (text_hash, rating) indeksinden metin başına sayılır, skorlar metin başına
+    bir kez eşleştirilir. Dönüş sözlüğü: counts (duyguya göre yorum sayısı), histogram
+    (skor aralıklarına göre), by_rating (puana göre ortalama skor), examples (son
+    recent_rows yorumdan her duygu için n_examples örnek), scored / total ve model_id
+    """
+    if not (db.table_exists(table_name) and db.table_exists(target)):
+        return None
+    if model_id is None:
+        loaded = load_sentiment_model()
+        if loaded is None:
+            return None
+        model_id = loaded[1]['model_id']
+
+    table, scores = db._quote_identifier(table_name), db._quote_identifier(target)
+
+    def read(conn):
+        total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        groups = pd.read_sql_query(
+            f"SELECT g.rating, s.sentiment, "
+            f"MIN(CAST(s.sentiment_score * ? AS INTEGER), ?) AS bin, "
+            f"SUM(g.reviews) AS reviews, SUM(g.reviews * s.sentiment_score) AS score_sum "
+            f"FROM (SELECT text_hash, rating, COUNT(*) AS reviews FROM {table} GROUP BY text_hash, rating) g "
+            f"JOIN {scores} s ON s.text_hash = g.text_hash AND s.model_id = ? "
+            f"GROUP BY g.rating, s.sentiment, bin",
+            conn, params=[SENTIMENT_HISTOGRAM_BINS, SENTIMENT_HISTOGRAM_BINS - 1, model_id])
+        recent = pd.read_sql_query(
+            f"SELECT r.text, r.rating, s.sentiment_score, s.sentiment "
+            f"FROM (SELECT text, rating, text_hash, rowid AS row_id FROM {table} ORDER BY rowid DESC LIMIT ?) r "
+            f"JOIN {scores} s ON s.text_hash = r.text_hash AND s.model_id = ? ORDER BY r.row_id DESC",
+            conn, params=[recent_rows, model_id])
+        if groups.empty:
+            return None
+
+        counts = groups.groupby('sentiment')['reviews'].sum().reindex(SENTIMENT_LABELS[::-1], fill_value=0)
+        histogram = groups.groupby('bin', as_index=False)['reviews'].sum()
+        histogram['score'] = histogram['bin'] / SENTIMENT_HISTOGRAM_BINS
+        by_rating = groups.groupby('rating', as_index=False)[['reviews', 'score_sum']].sum()
+        by_rating['avg_score'] = by_rating['score_sum'] / by_rating['reviews']
+        examples = (recent.groupby('sentiment', sort=False).head(n_examples)
+                    .sort_values('sentiment', key=lambda s: s.map(SENTIMENT_LABELS[::-1].index)))
+        return {
+            'counts': counts,
+            'histogram': histogram[['score', 'reviews']],
+            'by_rating': by_rating[['rating', 'avg_score', 'reviews']],
+            'examples': examples.reset_index(drop=True),
+            'scored': int(counts.sum()),
+            'total': int(total),
+            'model_id': model_id,
+        }
+
+    # Anahtar iki tablonun damgasını da içerir: başka bir süreçte eklenen yorumlar veya
+    # puanlar eski özetin kullanılmasını engeller
+    return db.cached_read("sentiment_summary", [table_name, target], read,
+                          model_id, n_examples, recent_rows)
+
+if __name__ == "__main__":
+    # Yorum başına puanlama ile toplu + metin özetli puanlamanın karşılaştırması:
+    # python -m modules.sentiment_engine
+    import os
+    import tempfile
+    import veri_analizi as va
+
+    train = next(va.generate_reviews(SENTIMENT_TRAIN_SAMPLE, chunk_rows=SENTIMENT_TRAIN_SAMPLE, seed=1))
+    labels = rating_labels(train['rating'])
+    start = time.perf_counter()
+    model = build_sentiment_model().fit(train['text'].to_numpy(dtype=object)[labels >= 0], labels[labels >= 0])
+    print(f"eğitim: {time.perf_counter() - start:.2f} sn ({int((labels >= 0).sum()):,} yorum)")
+
+    for n_reviews in (100_000, 1_000_000):
+        reviews = next(va.generate_reviews(n_reviews, chunk_rows=n_reviews))
+        held_out = rating_labels(reviews['rating'])
+
+        # Yorum başına model çağrısı (ilk 2.000 yorum üzerinden ölçülür)
+        sample = reviews['text'].head(2000).tolist()
+        start = time.perf_counter()
+        for text in sample:
+            model.predict_proba([text])
+        loop_rate = len(sample) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        scores = score_texts(reviews['text'], model)
+        batch_rate = n_reviews / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        hashes = text_hashes(reviews['text'])
+        unique_hashes, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        dedup_scores = score_texts(reviews['text'].to_numpy()[first], model)[inverse]
+        dedup_rate = n_reviews / (time.perf_counter() - start)
+        assert np.allclose(scores, dedup_scores)
+
+        accuracy = ((scores > 0.5) == (held_out == 1))[held_out >= 0].mean()
+        print(f"{n_reviews:>9,} yorum | tek tek: {loop_rate:8,.0f} yorum/sn | toplu: {batch_rate:10,.0f} yorum/sn | "
+              f"toplu + özet: {dedup_rate:10,.0f} yorum/sn ({len(unique_hashes):,} farklı metin) | "
+              f"doğruluk (1-2 / 4-5): {accuracy:.3f}")
+
+    # Veritabanı üzerinden uçtan uca: ilk puanlama, değişiklik yokken ve yeni yorumlar eklenince
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.DB_PATH = os.path.join(tmp_dir, "benchmark.db")
+        va.write_synthetic_data('reviews', n_reviews=1_000_000)
+        for step in ("ilk puanlama", "değişiklik yok", "50.000 yeni yorum"):
+            if step == "50.000 yeni yorum":
+                db.append_dataframe(next(va.generate_reviews(50_000, first_review_id=1_000_001, seed=7,
+                                                             chunk_rows=50_000)), REVIEWS_TABLE)
+            summary = score_review_table()
+            rate = summary['reviews_per_second']
+            print(f"{step:<18} | {summary['reviews']:>9,} yorum, {summary['texts']:>7,} metin | "
+                  f"{summary['seconds']:6.2f} sn | " + (f"{rate:,.0f} yorum/sn" if rate else "-"))
+        start = time.perf_counter()
+        summary = sentiment_summary()
+        print(f"özet: {time.perf_counter() - start:.2f} sn | {summary['counts'].to_dict()}")
+        db.close_pools()
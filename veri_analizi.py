@@ -1,27 +1,67 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score, TimeSeriesSplit
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-from sklearn.ensemble import RandomForestRegressor, IsolationForest
-from sklearn.cluster import KMeans
-from sklearn.metrics import mean_squared_error, mean_absolute_error, silhouette_score
-import xgboost as xgb
-from statsmodels.tsa.seasonal import seasonal_decompose
-from statsmodels.tsa.arima.model import ARIMA
+import json
+import multiprocessing
+import os
+import pickle
+import time
 import warnings
 
+from modules.lazy_imports import lazy_import
+from modules.cache_utils import cached, content_hash
+
+def _silence_warnings(module):
+    # statsmodels içe aktarılırken kendi uyarı filtrelerini ekler; sessiz modu yeniden uygula
+    warnings.filterwarnings('ignore')
+
+# Ağır kütüphaneler (sklearn, xgboost, statsmodels) ilk kullanıldıkları anda yüklenir.
+# Böylece sadece geri bildirim sekmesini açan kullanıcı bu maliyeti ödemez.
+sk_model_selection = lazy_import('sklearn.model_selection')
+sk_preprocessing = lazy_import('sklearn.preprocessing')
+sk_pipeline = lazy_import('sklearn.pipeline')
+sk_compose = lazy_import('sklearn.compose')
+sk_ensemble = lazy_import('sklearn.ensemble')
+sk_cluster = lazy_import('sklearn.cluster')
+sk_metrics = lazy_import('sklearn.metrics')
+sk_text = lazy_import('sklearn.feature_extraction.text')
+xgb = lazy_import('xgboost')
+ts_seasonal = lazy_import('statsmodels.tsa.seasonal', on_load=_silence_warnings)
+arima_model = lazy_import('statsmodels.tsa.arima.model', on_load=_silence_warnings)
+
 warnings.filterwarnings('ignore')
 np.random.seed(42)
-sns.set_style('whitegrid')
+# seaborn'un 'whitegrid' stili (seaborn'u yüklemeden)
+plt.style.use('seaborn-v0_8-whitegrid')
 
 # ----------------------------------------------------------------------------
 # ÖRNEK 1: ZAMAN SERİSİ ANALİZİ VE SATIŞ TAHMİNİ
 # ----------------------------------------------------------------------------
 
+# Örnek verideki tatiller ve satışa etkileri: Yılbaşı, Ramazan ve Kurban Bayramı
+SAMPLE_HOLIDAY_EFFECTS = {
+    '2022-01-01': 100, '2022-05-02': 120, '2022-05-03': 150, '2022-05-04': 120,
+    '2022-07-09': 120, '2022-07-10': 150, '2022-07-11': 140, '2022-07-12': 110,
+    '2023-01-01': 110, '2023-04-21': 130, '2023-04-22': 160, '2023-04-23': 130,
+    '2023-06-28': 130, '2023-06-29': 160, '2023-06-30': 150, '2023-07-01': 120,
+    '2024-01-01': 120, '2024-04-10': 140, '2024-04-11': 170, '2024-04-12': 140,
+    '2024-06-16': 140, '2024-06-17': 170, '2024-06-18': 160, '2024-06-19': 130,
+}
+# Yılda 4 kez (her çeyreğin son ayının ilk haftası) büyük promosyon
+SAMPLE_PROMOTION_MONTHS = (3, 6, 9, 12)
+SAMPLE_PROMOTION_DAYS = 7
+SAMPLE_PROMOTION_EFFECT = 80
+
+def _holiday_effects(dates):
+    """Her tarih için tatil etkisi (tatil değilse 0)"""
+    effects = pd.Series(SAMPLE_HOLIDAY_EFFECTS, dtype=float)
+    effects.index = pd.to_datetime(effects.index)
+    return effects.reindex(dates, fill_value=0.0).to_numpy()
+
+def _promotion_mask(dates):
+    return np.isin(dates.month, SAMPLE_PROMOTION_MONTHS) & (dates.day <= SAMPLE_PROMOTION_DAYS)
+
+@cached()
 def create_sample_sales_data(n_days=1095):
     """3 yıllık yapay satış verisi oluşturur"""
     
@@ -35,45 +75,9 @@ def create_sample_sales_data(n_days=1095):
     weekly_seasonality = 20 * np.sin(np.arange(n_days) * (2 * np.pi / 7))
     yearly_seasonality = 100 * np.sin(np.arange(n_days) * (2 * np.pi / 365))
     
-    # Tatil etkisi
-    holidays = pd.Series(0, index=dates)
-    # Yılbaşı, Ramazan ve Kurban Bayramı
-    holidays['2022-01-01'] = 100
-    holidays['2022-05-02'] = 120
-    holidays['2022-05-03'] = 150
-    holidays['2022-05-04'] = 120
-    holidays['2022-07-09'] = 120
-    holidays['2022-07-10'] = 150
-    holidays['2022-07-11'] = 140
-    holidays['2022-07-12'] = 110
-    
-    holidays['2023-01-01'] = 110
-    holidays['2023-04-21'] = 130
-    holidays['2023-04-22'] = 160
-    holidays['2023-04-23'] = 130
-    holidays['2023-06-28'] = 130
-    holidays['2023-06-29'] = 160
-    holidays['2023-06-30'] = 150
-    holidays['2023-07-01'] = 120
-    
-    holidays['2024-01-01'] = 120
-    holidays['2024-04-10'] = 140
-    holidays['2024-04-11'] = 170
-    holidays['2024-04-12'] = 140
-    holidays['2024-06-16'] = 140
-    holidays['2024-06-17'] = 170
-    holidays['2024-06-18'] = 160
-    holidays['2024-06-19'] = 130
-    
-    # Promosyon etkisi
-    promotions = pd.Series(0, index=dates)
-    # Yılda 4 kez büyük promosyon (her 3 ayda bir)
-    for year in [2022, 2023, 2024]:
-        for month in [3, 6, 9, 12]:
-            start_date = pd.Timestamp(f"{year}-{month:02d}-01")
-            end_date = start_date + pd.Timedelta(days=6)
-            mask = (dates >= start_date) & (dates <= end_date)
-            promotions[mask] = 80
+    # Tatil ve promosyon etkisi
+    holidays = pd.Series(_holiday_effects(dates), index=dates)
+    promotions = pd.Series(np.where(_promotion_mask(dates), SAMPLE_PROMOTION_EFFECT, 0), index=dates)
     
     # Rastgele gürültü
     noise = np.random.normal(0, 20, n_days)
@@ -99,6 +103,40 @@ def create_sample_sales_data(n_days=1095):
     
     return df
 
+SALES_DAILY_FLAGS = ['is_holiday', 'is_promotion']     # Günün herhangi bir satırında varsa 1
+
+def load_daily_sales(table_name='sales_data'):
+    """Satış tablosunu SQLite içinde günlük toplamlara indirger
+
+    Yüklenen dosya ne kadar büyük olursa olsun bellekte sadece gün başına bir satır
+    tutulur; aynı günün satırları (ör. mağazalar) toplanır. Takvim özellikleri tarihten
+    yeniden hesaplanır, create_sample_sales_data ile aynı sütunlar döner.
+    """
+    from modules import database_utils as db
+
+    columns = set(db.get_table_columns(table_name))
+    flags = [c for c in SALES_DAILY_FLAGS if c in columns]
+    flag_sql = "".join(f", MAX({db._quote_identifier(c)}) AS {db._quote_identifier(c)}" for c in flags)
+    sql = (f"SELECT date(date) AS day, SUM(sales) AS sales{flag_sql} "
+           f"FROM {db._quote_identifier(table_name)} WHERE date(date) IS NOT NULL GROUP BY day ORDER BY day")
+
+    # İş süreçleri önbelleklerini işler arasında korur; anahtar tablonun damgasını içerdiğinden
+    # arayüzde yeniden yüklenen dosyadan sonra eski günlük toplamlar kullanılmaz
+    daily = db.cached_read("load_daily_sales", table_name, lambda conn: pd.read_sql_query(sql, conn), sql)
+
+    dates = pd.DatetimeIndex(pd.to_datetime(daily['day']))
+    return pd.DataFrame({
+        'date': dates,
+        'sales': daily['sales'].to_numpy(dtype=float),
+        'weekday': dates.dayofweek,
+        'month': dates.month,
+        'year': dates.year,
+        'is_weekend': dates.dayofweek >= 5,
+        **{c: (daily[c].fillna(0).to_numpy() > 0) if c in flags else np.zeros(len(daily), dtype=bool)
+           for c in SALES_DAILY_FLAGS},
+        'day_of_year': dates.dayofyear,
+    })
+
 def analyze_time_series(df):
     """Zaman serisi analizi yapar ve sonuçları döndürür"""
     
@@ -108,14 +146,109 @@ def analyze_time_series(df):
     
     # Mevsimsel ayrıştırma
     try:
-        result = seasonal_decompose(df_ts['sales'], model='additive', period=30)
+        result = ts_seasonal.seasonal_decompose(df_ts['sales'], model='additive', period=30)
         return result
     except Exception as e:
         print(f"Zaman serisi analizi sırasında hata oluştu: {e}")
         return None
 
-def forecast_sales(df, forecast_days=30):
-    """ARIMA modeli ile satış tahmini yapar"""
+# Varsayılan ARIMA derecesi ve otomatik seçimde denenecek (p, d, q) değerleri
+DEFAULT_ARIMA_ORDER = (5, 1, 2)
+ARIMA_P_VALUES = range(0, 6)
+ARIMA_D_VALUES = range(0, 2)
+ARIMA_Q_VALUES = range(0, 3)
+ARIMA_MAXITER = 50                  # Tek bir aday için en fazla optimizasyon adımı
+ARIMA_SEARCH_TIME_BUDGET = 120      # Tüm arama için saniye cinsinden süre sınırı
+
+def _evaluate_arima_order(values, order, maxiter=ARIMA_MAXITER):
+    """Tek bir (p, d, q) adayını eğitir; işçi süreçte çalışır"""
+    warnings.filterwarnings('ignore')
+    start = time.perf_counter()
+    result = {'order': tuple(order), 'aic': np.nan, 'bic': np.nan, 'converged': False,
+              'status': 'error', 'error': None, 'params': None}
+    try:
+        model_fit = arima_model.ARIMA(values, order=order).fit(method_kwargs={'maxiter': maxiter})
+        converged = bool((model_fit.mle_retvals or {}).get('converged', True))
+        result.update({
+            'aic': float(model_fit.aic),
+            'bic': float(model_fit.bic),
+            'converged': converged,
+            # Yakınsamayan adaylar seçime katılmaz
+            'status': 'ok' if converged else 'not_converged',
+            'params': np.asarray(model_fit.params),
+        })
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def select_arima_order(sales_series, p_values=ARIMA_P_VALUES, d_values=ARIMA_D_VALUES,
+                       q_values=ARIMA_Q_VALUES, criterion='aic', max_workers=None,
+                       time_budget=ARIMA_SEARCH_TIME_BUDGET, maxiter=ARIMA_MAXITER):
+    """(p, d, q) adaylarını paralel olarak eğitip AIC/BIC'e göre en iyisini seçer
+
+    Yakınsamayan veya hata veren adaylar elenir; süre sınırı dolduğunda bitmemiş
+    adaylar bırakılır ve işçi süreçler sonlandırılır. Dönüş değeri:
+    {'order', 'criterion', 'score', 'params', 'candidates' (DataFrame), 'seconds'}
+    """
+    if criterion not in ('aic', 'bic'):
+        raise ValueError("criterion 'aic' veya 'bic' olmalıdır")
+
+    values = np.asarray(sales_series, dtype=float)
+    orders = [(p, d, q) for p in p_values for d in d_values for q in q_values]
+    n_workers = max_workers or min(len(orders), os.cpu_count() or 1)
+    search_start = time.perf_counter()
+    deadline = search_start + time_budget
+
+    results = []
+    if n_workers <= 1:
+        for order in orders:
+            if time.perf_counter() > deadline:
+                results.append({'order': order, 'status': 'timeout', 'seconds': np.nan})
+                continue
+            results.append(_evaluate_arima_order(values, order, maxiter))
+    else:
+        pool = multiprocessing.get_context('spawn').Pool(processes=n_workers)
+        try:
+            pending = [(order, pool.apply_async(_evaluate_arima_order, (values, order, maxiter)))
+                       for order in orders]
+            for order, async_result in pending:
+                remaining = max(deadline - time.perf_counter(), 0)
+                try:
+                    results.append(async_result.get(timeout=remaining))
+                except multiprocessing.TimeoutError:
+                    results.append({'order': order, 'status': 'timeout', 'seconds': np.nan})
+        finally:
+            # Süresi dolan denemeleri beklemeden bırak
+            pool.terminate()
+            pool.join()
+
+    candidates = pd.DataFrame(results)
+    for col in ('aic', 'bic', 'converged', 'error', 'params'):
+        if col not in candidates.columns:
+            candidates[col] = np.nan if col in ('aic', 'bic') else None
+    valid = candidates[candidates['status'] == 'ok']
+    if valid.empty:
+        raise RuntimeError("Hiçbir ARIMA adayı süre sınırı içinde yakınsamadı")
+
+    best = valid.loc[valid[criterion].idxmin()]
+    candidates = candidates.sort_values(criterion, na_position='last').reset_index(drop=True)
+    return {
+        'order': tuple(best['order']),
+        'criterion': criterion,
+        'score': float(best[criterion]),
+        'params': best['params'],
+        'candidates': candidates.drop(columns=['params']),
+        'seconds': time.perf_counter() - search_start,
+    }
+
+def forecast_sales(df, forecast_days=30, order=DEFAULT_ARIMA_ORDER, criterion='aic', return_details=False):
+    """ARIMA modeli ile satış tahmini yapar
+
+    order='auto' verilirse (p, d, q) derecesi select_arima_order ile paralel olarak seçilir.
+    return_details=True ise (tahmin, ayrıntılar) döner; ayrıntılar seçilen dereceyi
+    ve aday başına süre/AIC/BIC tablosunu içerir.
+    """
 
     # Tarihi dizin olarak ayarla
     df_forecast = df.copy()
@@ -125,9 +258,17 @@ def forecast_sales(df, forecast_days=30):
     sales_series = df_forecast['sales']
 
     try:
+        details = {'order': tuple(order) if order != 'auto' else None}
+        start_params = None
+        if order == 'auto':
+            details = select_arima_order(sales_series, criterion=criterion)
+            order = details['order']
+            # Seçimde bulunan parametrelerden başla: son eğitim hızlı yakınsar
+            start_params = details['params']
+
         # ARIMA parametreleri (p, d, q)
-        model = ARIMA(sales_series, order=(5, 1, 2))
-        model_fit = model.fit()
+        model = arima_model.ARIMA(sales_series, order=order)
+        model_fit = model.fit(start_params=start_params)
 
         # Tahmin ve güven aralığı
         forecast_object = model_fit.get_forecast(steps=forecast_days)
@@ -136,115 +277,709 @@ def forecast_sales(df, forecast_days=30):
         forecast_index = pd.date_range(start=sales_series.index[-1] + pd.Timedelta(days=1), periods=forecast_days)
         forecast_series = pd.Series(forecast.values, index=forecast_index)
 
+        if return_details:
+            details.pop('params', None)
+            return forecast_series, details
         return forecast_series
     except Exception as e:
         print(f"Satış tahmini sırasında hata oluştu: {e}")
+        return (None, None) if return_details else None
+
+# Toplu (çok serili) tahmin ayarları
+DEFAULT_SERIES_ID = 'total'         # Tek seri tahmini arima_forecast tablosunda bu kimlikle tutulur
+BATCH_MIN_OBSERVATIONS = 30         # Bundan kısa seriler eğitilmeden başarısız sayılır
+BATCH_FLUSH_SERIES = 200            # Kaç serinin sonucu biriktirilip tek işlemde yazılır
+BATCH_TASKS_PER_WORKER = 4          # İşçi başına bekleyen en fazla seri (bellek sınırı)
+
+def _series_id_for(key):
+    # ('P001', 'S01') -> 'P001|S01'
+    if isinstance(key, tuple):
+        return '|'.join(str(k) for k in key)
+    return str(key)
+
+def _iter_series(df, key_columns, date_column, value_column, freq):
+    """Uzun formattaki veriyi seri seri (kimlik, başlangıç tarihi, değerler) olarak üretir"""
+    data = df[list(key_columns) + [date_column, value_column]].copy()
+    data[date_column] = pd.to_datetime(data[date_column])
+    for key, group in data.groupby(list(key_columns), sort=True):
+        key = key if len(key_columns) > 1 else (key[0] if isinstance(key, tuple) else key)
+        # Aynı güne düşen kayıtlar toplanır, eksik günler satış yok (0) kabul edilir
+        series = group.groupby(date_column)[value_column].sum().asfreq(freq, fill_value=0)
+        yield _series_id_for(key), series.index[0], series.to_numpy(dtype=float)
+
+def _forecast_one_series(series_id, start, values, forecast_days, order, freq, maxiter):
+    """Tek bir seriyi eğitip tahmin eder; işçi süreçte çalışır"""
+    warnings.filterwarnings('ignore')
+    started = time.perf_counter()
+    result = {'series_id': series_id, 'n_obs': len(values), 'status': 'error',
+              'error': None, 'forecast': None}
+    try:
+        if len(values) < BATCH_MIN_OBSERVATIONS:
+            raise ValueError(f"yetersiz gözlem ({len(values)} < {BATCH_MIN_OBSERVATIONS})")
+        index = pd.date_range(start=start, periods=len(values), freq=freq)
+        model_fit = arima_model.ARIMA(pd.Series(values, index=index), order=order).fit(
+            method_kwargs={'maxiter': maxiter})
+        forecast = model_fit.forecast(steps=forecast_days)
+        result['forecast'] = pd.DataFrame({
+            'series_id': series_id,
+            'date': pd.date_range(start=index[-1], periods=forecast_days + 1, freq=freq)[1:],
+            'predicted_sales': np.asarray(forecast, dtype=float),
+        })
+        result['status'] = 'ok'
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+def forecast_sales_batch(df, key_columns=('product_id', 'store_id'), date_column='date',
+                         value_column='sales', forecast_days=30, order=DEFAULT_ARIMA_ORDER,
+                         freq='D', max_workers=None, maxiter=ARIMA_MAXITER,
+                         table_name='arima_forecast', flush_every=BATCH_FLUSH_SERIES,
+                         progress_callback=None):
+    """Çok sayıda seriyi (ör. ürün x mağaza) paralel olarak tahmin edip tabloya yazar
+
+    df uzun formattadır: her satır bir seri anahtarı, tarih ve satış değeri içerir.
+    Seriler işçi süreçlere sırayla verilir; aynı anda en fazla
+    işçi sayısı x BATCH_TASKS_PER_WORKER seri bellekte bekler. Tamamlanan sonuçlar
+    flush_every seride bir arima_forecast tablosuna (series_id bazında) yazılır; tahmini
+    başarısız olan serilerin önceki çalıştırmalardan kalan satırları silinir.
+    table_name=None ise tahminler yazılmaz, dönen özet içinde verilir.
+    progress_callback(tamamlanan, toplam) verilirse her seri sonrası çağrılır.
+
+    Dönüş değeri: {'series_total', 'series_ok', 'series_failed', 'rows_written',
+    'stale_rows_deleted', 'seconds', 'series_per_second', 'failures' (DataFrame), 'timings' (DataFrame)}
+    ve table_name=None ise 'forecasts'
+    """
+    from modules import database_utils as db
+
+    key_columns = [key_columns] if isinstance(key_columns, str) else list(key_columns)
+    missing = [c for c in key_columns + [date_column, value_column] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Eksik sütunlar: {missing}")
+
+    n_series = int(df.groupby(key_columns).ngroups)
+    n_workers = max_workers or min(n_series, os.cpu_count() or 1)
+    started = time.perf_counter()
+    buffer, timings, failures, collected = [], [], [], []
+    failed_pending = []
+    rows_written = stale_rows_deleted = 0
+
+    def flush():
+        nonlocal rows_written, stale_rows_deleted
+        if table_name is not None and failed_pending:
+            # Başarısız serinin eski tahmini güncelmiş gibi okunmasın
+            stale_rows_deleted += db.delete_partitions(table_name, 'series_id', failed_pending)
+        failed_pending.clear()
+        if not buffer:
+            return
+        frame = pd.concat(buffer, ignore_index=True)
+        buffer.clear()
+        if table_name is None:
+            collected.append(frame)
+        else:
+            # Anlık görüntü her parçada değil, iş sonunda bir kez yenilenir
+            db.replace_partitions(frame, table_name, 'series_id', refresh_snapshot=False)
+        rows_written += len(frame)
+
+    def collect(result):
+        timings.append({'series_id': result['series_id'], 'n_obs': result['n_obs'],
+                        'status': result['status'], 'seconds': result['seconds']})
+        if result['status'] == 'ok':
+            buffer.append(result['forecast'])
+        else:
+            failures.append({'series_id': result['series_id'], 'error': result['error']})
+            failed_pending.append(result['series_id'])
+        if len(timings) % flush_every == 0:
+            flush()
+        if progress_callback is not None:
+            progress_callback(len(timings), n_series)
+
+    series_iter = _iter_series(df, key_columns, date_column, value_column, freq)
+    task_args = (forecast_days, order, freq, maxiter)
+    if n_workers <= 1:
+        for series_id, start, values in series_iter:
+            collect(_forecast_one_series(series_id, start, values, *task_args))
+    else:
+        # Pool.imap girdinin tamamını kuyruğa aldığından, bekleyen iş sayısı burada sınırlanır
+        max_pending = n_workers * BATCH_TASKS_PER_WORKER
+        pool = multiprocessing.get_context('spawn').Pool(processes=n_workers)
+        try:
+            pending = []
+            for series_id, start, values in series_iter:
+                pending.append(pool.apply_async(_forecast_one_series,
+                                                (series_id, start, values, *task_args)))
+                while len(pending) >= max_pending:
+                    collect(pending.pop(0).get())
+            for async_result in pending:
+                collect(async_result.get())
+        finally:
+            pool.terminate()
+            pool.join()
+
+    flush()
+    if table_name is not None and (rows_written or stale_rows_deleted):
+        db.refresh_columnar_snapshot(table_name)
+
+    seconds = time.perf_counter() - started
+    summary = {
+        'series_total': len(timings),
+        'series_ok': len(timings) - len(failures),
+        'series_failed': len(failures),
+        'rows_written': rows_written,
+        'stale_rows_deleted': stale_rows_deleted,
+        'seconds': seconds,
+        'series_per_second': len(timings) / seconds if seconds > 0 else np.nan,
+        'failures': pd.DataFrame(failures, columns=['series_id', 'error']),
+        'timings': pd.DataFrame(timings),
+    }
+    if table_name is None:
+        summary['forecasts'] = (pd.concat(collected, ignore_index=True) if collected
+                                else pd.DataFrame(columns=['series_id', 'date', 'predicted_sales']))
+    return summary
+
+# Artımlı (incremental) ARIMA güncellemesi: eğitilmiş model saklanır, yeni günler
+# parametreler yeniden tahmin edilmeden sadece Kalman filtresinden geçirilir.
+# Aşağıdaki koşullardan biri gerçekleşirse model baştan eğitilir.
+ARIMA_REFIT_POLICY = {
+    'max_appended_obs': 90,     # Son tam eğitimden bu yana eklenen gözlem sayısı sınırı
+    'max_age_days': 30,         # Son tam eğitimden bu yana geçen takvim günü sınırı
+    'error_ratio': 2.0,         # Yeni günlerin tahmin hatası (RMSE) / eğitimdeki hata standart sapması
+}
+
+_arima_state_ready = set()
+
+def init_arima_state_table():
+    """Eğitilmiş ARIMA modellerinin saklandığı tabloyu oluşturur"""
+    from modules import database_utils as db
+    key = (os.getpid(), os.path.abspath(db.DB_PATH))
+    if key in _arima_state_ready:
+        return
+    with db.write_connection() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS arima_models (
+                series_id TEXT PRIMARY KEY,
+                model_order TEXT NOT NULL,
+                first_date TIMESTAMP,
+                last_date TIMESTAMP,
+                n_obs INTEGER,
+                data_hash TEXT,
+                appended_obs INTEGER DEFAULT 0,
+                sigma REAL,
+                fitted_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                fit_seconds REAL,
+                results BLOB
+            )
+        ''')
+    _arima_state_ready.add(key)
+
+def load_arima_state(series_id=DEFAULT_SERIES_ID):
+    """Saklanan ARIMA modelini ve özet bilgilerini döndürür (yoksa None)"""
+    from modules import database_utils as db
+    init_arima_state_table()
+    with db.read_connection() as conn:
+        row = conn.execute(
+            "SELECT series_id, model_order, first_date, last_date, n_obs, data_hash, appended_obs, "
+            "sigma, fitted_at, updated_at, fit_seconds, results FROM arima_models WHERE series_id=?",
+            (series_id,)).fetchone()
+    if row is None:
         return None
+    columns = ['series_id', 'order', 'first_date', 'last_date', 'n_obs', 'data_hash', 'appended_obs',
+               'sigma', 'fitted_at', 'updated_at', 'fit_seconds', 'results']
+    state = dict(zip(columns, row))
+    state['order'] = tuple(json.loads(state['order']))
+    for col in ('first_date', 'last_date', 'fitted_at', 'updated_at'):
+        state[col] = pd.Timestamp(state[col])
+    state['results'] = pickle.loads(state['results'])
+    return state
+
+def _save_arima_state(state):
+    from modules import database_utils as db
+    init_arima_state_table()
+    fmt = '%Y-%m-%d %H:%M:%S'
+    with db.write_connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO arima_models (series_id, model_order, first_date, last_date, n_obs, "
+            "data_hash, appended_obs, sigma, fitted_at, updated_at, fit_seconds, results) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (state['series_id'], json.dumps(list(state['order'])), state['first_date'].strftime(fmt),
+             state['last_date'].strftime(fmt), int(state['n_obs']), state['data_hash'],
+             int(state['appended_obs']), float(state['sigma']), state['fitted_at'].strftime(fmt),
+             state['updated_at'].strftime(fmt), float(state['fit_seconds']),
+             pickle.dumps(state['results'], protocol=pickle.HIGHEST_PROTOCOL)))
+
+def _series_hash(series):
+    return content_hash(series.index.asi8, series.to_numpy(dtype=float))
+
+def _refit_reason(state, series, order, policy):
+    """Tam eğitim gerekiyorsa nedenini, artımlı güncelleme yeterliyse None döndürür"""
+    if state is None:
+        return "kayıtlı model yok"
+    if order != 'auto' and tuple(order) != state['order']:
+        return f"ARIMA derecesi değişti {state['order']} -> {tuple(order)}"
+    if series.index[0] != state['first_date'] or series.index[-1] < state['last_date']:
+        return "seri başlangıcı/bitişi değişti"
+    known = series[:state['last_date']]
+    if len(known) != state['n_obs'] or _series_hash(known) != state['data_hash']:
+        return "geçmiş veriler değişti"
+    new_obs = len(series) - len(known)
+    if state['appended_obs'] + new_obs > policy['max_appended_obs']:
+        return f"{state['appended_obs'] + new_obs} gözlem eklendi (sınır {policy['max_appended_obs']})"
+    age_days = (pd.Timestamp.now() - state['fitted_at']).days
+    if new_obs and age_days > policy['max_age_days']:
+        return f"son tam eğitim {age_days} gün önce (sınır {policy['max_age_days']})"
+    return None
+
+def update_forecast_model(df, forecast_days=30, series_id=DEFAULT_SERIES_ID, order=DEFAULT_ARIMA_ORDER,
+                          criterion='aic', policy=None, force_refit=False):
+    """Saklanan ARIMA modelini yeni günlerle günceller ve tahmin yapar
+
+    Model yoksa, geçmiş veriler değiştiyse veya yeniden eğitim politikası
+    (ARIMA_REFIT_POLICY) aşıldıysa model baştan eğitilir ve saklanır. Aksi halde
+    sadece yeni gözlemler mevcut parametrelerle filtreden geçirilir (results.extend).
+    Yeni günlerin tek adımlık tahmin hatası eğitimdeki hatanın error_ratio katını
+    aşarsa model bozulmuş sayılıp yeniden eğitilir.
+
+    Dönüş değeri: (tahmin serisi, bilgi). Bilgi sözlüğü 'action'
+    ('refit' | 'append' | 'reuse'), 'reason', 'new_observations', 'order' ve 'seconds' içerir.
+    """
+    policy = {**ARIMA_REFIT_POLICY, **(policy or {})}
+    started = time.perf_counter()
+
+    series = df.set_index('date')['sales'].sort_index().astype(float)
+    series.index = pd.DatetimeIndex(series.index)
+    # Durum uzayı güncellemesi düzenli bir zaman dizini gerektirir; eksik günler NaN olur
+    series = series.asfreq('D')
+
+    state = None if force_refit else load_arima_state(series_id)
+    reason = "zorunlu yeniden eğitim" if force_refit else _refit_reason(state, series, order, policy)
+    info = {'series_id': series_id, 'new_observations': 0}
+
+    if reason is None:
+        new_data = series[series.index > state['last_date']]
+        results = state['results']
+        if len(new_data):
+            extended = results.extend(new_data)
+            errors = np.asarray(extended.resid, dtype=float)
+            rmse = float(np.sqrt(np.nanmean(errors ** 2))) if np.isfinite(errors).any() else 0.0
+            if state['sigma'] > 0 and rmse > policy['error_ratio'] * state['sigma']:
+                reason = f"yeni günlerin hatası yükseldi (RMSE {rmse:.1f} > {policy['error_ratio']} x {state['sigma']:.1f})"
+            else:
+                results = extended
+                state.update({
+                    'results': results,
+                    'last_date': series.index[-1],
+                    'n_obs': len(series),
+                    'data_hash': _series_hash(series),
+                    'appended_obs': state['appended_obs'] + len(new_data),
+                    'updated_at': pd.Timestamp.now(),
+                })
+                _save_arima_state(state)
+        info.update({'action': 'append' if len(new_data) else 'reuse', 'reason': None,
+                     'new_observations': len(new_data)})
+
+    if reason is not None:
+        search = None
+        fit_order = order
+        start_params = None
+        if order == 'auto':
+            search = select_arima_order(series.dropna(), criterion=criterion)
+            fit_order = search['order']
+            start_params = search['params']
+        fit_started = time.perf_counter()
+        results = arima_model.ARIMA(series, order=fit_order).fit(start_params=start_params)
+        now = pd.Timestamp.now()
+        state = {
+            'series_id': series_id,
+            'order': tuple(fit_order),
+            'first_date': series.index[0],
+            'last_date': series.index[-1],
+            'n_obs': len(series),
+            'data_hash': _series_hash(series),
+            'appended_obs': 0,
+            'sigma': float(np.sqrt(results.params['sigma2'])),
+            'fitted_at': now,
+            'updated_at': now,
+            'fit_seconds': time.perf_counter() - fit_started,
+            'results': results,
+        }
+        _save_arima_state(state)
+        info.update({'action': 'refit', 'reason': reason})
+        if search is not None:
+            search.pop('params', None)
+            info['search'] = search
+
+    forecast = results.forecast(steps=forecast_days)
+    forecast_series = pd.Series(np.asarray(forecast, dtype=float),
+                                index=pd.date_range(start=series.index[-1] + pd.Timedelta(days=1),
+                                                    periods=forecast_days))
+    info.update({'order': state['order'], 'seconds': time.perf_counter() - started,
+                 'fitted_at': state['fitted_at'], 'appended_obs': state['appended_obs']})
+    return forecast_series, info
+
+# Satış ML modellerinin hiperparametreleri (model kaydı parmak izine dahildir)
+SALES_RF_PARAMS = {'n_estimators': 100, 'random_state': 42}
+SALES_XGB_PARAMS = {'n_estimators': 100, 'learning_rate': 0.1, 'max_depth': 7, 'random_state': 42}
+SALES_NUMERIC_FEATURES = ['weekday', 'month', 'year', 'day_of_year']
+SALES_BINARY_FEATURES = ['is_weekend', 'is_holiday', 'is_promotion']
 
-def train_ml_sales_model(df):
-    """Makine öğrenmesi modeli ile satış tahmini"""
+# 'fast' eğitim modu: iki model eşzamanlı eğitilir, özellikler float32'dir, XGBoost
+# histogram tabanlı ağaç kurar ve her iki model de zaman sıralı doğrulama dilimiyle
+# erken durdurulur (RandomForest ağaç sayısı adım adım artırılarak)
+SALES_TRAINING_MODES = ('standard', 'fast')
+SALES_VALIDATION_FRACTION = 0.2     # Tarih sırasına göre son %20 doğrulama dilimi
+SALES_FAST_RF_PARAMS = {'max_estimators': 300, 'step': 25, 'n_iter_no_change': 2, 'tol': 1e-3,
+                        'random_state': 42}
+SALES_FAST_XGB_PARAMS = {**SALES_XGB_PARAMS, 'n_estimators': 1000, 'tree_method': 'hist',
+                         'max_bin': 256, 'early_stopping_rounds': 20}
+
+def _registered_model(key, fit, model_params, fingerprint_data, use_registry):
+    """fit() -> (model, metrikler); use_registry ise parmak izi eşleşen kayıtlı model kullanılır"""
+    from modules import model_registry
+    
+    if not use_registry:
+        started = time.perf_counter()
+        model, metrics = fit()
+        seconds = time.perf_counter() - started
+        return model, {'model_id': None, 'trained': True, 'seconds': seconds, 'train_seconds': seconds,
+                       'created_at': None, **metrics}
+    fingerprint = model_registry.model_fingerprint(fingerprint_data, model_params)
+    model, info = model_registry.get_or_train(f'sales_{key}', fingerprint, fit, params=model_params)
+    details = {name: info[name] for name in ('model_id', 'trained', 'seconds', 'train_seconds', 'created_at')}
+    details.update(info['metrics'])
+    return model, details
+
+def _fit_forest_early_stopping(X_train, y_train, X_val, y_val, n_jobs):
+    """RandomForest'ı ağaç ekleyerek büyütür; doğrulama hatası iyileşmeyince durur"""
+    params = SALES_FAST_RF_PARAMS
+    model = sk_ensemble.RandomForestRegressor(n_estimators=params['step'], warm_start=True, n_jobs=n_jobs,
+                                              random_state=params['random_state'])
+    best_mae, best_n, no_change = np.inf, 0, 0
+    for n_estimators in range(params['step'], params['max_estimators'] + 1, params['step']):
+        # warm_start: sadece yeni ağaçlar eğitilir
+        model.set_params(n_estimators=n_estimators)
+        model.fit(X_train, y_train)
+        mae = sk_metrics.mean_absolute_error(y_val, model.predict(X_val))
+        if mae < best_mae * (1 - params['tol']):
+            best_mae, best_n, no_change = mae, n_estimators, 0
+        else:
+            no_change += 1
+            if no_change >= params['n_iter_no_change']:
+                break
+    # En iyi sonuca ulaşıldıktan sonra eklenen ağaçlar atılır
+    model.estimators_ = model.estimators_[:best_n]
+    model.set_params(n_estimators=best_n, warm_start=False)
+    return model, {'test_mae': float(best_mae), 'n_estimators': best_n}
+
+def _fit_xgb_early_stopping(X_train, y_train, X_val, y_val, n_jobs):
+    model = xgb.XGBRegressor(**SALES_FAST_XGB_PARAMS, n_jobs=n_jobs)
+    model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    mae = sk_metrics.mean_absolute_error(y_val, model.predict(X_val))
+    return model, {'test_mae': float(mae), 'n_estimators': int(model.best_iteration) + 1}
+
+def _train_sales_models_fast(df, use_registry, n_jobs):
+    from concurrent.futures import ThreadPoolExecutor
+    
+    features = SALES_NUMERIC_FEATURES + SALES_BINARY_FEATURES
+    data = df.sort_values('date')
+    # Ağaç modelleri ölçeklemeye ihtiyaç duymaz; özellikler doğrudan float32'ye çevrilir
+    preprocessor = sk_pipeline.Pipeline([
+        ('select', sk_compose.ColumnTransformer([('features', 'passthrough', features)])),
+        ('float32', sk_preprocessing.FunctionTransformer(np.asarray, kw_args={'dtype': np.float32})),
+    ])
+    X = preprocessor.fit_transform(data)
+    y = data['sales'].to_numpy(dtype=np.float32)
+    # Gelecekteki günler eğitime sızmasın: doğrulama dilimi en son tarihlerdir
+    n_val = max(1, int(len(data) * SALES_VALIDATION_FRACTION))
+    X_train, X_val, y_train, y_val = X[:-n_val], X[-n_val:], y[:-n_val], y[-n_val:]
+    
+    # İki model aynı anda eğitilir; çekirdekler aralarında paylaştırılır
+    n_jobs = n_jobs or os.cpu_count() or 1
+    jobs_per_model = max(1, n_jobs // 2)
+    fitters = {'rf': (_fit_forest_early_stopping, SALES_FAST_RF_PARAMS),
+               'xgb': (_fit_xgb_early_stopping, SALES_FAST_XGB_PARAMS)}
+    
+    def train(key):
+        fit_fn, params = fitters[key]
+        def fit():
+            model, metrics = fit_fn(X_train, y_train, X_val, y_val, jobs_per_model)
+            model.set_params(n_jobs=n_jobs)
+            return sk_pipeline.Pipeline([('preprocessor', preprocessor), ('model', model)]), metrics
+        model_params = {'model': key, 'mode': 'fast', 'features': features,
+                        'validation_fraction': SALES_VALIDATION_FRACTION, **params}
+        return _registered_model(key, fit, model_params, (X_train, y_train, X_val, y_val), use_registry)
+    
+    # Modeller C/C++ kodunda GIL'i bıraktığından thread'ler gerçek paralellik sağlar
+    with ThreadPoolExecutor(max_workers=len(fitters)) as executor:
+        results = dict(zip(fitters, executor.map(train, fitters)))
+    return [results[key][0] for key in fitters], {key: results[key][1] for key in fitters}
+
+def train_ml_sales_model(df, use_registry=True, return_details=False, mode='standard', n_jobs=None):
+    """Makine öğrenmesi modeli ile satış tahmini
+
+    use_registry=True ise aynı eğitim verisi ve hiperparametrelerle daha önce eğitilmiş
+    modeller model kaydından (modules.model_registry) yüklenir, yeniden eğitilmez.
+    mode='fast' ise modeller eşzamanlı, histogram tabanlı ve zaman sıralı doğrulama
+    dilimiyle erken durdurularak eğitilir (n_jobs: kullanılacak toplam çekirdek).
+    return_details=True ise (rf, xgb, ayrıntılar) döner; ayrıntılar model başına
+    model_id, eğitilip eğitilmediği, süre ve test MAE değerini içerir.
+    """
+    if mode not in SALES_TRAINING_MODES:
+        raise ValueError(f"Geçersiz eğitim modu: {mode}")
     
     try:
-        # Özellikler ve hedef değişken
-        X = df.drop(['sales', 'date'], axis=1)
-        y = df['sales']
+        if mode == 'fast':
+            (rf_pipeline, xgb_pipeline), details = _train_sales_models_fast(df, use_registry, n_jobs)
+            if return_details:
+                return rf_pipeline, xgb_pipeline, details
+            return rf_pipeline, xgb_pipeline
+        
+        # Özellikler ve hedef değişken (tarih sırasıyla)
+        data = df.sort_values('date')
+        X = data.drop(['sales', 'date'], axis=1)
+        y = data['sales']
         
         # One-hot encoding için kategorik değişkenler
         categorical_features = []
-        numeric_features = ['weekday', 'month', 'year', 'day_of_year']
-        binary_features = ['is_weekend', 'is_holiday', 'is_promotion']
+        numeric_features = SALES_NUMERIC_FEATURES
+        binary_features = SALES_BINARY_FEATURES
         
         # Veri ön işleme pipeline'ı
-        preprocessor = ColumnTransformer(
+        preprocessor = sk_compose.ColumnTransformer(
             transformers=[
-                ('num', StandardScaler(), numeric_features),
+                ('num', sk_preprocessing.StandardScaler(), numeric_features),
                 ('bin', 'passthrough', binary_features)
             ])
         
-        # Eğitim ve test verileri
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        # Eğitim ve test verileri: rastgele bölme gelecekteki günleri eğitime sızdırır,
+        # test dilimi en son tarihlerdir (hızlı moddaki doğrulama dilimiyle aynı oran)
+        n_test = max(1, int(len(data) * SALES_VALIDATION_FRACTION))
+        X_train, X_test, y_train, y_test = X[:-n_test], X[-n_test:], y[:-n_test], y[-n_test:]
         
         # RandomForest modeli
-        rf_pipeline = Pipeline([
+        rf_pipeline = sk_pipeline.Pipeline([
             ('preprocessor', preprocessor),
-            ('model', RandomForestRegressor(n_estimators=100, random_state=42))
+            ('model', sk_ensemble.RandomForestRegressor(**SALES_RF_PARAMS))
         ])
         
         # XGBoost modeli
-        xgb_pipeline = Pipeline([
+        xgb_pipeline = sk_pipeline.Pipeline([
             ('preprocessor', preprocessor),
-            ('model', xgb.XGBRegressor(n_estimators=100, learning_rate=0.1, max_depth=7, random_state=42))
+            ('model', xgb.XGBRegressor(**SALES_XGB_PARAMS))
         ])
         
-        # Modelleri eğit
-        rf_pipeline.fit(X_train, y_train)
-        xgb_pipeline.fit(X_train, y_train)
+        def fit(pipeline):
+            # Modeli eğit ve test hatasını kayda metrik olarak ekle
+            pipeline.fit(X_train, y_train)
+            mae = sk_metrics.mean_absolute_error(y_test, pipeline.predict(X_test))
+            return pipeline, {'test_mae': float(mae)}
+        
+        details = {}
+        models = []
+        for key, pipeline, params in (('rf', rf_pipeline, SALES_RF_PARAMS), ('xgb', xgb_pipeline, SALES_XGB_PARAMS)):
+            model_params = {'model': key, 'features': numeric_features + binary_features, **params}
+            model, details[key] = _registered_model(key, lambda pipeline=pipeline: fit(pipeline), model_params,
+                                                    (X_train, y_train, X_test, y_test), use_registry)
+            models.append(model)
         
+        rf_pipeline, xgb_pipeline = models
+        if return_details:
+            return rf_pipeline, xgb_pipeline, details
         return rf_pipeline, xgb_pipeline
     except Exception as e:
         print(f"ML modeli eğitimi sırasında hata oluştu: {e}")
-        return None, None
+        return (None, None, None) if return_details else (None, None)
+
+# Geriye dönük test (backtest) ile karşılaştırılan modeller
+BACKTEST_MODELS = ('arima', 'rf', 'xgb')
+BACKTEST_MODEL_NAMES = {'arima': 'ARIMA', 'rf': 'RandomForest', 'xgb': 'XGBoost'}
+
+@cached()
+def _fold_features(X_train, X_test):
+    """Bir katmanın ölçeklenmiş özellik matrisleri (float32); aynı katman için önbellekten döner"""
+    scaler = sk_preprocessing.StandardScaler().fit(X_train[SALES_NUMERIC_FEATURES])
+    def transform(X):
+        return np.hstack([scaler.transform(X[SALES_NUMERIC_FEATURES]),
+                          X[SALES_BINARY_FEATURES].to_numpy(dtype=float)]).astype(np.float32)
+    return transform(X_train), transform(X_test)
+
+def _run_backtest_task(model_name, fold, y_train, horizon, X_train, X_test, arima_order):
+    """Tek bir (model, katman) eğitimi ve tahmini; işçi süreçte çalışır"""
+    warnings.filterwarnings('ignore')
+    started = time.perf_counter()
+    result = {'model': model_name, 'fold': fold, 'status': 'error', 'error': None, 'predictions': None}
+    try:
+        if model_name == 'arima':
+            model_fit = arima_model.ARIMA(y_train, order=arima_order).fit()
+            predictions = model_fit.forecast(steps=horizon)
+        elif model_name == 'rf':
+            # Paralellik katmanlar arasında; her model tek çekirdek kullanır
+            model = sk_ensemble.RandomForestRegressor(**SALES_RF_PARAMS, n_jobs=1).fit(X_train, y_train)
+            predictions = model.predict(X_test)
+        elif model_name == 'xgb':
+            model = xgb.XGBRegressor(**SALES_XGB_PARAMS, n_jobs=1).fit(X_train, y_train)
+            predictions = model.predict(X_test)
+        else:
+            raise ValueError(f"Bilinmeyen model: {model_name}")
+        result['predictions'] = np.asarray(predictions, dtype=float)
+        result['status'] = 'ok'
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+def backtest_sales_models(df, horizon=30, n_folds=5, models=BACKTEST_MODELS,
+                          arima_order=DEFAULT_ARIMA_ORDER, max_train_size=None,
+                          max_workers=None, progress_callback=None):
+    """Kayan başlangıç noktalı (rolling-origin) geriye dönük test
+
+    Veri tarih sırasıyla n_folds katmana bölünür (TimeSeriesSplit): her katmanda
+    model sadece başlangıç noktasından önceki günlerle eğitilir ve sonraki
+    'horizon' gün tahmin edilir; böylece gelecekteki veri eğitime sızmaz.
+    max_train_size verilirse sabit uzunlukta kayan pencere kullanılır.
+    Tüm (model, katman) eğitimleri işçi süreçlerde paralel çalışır.
+
+    Dönüş değeri: {'summary' (model başına MAE/RMSE ve hesaplama süresi),
+    'by_horizon' (model ve tahmin ufku adımı başına MAE/RMSE), 'folds', 'seconds'}
+    """
+    started = time.perf_counter()
+    data = df.sort_values('date').reset_index(drop=True)
+    y = data['sales'].to_numpy(dtype=float)
+    X = data[SALES_NUMERIC_FEATURES + SALES_BINARY_FEATURES]
+
+    splitter = sk_model_selection.TimeSeriesSplit(n_splits=n_folds, test_size=horizon,
+                                                  max_train_size=max_train_size)
+    folds = list(splitter.split(X))
+
+    tasks = []
+    for fold, (train_idx, test_idx) in enumerate(folds):
+        X_train, X_test = None, None
+        if any(model != 'arima' for model in models):
+            X_train, X_test = _fold_features(X.iloc[train_idx], X.iloc[test_idx])
+        for model_name in models:
+            # ARIMA sadece seriyi kullanır, özellik matrisleri işçiye gönderilmez
+            features = (None, None) if model_name == 'arima' else (X_train, X_test)
+            tasks.append((model_name, fold, y[train_idx], len(test_idx), *features, arima_order))
+    # En yavaş modeller önce dağıtılır: işçiler sonda boş beklemez
+    tasks.sort(key=lambda task: task[0] != 'arima')
+
+    results = []
+    def collect(result):
+        results.append(result)
+        if progress_callback is not None:
+            progress_callback(len(results), len(tasks))
+
+    n_workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+    if n_workers <= 1:
+        for task in tasks:
+            collect(_run_backtest_task(*task))
+    else:
+        pool = multiprocessing.get_context('spawn').Pool(processes=n_workers)
+        try:
+            pending = [pool.apply_async(_run_backtest_task, task) for task in tasks]
+            for async_result in pending:
+                collect(async_result.get())
+        finally:
+            pool.terminate()
+            pool.join()
+
+    fold_rows, error_rows = [], []
+    for result in results:
+        train_idx, test_idx = folds[result['fold']]
+        row = {'model': BACKTEST_MODEL_NAMES.get(result['model'], result['model']),
+               'fold': result['fold'], 'origin': data['date'].iloc[test_idx[0]],
+               'train_size': len(train_idx), 'status': result['status'],
+               'error': result['error'], 'seconds': result['seconds'],
+               'mae': np.nan, 'rmse': np.nan}
+        if result['status'] == 'ok':
+            errors = result['predictions'] - y[test_idx]
+            row['mae'] = float(np.mean(np.abs(errors)))
+            row['rmse'] = float(np.sqrt(np.mean(errors ** 2)))
+            error_rows.append(pd.DataFrame({'model': row['model'], 'horizon': np.arange(1, len(errors) + 1),
+                                            'abs_error': np.abs(errors), 'sq_error': errors ** 2}))
+        fold_rows.append(row)
+
+    fold_results = pd.DataFrame(fold_rows).sort_values(['model', 'fold']).reset_index(drop=True)
+    summary = fold_results.groupby('model').agg(
+        folds_ok=('status', lambda s: int((s == 'ok').sum())),
+        mae=('mae', 'mean'),
+        rmse=('rmse', 'mean'),
+        fit_seconds_total=('seconds', 'sum'),
+        fit_seconds_per_fold=('seconds', 'mean'),
+    ).sort_values('mae').reset_index()
+
+    if error_rows:
+        errors = pd.concat(error_rows, ignore_index=True)
+        by_horizon = errors.groupby(['model', 'horizon']).agg(mae=('abs_error', 'mean'),
+                                                              mse=('sq_error', 'mean')).reset_index()
+        by_horizon['rmse'] = np.sqrt(by_horizon.pop('mse'))
+    else:
+        by_horizon = pd.DataFrame(columns=['model', 'horizon', 'mae', 'rmse'])
+
+    return {
+        'summary': summary,
+        'by_horizon': by_horizon,
+        'folds': fold_results,
+        'seconds': time.perf_counter() - started,
+    }
 
 # ----------------------------------------------------------------------------
 # ÖRNEK 2: ANOMALİ TESPİTİ VE MÜŞTERİ SEGMENTASYONU
 # ----------------------------------------------------------------------------
 
+# Ana müşteri segmentleri için merkezler (ortalama harcama, alışveriş sıklığı, iade oranı)
+CUSTOMER_SEGMENT_CENTERS = [
+    [5000, 15, 0.3],  # Yüksek harcama, orta sıklık, düşük iade
+    [1000, 30, 0.1],  # Düşük harcama, yüksek sıklık, çok düşük iade
+    [8000, 5, 0.05],  # Çok yüksek harcama, düşük sıklık, çok düşük iade
+    [500, 2, 0.5],    # Çok düşük harcama, çok düşük sıklık, yüksek iade (potansiyel anomali)
+    [3000, 12, 0.2]   # Orta harcama, orta sıklık, düşük iade
+]
+# Segmentlerin müşteri sayısı içindeki payları (1000 müşteride 300, 250, 50, 100, 300)
+CUSTOMER_SEGMENT_SHARES = [0.30, 0.25, 0.05, 0.10, 0.30]
+CUSTOMER_FEATURE_SPREAD = [0.2, 0.3, 0.1]     # Merkezlere göre standart sapma oranları
+CUSTOMER_FEATURES = ['avg_purchase_value', 'purchase_frequency', 'return_rate']
+
+@cached()
 def create_customer_data(n_customers=1000):
     """Müşteri segmentasyonu için örnek veri oluşturur"""
     
-    # Ana müşteri segmentleri için merkezler
-    centers = [
-        [5000, 15, 0.3],  # Yüksek harcama, orta sıklık, düşük iade
-        [1000, 30, 0.1],  # Düşük harcama, yüksek sıklık, çok düşük iade
-        [8000, 5, 0.05],  # Çok yüksek harcama, düşük sıklık, çok düşük iade
-        [500, 2, 0.5],    # Çok düşük harcama, çok düşük sıklık, yüksek iade (potansiyel anomali)
-        [3000, 12, 0.2]   # Orta harcama, orta sıklık, düşük iade
-    ]
-    
-    # Cluster büyüklükleri (toplam 1000 müşteri)
-    sizes = [300, 250, 50, 100, 300]
-    
-    # Veri özellikler
-    features = ['avg_purchase_value', 'purchase_frequency', 'return_rate']
-    
-    # Her segment için veri oluştur
-    segments = []
-    segment_labels = []
-    
-    for i, (center, size) in enumerate(zip(centers, sizes)):
-        # Her özellik için rastgele dağılım
-        std_devs = [center[0] * 0.2, center[1] * 0.3, center[2] * 0.1]
-        
-        # Rastgele nokta oluştur
-        segment_data = np.random.normal(loc=center, scale=std_devs, size=(size, len(features)))
-        
-        # Negatif değerleri düzelt
-        segment_data = np.abs(segment_data)
-        
-        # Return rate'i 0-1 arasına sınırla
-        segment_data[:, 2] = np.clip(segment_data[:, 2], 0, 1)
-        
-        segments.append(segment_data)
-        segment_labels.extend([i] * size)
-    
-    # Tüm segmentleri birleştir
-    data = np.vstack(segments)
-    
-    # Müşteri ID'leri oluştur
-    customer_ids = [f'CUST_{i:05d}' for i in range(1, n_customers + 1)]
+    sizes = customer_segment_sizes(n_customers)
+    labels = np.repeat(np.arange(len(sizes)), sizes)
+    return _build_customer_frame(labels, 1, np.random)
+
+def customer_segment_sizes(n_customers):
+    """Segment büyüklüklerini oranlara göre dağıtır (en büyük kalan yöntemi, toplam = n_customers)"""
+    shares = np.asarray(CUSTOMER_SEGMENT_SHARES, dtype=float)
+    # Kayan nokta hatası (ör. 299.99999) tam sayıları bir aşağı yuvarlamasın
+    exact = np.round(shares / shares.sum() * n_customers, 9)
+    sizes = np.floor(exact).astype(int)
+    remainder = n_customers - sizes.sum()
+    sizes[np.argsort(-(exact - sizes), kind='stable')[:remainder]] += 1
+    return sizes
+
+def _build_customer_frame(labels, first_id, rng):
+    """Segment etiketlerinden müşteri satırları üretir (rng: np.random veya np.random.Generator)"""
+    n_customers = len(labels)
+    centers = np.asarray(CUSTOMER_SEGMENT_CENTERS, dtype=float)[labels]
+    # Her özellik için rastgele dağılım; negatif değerler düzeltilir
+    data = np.abs(rng.normal(loc=centers, scale=centers * CUSTOMER_FEATURE_SPREAD))
+    # Return rate'i 0-1 arasına sınırla
+    data[:, 2] = np.clip(data[:, 2], 0, 1)
     
     # Diğer özellikler ekle
-    loyalty_years = np.random.uniform(0, 10, size=n_customers)
-    avg_basket_size = np.random.uniform(1, 15, size=n_customers)
-    pct_discount_used = np.random.uniform(0, 0.7, size=n_customers)
+    loyalty_years = rng.uniform(0, 10, size=n_customers)
+    avg_basket_size = rng.uniform(1, 15, size=n_customers)
+    pct_discount_used = rng.uniform(0, 0.7, size=n_customers)
     
     # Veri çerçevesi oluştur
-    df = pd.DataFrame(data, columns=features)
-    df['customer_id'] = customer_ids
+    df = pd.DataFrame(data, columns=CUSTOMER_FEATURES)
+    ids = pd.Series(np.arange(first_id, first_id + n_customers)).astype(str).str.zfill(5)
+    df['customer_id'] = ('CUST_' + ids).to_numpy()
     df['loyalty_years'] = loyalty_years
     df['avg_basket_size'] = avg_basket_size
     df['pct_discount_used'] = pct_discount_used
-    df['true_segment'] = segment_labels
+    df['true_segment'] = labels
     
     # İleride analiz için Kümülatif Değer oluştur
     df['customer_value'] = df['avg_purchase_value'] * df['purchase_frequency'] * (1 - df['return_rate']) * (1 + df['loyalty_years'] * 0.1)
@@ -252,59 +987,123 @@ def create_customer_data(n_customers=1000):
     return df
 
 def detect_customer_anomalies(df):
-    """Müşteri verilerinde anomali tespiti yapar"""
+    """Müşteri verilerinde anomali tespiti yapar
+
+    Ölçekleyici + Isolation Forest dedektörü aynı veri için bir kez eğitilip model
+    kaydında saklanır (bkz. modules/anomaly_scoring); 'anomaly' sütunu 1: anomali, 0: normal.
+    """
+    from modules.anomaly_scoring import ANOMALY_DATASET_MODEL_NAME, fit_detector, score_batch
     
     try:
-        # Anomali tespiti için kullanılacak özellikler
-        features = ['avg_purchase_value', 'purchase_frequency', 'return_rate', 
-                    'loyalty_years', 'avg_basket_size', 'pct_discount_used']
-        
-        # Veriyi ölçeklendir
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(df[features])
-        
-        # Isolation Forest modeli
-        iso_forest = IsolationForest(contamination=0.05, random_state=42)
-        df['anomaly'] = iso_forest.fit_predict(X_scaled)
-        df['anomaly_score'] = iso_forest.score_samples(X_scaled)
-        
-        # Anomalileri -1, normal gözlemleri 1 olarak işaretler
-        # Bunu 0 ve 1 olarak değiştirelim (1: anomali, 0: normal)
-        df['anomaly'] = [1 if x == -1 else 0 for x in df['anomaly']]
-        
+        detector, _ = fit_detector(df, name=ANOMALY_DATASET_MODEL_NAME)
+        df['anomaly'], df['anomaly_score'] = score_batch(df, detector)
         return df
     except Exception as e:
         print(f"Anomali tespiti sırasında hata oluştu: {e}")
         return df
 
-def segment_customers(df, n_clusters=4):
+# 'standard': 10 başlangıçlı tam K-means; 'minibatch': küçük örnek gruplarıyla güncellenen,
+# büyük müşteri sayılarında çok daha hızlı MiniBatchKMeans (veritabanındaki tabloyu
+# belleğe almadan segmentlemek için bkz. modules/segmentation.segment_customer_table)
+SEGMENTATION_MODES = ('standard', 'minibatch')
+
+@cached()
+def fit_customer_segments(features_df, n_clusters=4, mode='standard'):
+    """Ölçekleyici ve K-means modelini eğitir; aynı veri ve küme sayısı için önbellekten döner"""
+    from modules.segmentation import minibatch_kmeans
+    
+    if mode not in SEGMENTATION_MODES:
+        raise ValueError(f"Bilinmeyen segmentasyon modu: {mode}")
+    
+    # Veriyi ölçeklendir
+    scaler = sk_preprocessing.StandardScaler()
+    X_scaled = scaler.fit_transform(features_df)
+    
+    # K-means modeli
+    if mode == 'minibatch':
+        kmeans = minibatch_kmeans(n_clusters)
+    else:
+        kmeans = sk_cluster.KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    labels = kmeans.fit_predict(X_scaled)
+    
+    return labels, kmeans, scaler
+
+def segment_customers(df, n_clusters=4, mode='standard'):
     """K-means ile müşteri segmentasyonu yapar"""
+    from modules.segmentation import SEGMENT_FEATURES
     
     try:
-        # Segmentasyon için kullanılacak özellikler
-        features = ['avg_purchase_value', 'purchase_frequency', 'return_rate', 
-                    'loyalty_years', 'customer_value']
-        
-        # Veriyi ölçeklendir
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(df[features])
-        
-        # K-means modeli
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-        df['cluster'] = kmeans.fit_predict(X_scaled)
+        labels, kmeans, scaler = fit_customer_segments(df[SEGMENT_FEATURES], n_clusters, mode=mode)
+        df['cluster'] = labels
         
         return df, kmeans, scaler
     except Exception as e:
         print(f"Müşteri segmentasyonu sırasında hata oluştu: {e}")
         return df, None, None
 
+CLUSTER_SWEEP_K_VALUES = tuple(range(2, 9))     # Segmentasyon sekmesindeki küme sayısı aralığı
+SILHOUETTE_SAMPLE_SIZE = 5000   # Silhouette O(n²) olduğundan bu kadar müşteriden oluşan örnekte hesaplanır
+
+def sweep_cluster_counts(df, k_values=CLUSTER_SWEEP_K_VALUES, mode='standard',
+                         sample_size=SILHOUETTE_SAMPLE_SIZE, max_workers=None):
+    """Aday küme sayılarının hepsini paralel eğitip silhouette ve inertia değerlerini karşılaştırır
+
+    Modeller fit_customer_segments üzerinden eğitildiği için önbelleğe girer; tarama
+    sonrasında segment_customers(df, k, mode) herhangi bir aday için anında döner.
+    Silhouette tüm adaylarda aynı rastgele örnek üzerinde hesaplanır.
+    Dönüş değeri: {'recommended_k', 'candidates' (DataFrame), 'sample_size', 'seconds'}
+    """
+    from modules.segmentation import SEGMENT_FEATURES
+    
+    if mode not in SEGMENTATION_MODES:
+        raise ValueError(f"Bilinmeyen segmentasyon modu: {mode}")
+    # Sonuç sadece özellik sütunlarına göre önbelleğe alınır (ör. eklenen 'cluster' sütunu etkilemez)
+    return _sweep_cluster_counts(df[SEGMENT_FEATURES], tuple(k_values), mode, sample_size, max_workers)
+
+@cached()
+def _sweep_cluster_counts(features_df, k_values, mode, sample_size, max_workers):
+    from concurrent.futures import ThreadPoolExecutor
+    
+    k_values = [k for k in k_values if 2 <= k < len(features_df)]
+    if not k_values:
+        raise ValueError("Küme sayısı taraması için yeterli müşteri yok")
+    
+    X_scaled = sk_preprocessing.StandardScaler().fit_transform(features_df)
+    rng = np.random.default_rng(42)
+    sample = rng.choice(len(X_scaled), size=min(sample_size, len(X_scaled)), replace=False)
+    sweep_start = time.perf_counter()
+    
+    def evaluate(n_clusters):
+        started = time.perf_counter()
+        labels, kmeans, _ = fit_customer_segments(features_df, n_clusters, mode=mode)
+        try:
+            silhouette = float(sk_metrics.silhouette_score(X_scaled[sample], labels[sample]))
+        except ValueError:
+            # Örnekte tek küme kaldıysa silhouette tanımsızdır
+            silhouette = np.nan
+        return {'n_clusters': n_clusters, 'silhouette': silhouette, 'inertia': float(kmeans.inertia_),
+                'seconds': time.perf_counter() - started}
+    
+    # K-means C kodunda GIL'i bıraktığından thread'ler gerçek paralellik sağlar ve
+    # eğitilen modeller aynı süreçteki önbelleğe yazılır
+    n_workers = max_workers or min(len(k_values), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        candidates = pd.DataFrame(list(executor.map(evaluate, k_values)))
+    
+    valid = candidates.dropna(subset=['silhouette'])
+    # Eşit silhouette değerlerinde daha az küme tercih edilir
+    recommended_k = int(valid.loc[valid['silhouette'].idxmax(), 'n_clusters']) if len(valid) else k_values[0]
+    return {
+        'recommended_k': recommended_k,
+        'candidates': candidates,
+        'sample_size': len(sample),
+        'seconds': time.perf_counter() - sweep_start,
+    }
+
 # ----------------------------------------------------------------------------
 # ÖRNEK 3: TEKNOLOJİK ÜRÜNLER İÇİN ÖNERİ MOTORU (İÇERİK TABANLI)
 # ----------------------------------------------------------------------------
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
-
 def create_tech_product_data():
     """Farklı kategorilerde teknolojik ürün verisi"""
     return pd.DataFrame({
@@ -324,22 +1123,358 @@ def create_tech_product_data():
         ]
     })
 
-def recommend_similar_tech_products(df, product_id, top_n=3):
-    """İçerik tabanlı öneri üretir"""
+# scikit-learn'de Türkçe durak kelime listesi bulunmadığı için yaygın olanlar burada tanımlı
+TURKISH_STOP_WORDS = [
+    've', 'ile', 'için', 'bir', 'bu', 'şu', 'da', 'de', 'ki', 'mi', 'çok', 'daha',
+    'en', 'gibi', 'olan', 'olarak', 'veya', 'ya', 'her', 'ama', 'fakat', 'ancak',
+]
+
+def fit_tfidf_index(descriptions):
+    """Ürün açıklamaları için TF-IDF vektörleyici ve (L2 normlu) matrisini eğitir"""
+    tfidf = sk_text.TfidfVectorizer(stop_words=TURKISH_STOP_WORDS, dtype=np.float32)
+    tfidf_matrix = tfidf.fit_transform(descriptions)
+    return tfidf, tfidf_matrix
+
+RECOMMENDER_MODES = ('exact', 'ann')
+
+def recommend_similar_tech_products(df, product_id, top_n=3, mode='exact', n_probes=None):
+    """İçerik tabanlı öneri üretir
+
+    Benzerlik indeksi katalog başına bir kez kurulup model kaydında saklanır
+    (bkz. modules/product_index.py); her sorgu tek bir seyrek satır çarpımıdır.
+    mode='ann': büyük kataloglar için yaklaşık arama (LSH); n_probes arttıkça
+    sonuçlar tam aramaya yaklaşır, sorgu yavaşlar.
+    """
+    from modules import product_index
+    if mode not in RECOMMENDER_MODES:
+        raise ValueError(f"Bilinmeyen öneri modu: {mode}")
     try:
-        tfidf = TfidfVectorizer(stop_words='turkish')
-        tfidf_matrix = tfidf.fit_transform(df['description'])
-        cosine_sim = linear_kernel(tfidf_matrix, tfidf_matrix)
-        idx = df.index[df['product_id'] == product_id][0]
-        sim_scores = sorted(list(enumerate(cosine_sim[idx])), key=lambda x: x[1], reverse=True)
-        sim_scores = sim_scores[1:top_n+1]
-        product_indices = [i[0] for i in sim_scores]
-        return df.iloc[product_indices][['product_name', 'description']]
+        index, index_info = product_index.get_product_index(df, name=product_index.PRODUCT_DATASET_INDEX_NAME)
+        if mode == 'ann':
+            ann, _ = product_index.get_ann_index(index, index_info,
+                                                 name=product_index.ANN_DATASET_INDEX_NAME)
+            rows, _ = product_index.ann_similar_products(index, ann, product_id, top_n,
+                                                         n_probes=n_probes or product_index.ANN_PROBES)
+        else:
+            rows, _ = product_index.similar_products(index, product_id, top_n)
+        return df.iloc[rows][['product_name', 'description']]
     except Exception as e:
         print(f"Öneri motoru hatası: {e}")
         return pd.DataFrame()
 
 
+# ----------------------------------------------------------------------------
+# YÜK TESTİ İÇİN ÖLÇEKLENEBİLİR YAPAY VERİ
+# ----------------------------------------------------------------------------
+
+SYNTHETIC_CHUNK_ROWS = 500000       # Üreteçlerin her parçada döndürdüğü yaklaşık satır sayısı
+
+def generate_sales_panel(n_products=100, n_stores=10, n_days=1095, start='2022-01-01',
+                         chunk_rows=SYNTHETIC_CHUNK_ROWS, seed=42):
+    """Ürün x mağaza serilerinden oluşan günlük satış verisini parça parça üretir
+
+    Her seri kendi seviyesi, büyüme hızı, haftalık/yıllık mevsimsellik genliği ve
+    promosyon etkisiyle üretilir; takvim (tatil, promosyon) tüm serilerde ortaktır.
+    Parçalar seri sınırında bölünür ve yaklaşık chunk_rows satır içerir; toplam
+    n_products x n_stores x n_days satır bellekte hiçbir zaman birlikte tutulmaz.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start=start, periods=n_days, freq='D')
+    t = np.arange(n_days)
+    weekly = np.sin(t * (2 * np.pi / 7))
+    yearly = np.sin(t * (2 * np.pi / 365))
+    # Tatil etkisi örnek veriye göre göreli (100 -> %50 artış)
+    holiday_effect = _holiday_effects(dates)
+    holiday_lift = holiday_effect / 200
+    promotion = _promotion_mask(dates)
+    calendar = {
+        'weekday': dates.dayofweek.to_numpy(),
+        'month': dates.month.to_numpy(),
+        'year': dates.year.to_numpy(),
+        'is_weekend': dates.dayofweek.to_numpy() >= 5,
+        'is_holiday': holiday_effect > 0,
+        'is_promotion': promotion,
+        'day_of_year': dates.dayofyear.to_numpy(),
+    }
+
+    n_series = n_products * n_stores
+    series_per_chunk = max(1, chunk_rows // max(n_days, 1))
+    for first in range(0, n_series, series_per_chunk):
+        series = np.arange(first, min(first + series_per_chunk, n_series))
+        k = len(series)
+        level = rng.lognormal(mean=4.5, sigma=0.6, size=(k, 1))
+        growth = rng.uniform(-0.2, 1.0, size=(k, 1))
+        weekly_amp = rng.uniform(0.05, 0.25, size=(k, 1))
+        yearly_amp = rng.uniform(0.1, 0.4, size=(k, 1))
+        promotion_lift = rng.uniform(0.2, 0.6, size=(k, 1))
+        noise = rng.normal(0, 0.1, size=(k, n_days))
+
+        sales = level * (1 + growth * t / n_days + weekly_amp * weekly + yearly_amp * yearly
+                         + promotion_lift * promotion + holiday_lift + noise)
+        product_ids = np.array([f'P{p:05d}' for p in series // n_stores])
+        store_ids = np.array([f'S{s:03d}' for s in series % n_stores])
+
+        chunk = pd.DataFrame({
+            'product_id': np.repeat(product_ids, n_days),
+            'store_id': np.repeat(store_ids, n_days),
+            'date': np.tile(dates.to_numpy(), k),
+            'sales': np.clip(sales, 0, None).ravel(),
+        })
+        for col, values in calendar.items():
+            chunk[col] = np.tile(values, k)
+        yield chunk
+
+def generate_customer_data(n_customers=1_000_000, chunk_rows=SYNTHETIC_CHUNK_ROWS, seed=42):
+    """create_customer_data ile aynı dağılımlardan çok sayıda müşteriyi parça parça üretir
+
+    Segment payları (CUSTOMER_SEGMENT_SHARES) her parçada ayrı ayrı korunur ve
+    parça içindeki sıra karıştırılır; böylece herhangi bir parça da temsili bir örnektir.
+    """
+    rng = np.random.default_rng(seed)
+    for first in range(0, n_customers, chunk_rows):
+        size = min(chunk_rows, n_customers - first)
+        sizes = customer_segment_sizes(size)
+        labels = rng.permutation(np.repeat(np.arange(len(sizes)), sizes))
+        yield _build_customer_frame(labels, first + 1, rng)
+
+def generate_order_log(n_customers=100_000, n_orders=5_000_000, start='2022-01-01', end='2024-12-31',
+                       first_order_id=1, chunk_rows=SYNTHETIC_CHUNK_ROWS, seed=42):
+    """Sipariş kayıtlarını (order_id, customer_id, order_date, amount) zaman sırasıyla üretir
+
+    Müşterilerin alışveriş sıklığı ve sepet tutarı kişiye özeldir (lognormal); her parça
+    tarih aralığının ardışık bir dilimini kapsar, böylece parçalar tabloya eklendikçe
+    gerçek bir sipariş akışı gibi davranır. Müşteri kimlikleri generate_customer_data
+    ile aynı biçimdedir (CUST_00001 ...).
+    """
+    rng = np.random.default_rng(seed)
+    activity = rng.lognormal(mean=0, sigma=1.0, size=n_customers)
+    activity_cdf = np.cumsum(activity / activity.sum())
+    basket_value = rng.lognormal(mean=5.5, sigma=0.7, size=n_customers)
+    start_ts, end_ts = pd.Timestamp(start).value, pd.Timestamp(end).value
+
+    n_chunks = max(1, -(-n_orders // chunk_rows))
+    for i in range(n_chunks):
+        first = i * n_orders // n_chunks
+        size = (i + 1) * n_orders // n_chunks - first
+        # Parçanın kendi zaman dilimi içinde sıralı tarihler
+        low = start_ts + (end_ts - start_ts) * i // n_chunks
+        high = start_ts + (end_ts - start_ts) * (i + 1) // n_chunks
+        timestamps = np.sort(rng.integers(low, high, size=size))
+        customers = np.minimum(np.searchsorted(activity_cdf, rng.random(size)), n_customers - 1)
+        amounts = basket_value[customers] * rng.lognormal(mean=0, sigma=0.3, size=size)
+
+        order_ids = pd.Series(np.arange(first_order_id + first, first_order_id + first + size)).astype(str)
+        customer_ids = pd.Series(customers + 1).astype(str).str.zfill(5)
+        yield pd.DataFrame({
+            'order_id': ('ORD_' + order_ids.str.zfill(9)).to_numpy(),
+            'customer_id': ('CUST_' + customer_ids).to_numpy(),
+            'order_date': pd.to_datetime(timestamps).floor('s'),
+            'amount': np.round(amounts, 2),
+        })
+
+# Yapay ürün kataloğu: her kategori için açıklamayı oluşturan özellik grupları
+# (her gruptan bir ifade seçilir) ve ürün adlarında kullanılan markalar
+SYNTHETIC_PRODUCT_CATEGORIES = {
+    'Dizüstü Bilgisayar': [
+        ['Intel i5 işlemci', 'Intel i7 işlemci', 'Intel i9 işlemci', 'Ryzen 5 işlemci', 'Ryzen 7 işlemci'],
+        ['8GB RAM', '16GB RAM', '32GB RAM', '64GB RAM'],
+        ['256GB SSD', '512GB SSD', '1TB SSD', '2TB SSD'],
+        ['NVIDIA RTX 3050 ekran kartı', 'NVIDIA RTX 4060 ekran kartı', 'entegre ekran kartı', 'AMD Radeon ekran kartı'],
+        ['hafif tasarım', 'uzun pil ömrü', 'yüksek yenileme hızlı ekran', 'aydınlatmalı klavye', 'oyun deneyimi'],
+    ],
+    'Masaüstü Bilgisayar': [
+        ['Intel i5 işlemci', 'Intel i7 işlemci', 'Ryzen 5 işlemci', 'Ryzen 9 işlemci'],
+        ['16GB RAM', '32GB RAM', '64GB RAM'],
+        ['512GB SSD', '1TB SSD', '2TB SSD', '4TB HDD'],
+        ['NVIDIA RTX 4070 ekran kartı', '4K destekli ekran kartı', 'entegre ekran kartı'],
+        ['ofis kullanımı', 'oyun ve yayın', 'sessiz kasa', 'sıvı soğutma'],
+    ],
+    'Akıllı Telefon': [
+        ['Snapdragon işlemci', 'Dimensity işlemci', 'Exynos işlemci', 'Tensor işlemci'],
+        ['64GB hafıza', '128GB hafıza', '256GB hafıza', '512GB hafıza'],
+        ['6.1 inç ekran', '6.5 inç ekran', '6.7 inç AMOLED ekran'],
+        ['4000mAh batarya', '5000mAh batarya', 'hızlı şarj', 'kablosuz şarj'],
+        ['üçlü kamera', '108MP kamera', 'suya dayanıklı gövde', 'Android 14'],
+    ],
+    'Tablet': [
+        ['8 inç ekran', '10.1 inç ekran', '11 inç ekran', '12.9 inç ekran'],
+        ['4GB RAM', '6GB RAM', '8GB RAM'],
+        ['64GB depolama', '128GB depolama', '256GB depolama'],
+        ['kalem desteği', 'klavye desteği', 'hafif ve taşınabilir', 'çocuk modu'],
+        ['Android tabanlı', 'LTE bağlantı', 'Wi-Fi 6'],
+    ],
+    'Kulaklık': [
+        ['kablosuz bluetooth kulaklık', 'kablolu kulaklık', 'kulak içi kulaklık', 'kulak üstü kulaklık'],
+        ['aktif gürültü engelleme', 'şeffaf mod', 'derin bas', 'uzamsal ses'],
+        ['20 saat pil ömrü', '30 saat pil ömrü', '40 saat pil ömrü'],
+        ['mikrofonlu', 'katlanabilir tasarım', 'ter ve suya dayanıklı'],
+    ],
+    'Akıllı Saat': [
+        ['1.3 inç ekran', '1.43 inç AMOLED ekran', '1.9 inç ekran'],
+        ['kalp ritmi takibi', 'uyku takibi', 'kandaki oksijen ölçümü', 'EKG'],
+        ['adım sayar', 'GPS', 'NFC ile ödeme'],
+        ['5 gün pil ömrü', '7 gün pil ömrü', '14 gün pil ömrü'],
+    ],
+    'Monitör': [
+        ['24 inç', '27 inç', '32 inç', '34 inç kavisli'],
+        ['Full HD', '2K', '4K'],
+        ['IPS panel', 'VA panel', 'OLED panel'],
+        ['144Hz yenileme hızı', '60Hz yenileme hızı', '240Hz yenileme hızı'],
+        ['USB-C bağlantı', 'yükseklik ayarlı stand', 'dahili hoparlör', 'HDR desteği'],
+    ],
+}
+SYNTHETIC_PRODUCT_BRANDS = ['Nova', 'Zentek', 'Lumo', 'Vega', 'Orbis', 'Atlas', 'Kuzey', 'Pira']
+SYNTHETIC_PRODUCT_SERIES = 500      # Aynı serideki ürünlerin açıklamaları ortak bir seri adı içerir
+
+def generate_product_catalog(n_products=500_000, first_product_id=1, chunk_rows=SYNTHETIC_CHUNK_ROWS, seed=42):
+    """create_tech_product_data biçiminde (product_id, product_name, category, description)
+    büyük bir teknolojik ürün kataloğunu parça parça üretir"""
+    rng = np.random.default_rng(seed)
+    categories = list(SYNTHETIC_PRODUCT_CATEGORIES)
+    brands = np.array(SYNTHETIC_PRODUCT_BRANDS, dtype=object)
+    
+    for first in range(0, n_products, chunk_rows):
+        size = min(chunk_rows, n_products - first)
+        category_idx = rng.integers(len(categories), size=size)
+        brand = brands[rng.integers(len(brands), size=size)]
+        series = pd.Series(rng.integers(SYNTHETIC_PRODUCT_SERIES, size=size)).astype(str)
+        model = pd.Series(rng.integers(100, 1000, size=size)).astype(str)
+        
+        description = pd.Series('', index=range(size), dtype=object)
+        for c, category in enumerate(categories):
+            mask = category_idx == c
+            parts = [pd.Series(np.array(group, dtype=object)[rng.integers(len(group), size=mask.sum())])
+                     for group in SYNTHETIC_PRODUCT_CATEGORIES[category]]
+            text = parts[0]
+            for part in parts[1:]:
+                text = text + ', ' + part
+            description[mask] = (text + ' ile ' + category.lower() + '.').to_numpy()
+        category_names = np.array(categories, dtype=object)[category_idx]
+        
+        yield pd.DataFrame({
+            'product_id': np.arange(first_product_id + first, first_product_id + first + size),
+            'product_name': (pd.Series(brand) + ' ' + pd.Series(category_names) + ' ' + model).to_numpy(),
+            'category': category_names,
+            'description': (brand + ' ' + ('S' + series) + ' serisi: ' + description).to_numpy(),
+        })
+
+# Yapay müşteri yorumları: puana göre seçilen ifade havuzları (bkz. generate_reviews)
+SYNTHETIC_REVIEW_PHRASES = {
+    'Olumlu': [
+        'ürün beklediğimden çok daha iyi çıktı', 'hızlı kargo için teşekkürler', 'kaliteli ve sağlam bir ürün',
+        'herkese tavsiye ederim', 'fiyatına göre harika', 'çok memnun kaldım', 'tam beklediğim gibi',
+        'paketleme çok özenliydi', 'kesinlikle tekrar alırım', 'performansı mükemmel', 'satıcı çok ilgiliydi',
+        'kullanımı çok kolay',
+    ],
+    'Nötr': [
+        'idare eder', 'fiyatına göre normal', 'ürün işimi görüyor', 'tasarımı biraz daha iyi olabilirdi',
+        'ne iyi ne kötü', 'beklentimi kısmen karşıladı', 'kargo biraz geç geldi', 'ortalama bir ürün',
+        'kurulumu biraz uğraştırdı', 'rengi fotoğraftakinden farklı',
+    ],
+    'Olumsuz': [
+        'kalitesi çok düşük', 'iki hafta gecikmeli geldi', 'aldıktan bir ay sonra bozuldu',
+        'müşteri hizmetleri hiç yardımcı olmadı', 'paranızı boşa harcamayın', 'garanti süreci çok yorucu',
+        'kesinlikle tavsiye etmiyorum', 'kutusu hasarlı geldi', 'iade etmek zorunda kaldım', 'pil ömrü çok kısa',
+        'açıklamadaki özellikler yanlış', 'hiç memnun kalmadım',
+    ],
+}
+SYNTHETIC_RATING_PROBS = [0.10, 0.08, 0.15, 0.30, 0.37]    # 1-5 puanların olasılıkları
+SYNTHETIC_REVIEW_NOISE = 0.15       # Yorumdaki bir ifadenin başka bir duygudan seçilme olasılığı
+
+def generate_reviews(n_reviews=1_000_000, n_customers=100_000, n_products=10_000, start='2022-01-01',
+                     end='2024-12-31', first_review_id=1, chunk_rows=SYNTHETIC_CHUNK_ROWS, seed=42):
+    """Puanlı müşteri yorumlarını (review_id, customer_id, product_id, review_date, rating, text, text_hash) üretir
+
+    Her yorum, puanına uygun havuzdan seçilen 1-3 ifadeden oluşur; ifadelerin bir kısmı
+    başka bir duygunun havuzundan gelir (karışık yorumlar). Kısa yorumlar gerçekte olduğu
+    gibi sık tekrarlanır. text_hash, duygu skoru önbelleğinin anahtarıdır.
+    """
+    from modules.sentiment_engine import text_hashes
+
+    rng = np.random.default_rng(seed)
+    pools = {name: np.array(phrases, dtype=object) for name, phrases in SYNTHETIC_REVIEW_PHRASES.items()}
+    pool_names = list(pools)
+    start_ts, end_ts = pd.Timestamp(start).value, pd.Timestamp(end).value
+    
+    for first in range(0, n_reviews, chunk_rows):
+        size = min(chunk_rows, n_reviews - first)
+        ratings = rng.choice(np.arange(1, 6), size=size, p=SYNTHETIC_RATING_PROBS)
+        # Puanın duygusu: 4-5 olumlu, 3 nötr, 1-2 olumsuz
+        sentiment = np.where(ratings >= 4, 0, np.where(ratings == 3, 1, 2))
+        n_phrases = rng.integers(1, 4, size=size)
+        
+        text = None
+        for position in range(3):
+            # Gürültülü ifadeler rastgele bir duygudan seçilir
+            source = np.where(rng.random(size) < SYNTHETIC_REVIEW_NOISE, rng.integers(0, 3, size=size), sentiment)
+            phrase = pd.Series('', index=range(size), dtype=object)
+            for s, name in enumerate(pool_names):
+                mask = source == s
+                phrase[mask] = pools[name][rng.integers(len(pools[name]), size=mask.sum())]
+            phrase = phrase.where(position < n_phrases, '')
+            if text is None:
+                text = phrase.str.capitalize()
+            else:
+                text = text + np.where(phrase != '', ', ', '') + phrase
+        
+        timestamps = np.sort(rng.integers(start_ts, end_ts, size=size))
+        customer_ids = pd.Series(rng.integers(1, n_customers + 1, size=size)).astype(str).str.zfill(5)
+        text = text + '.'
+        yield pd.DataFrame({
+            'review_id': np.arange(first_review_id + first, first_review_id + first + size),
+            'customer_id': ('CUST_' + customer_ids).to_numpy(),
+            'product_id': rng.integers(1, n_products + 1, size=size),
+            'review_date': pd.to_datetime(timestamps).floor('s'),
+            'rating': ratings,
+            'text': text.to_numpy(),
+            'text_hash': text_hashes(text),
+        })
+
+SYNTHETIC_DATASETS = {
+    # veri kümesi: (üreteç, varsayılan tablo, satır sayısı hesaplayan fonksiyon)
+    'sales_panel': (generate_sales_panel, 'sales_panel',
+                    lambda n_products=100, n_stores=10, n_days=1095, **_: n_products * n_stores * n_days),
+    'customers': (generate_customer_data, 'customer_data',
+                  lambda n_customers=1_000_000, **_: n_customers),
+    'orders': (generate_order_log, 'orders',
+               lambda n_orders=5_000_000, **_: n_orders),
+    'products': (generate_product_catalog, 'products',
+                 lambda n_products=500_000, **_: n_products),
+    'reviews': (generate_reviews, 'reviews',
+                lambda n_reviews=1_000_000, **_: n_reviews),
+}
+
+def write_synthetic_data(dataset, target=None, progress_callback=None, mode='replace', **generator_kwargs):
+    """Yapay veriyi parça parça bir CSV dosyasına veya SQLite tablosuna yazar
+
+    dataset: 'sales_panel', 'customers', 'orders', 'products' veya 'reviews'
+    target: '.csv' ile biten dosya yolu veya tablo adı (None = veri kümesinin varsayılan tablosu)
+    mode: tabloya yazarken 'replace' veya 'append' (ör. yeni siparişleri eklemek için)
+    progress_callback(yazılan_satır, oran) her parçadan sonra çağrılır.
+    Yazılan satır sayısını döndürür.
+    """
+    from modules import database_utils as db
+
+    if dataset not in SYNTHETIC_DATASETS:
+        raise ValueError(f"Bilinmeyen veri kümesi: {dataset}")
+    generator, default_table, count_rows = SYNTHETIC_DATASETS[dataset]
+    chunks = generator(**generator_kwargs)
+    total_rows = count_rows(**generator_kwargs)
+    target = target or default_table
+
+    if str(target).lower().endswith('.csv'):
+        rows_written = 0
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(target, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            rows_written += len(chunk)
+            if progress_callback is not None:
+                progress_callback(rows_written, min(rows_written / total_rows, 1.0))
+        return rows_written
+
+    return db.bulk_load_frames(chunks, target, mode=mode, total_rows=total_rows,
+                               progress_callback=progress_callback)
+
+
 # Uygulama başlatıldığında çalışacak ana fonksiyon
 if __name__ == "__main__":
     print("Veri analizi modülü başarıyla yüklendi!")